@@ -19,16 +19,34 @@ Contents
 :: Python modules
 
     analytics     --- Track / analyse data
-    compact       --- ???
+    compact       --- Summarise old-style results.dat files (see summarise)
     dropdata      --- Export data to do w/ heterogeneous populations
     main          --- Parse parameters and run simulation
+    library       --- Run simulations in memory, from Python
     plotdata      --- Plot results
     population    --- Class and functions for entire tumour
     simulator     --- High-level simulation control and logic
     subpopulation --- Class, functions for individual clones
     treatment     --- Class, functions for treatment
-    tree_to_xml   --- Export phylogenetic tree as XML file
+    tree_export   --- Export phylogenetic tree as phyloXML/Newick file
     snapshot      --- Store and load population 'snapshots'
+    checkpoint    --- Rolling checkpoints for resuming long runs
+    clonetable    --- Extract / export per-clone data tables
+    outputworker  --- Background process for writing output files
+    results_store --- SQLite backend for run results
+    summarise     --- Summarise a test group's results per param set
+    distributions --- Plot clone / run distributions across a test group
+    phylo_summary --- Write per-param-set clone rates/sizes (dist.dat)
+    render        --- Render run plots from saved plot data
+    runcache      --- Cache of seeded run results
+    precrash      --- Library of stored pre-crash populations
+    workerpool    --- Pool of warm worker processes for running simulations
+    simdaemon     --- Local daemon (and client) for queueing simulation runs
+    sweep         --- Run a test group in parallel, with sequential sampling
+    runtime_model --- Predict run times from earlier results, for scheduling
+    jobpack       --- Pack runs into PBS array jobs (or run them locally)
+    splitting     --- Estimate rare recovery probabilities by multilevel splitting
+    resources     --- Account for the CPU, memory and output time a run uses
     utils         --- Various utility functions
     constants     --- Various constants used throughout the package
 
@@ -36,4 +54,6 @@ Contents
 
     run_simulation.sh --- Parse config file, create directories, run sim
     default.conf      --- Sample config file
+    benchmarks/plot_memory.py --- Memory benchmark for distribution plots
+    tests/            --- Unit tests (run with `python -m pytest tests`)
 """
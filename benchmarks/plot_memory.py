@@ -0,0 +1,96 @@
+"""
+Benchmark peak memory use of the dual histogram and box plots.
+
+For a fixed number of clones, and increasing tumour sizes,
+plot the mid/end distributions with plotdata.make_dual_hist and
+plotdata.make_dual_box, each in a fresh child process, and
+report the increase in peak RSS over the child's starting RSS.
+As these plots work from (value, count) pairs, memory use should
+stay flat as the tumour grows. Use --expanded to compare against
+expanding the pairs to one value per cell, as the plots used to.
+
+Run from the repository root:
+
+    python benchmarks/plot_memory.py
+"""
+from __future__ import print_function
+import os
+import sys
+import argparse
+import resource
+import tempfile
+import shutil
+import multiprocessing
+
+import matplotlib
+matplotlib.use('Agg')
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import plotdata
+
+
+def peak_rss_kb():
+    """Get this process's peak resident set size, in kB (Linux)."""
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def make_freqs(num_clones, tumour_size, seed):
+    """Make (mut rate, clone size) pairs for a tumour of a given size."""
+    rng = np.random.RandomState(seed)
+    mut_rates = rng.lognormal(np.log(0.001), 0.5, num_clones)
+    weights = rng.pareto(1.5, num_clones) + 1
+    sizes = np.maximum(1, (weights / weights.sum() * tumour_size).astype(int))
+    return list(zip(mut_rates, sizes))
+
+
+def plot_and_measure(num_clones, tumour_size, expanded, out_dir, result_queue):
+    """Draw both plots, and report the increase in peak RSS."""
+    mid = make_freqs(num_clones, tumour_size, seed=1)
+    end = make_freqs(num_clones, tumour_size, seed=2)
+    start_rss = peak_rss_kb()
+
+    if expanded:
+        # the old approach: one list entry per cell
+        mid_vals = np.repeat(*map(np.array, zip(*mid)))
+        end_vals = np.repeat(*map(np.array, zip(*end)))
+        matplotlib.pyplot.hist(mid_vals, bins=20, log=True)
+        matplotlib.pyplot.hist(end_vals, bins=20, log=True)
+        matplotlib.pyplot.close()
+        matplotlib.pyplot.boxplot([mid_vals, end_vals])
+        matplotlib.pyplot.close()
+    else:
+        plotdata.make_dual_hist(end, mid, os.path.join(out_dir, "hist"), "Mutation Rates")
+        plotdata.make_dual_box(end, mid, os.path.join(out_dir, "box"), "Mutation Rate Box")
+
+    result_queue.put(peak_rss_kb() - start_rss)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--num_clones', type=int, default=5000)
+    parser.add_argument('--sizes', type=float, nargs='+',
+                        default=[1e4, 1e5, 1e6, 1e7])
+    parser.add_argument('--expanded', action="store_true", default=False)
+    opt = parser.parse_args()
+
+    out_dir = tempfile.mkdtemp()
+    result_queue = multiprocessing.Queue()
+    try:
+        print("{:>12} {:>10} {:>16}".format("tumour size", "clones", "peak RSS +MB"))
+        for size in opt.sizes:
+            proc = multiprocessing.Process(target=plot_and_measure,
+                                           args=(opt.num_clones, int(size),
+                                                 opt.expanded, out_dir,
+                                                 result_queue))
+            proc.start()
+            rss_increase_kb = result_queue.get()
+            proc.join()
+            print("{:>12.0e} {:>10} {:>16.1f}".format(size, opt.num_clones,
+                                                     rss_increase_kb / 1024.0))
+    finally:
+        shutil.rmtree(out_dir)
+
+
+if __name__ == '__main__':
+    main()
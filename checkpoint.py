@@ -0,0 +1,270 @@
+"""
+A module containing functions for writing rolling
+checkpoints of a running simulation, and resuming
+a simulation from the newest valid checkpoint.
+
+Unlike a population snapshot (see snapshot.py), which
+can only be taken just before treatment is introduced,
+a checkpoint may be taken at any cycle. It stores the
+full state needed to continue the run exactly where it
+left off: the clone tree and mutations (in the same CSV
+format as a snapshot), the analytics recorded so far,
+the treatment state, and the state of both random
+number generators.
+
+Checkpoints are written to `<run_dir>/checkpoints`, one
+.tar.gz archive per checkpoint. Each archive is written
+under a temporary name and then renamed, so a run killed
+mid-write never leaves a truncated archive under a valid
+checkpoint name.
+"""
+from __future__ import print_function
+import os
+import glob
+import random
+import shutil
+import tarfile
+import tempfile
+try:
+    import cPickle as pickle
+except ImportError:
+    import pickle
+import numpy as np
+import snapshot
+from mutation import Mutation
+from subpopulation import Subpopulation
+from population import Population
+from utils import make_path_unless_exists, delete_local_file
+
+CHECKPOINT_DIRNAME = "checkpoints"
+STATE_FNAME = "state.pkl"
+MUT_FNAME = "mutations.csv"
+CLONE_FNAME = "clones.csv"
+
+# population attributes stored in a checkpoint, in
+# addition to the clone tree, mutations and analytics
+POPN_PARAMS = ['tumoursize', 'clonecount',
+               'avg_pro_rate', 'avg_mut_rate',
+               'select_pressure', 'mutagenic_pressure',
+               'selective_pressure_applied',
+               'mid_proliferation', 'mid_mutation']
+
+# parameters which control how a run is executed, rather
+# than what is simulated; when resuming, these are taken
+# from the resuming invocation rather than the checkpoint
+RUN_CONTROL_PARAMS = ['resume', 'no_plots', 'tree_format', 'gzip_trees',
+                      'checkpoint_every', 'checkpoint_interval',
+                      'checkpoint_keep', 'results_backend', 'sync_output',
+                      'max_plot_clones', 'max_plot_points',
+                      'outputs', 'quiet', 'precrash_library',
+                      'memory_soft_limit', 'memory_hard_limit']
+
+
+def checkpoint_dir(run_dir):
+    """Get the checkpoint directory for a given run directory."""
+    return "{0}/{1}".format(run_dir, CHECKPOINT_DIRNAME)
+
+
+def save_checkpoint(sim, t_curr, elapsed_time):
+    """
+    Save a checkpoint of a running simulation.
+
+    The checkpoint is taken at the *end* of cycle
+    `t_curr`, so a resumed simulation will begin
+    at cycle `t_curr + 1`.
+
+    Args
+    ----
+    sim : a Simulator
+    t_curr : the cycle which has just completed
+    elapsed_time : simulation runtime so far, in seconds
+
+    Returns
+    -------
+    The path to the new checkpoint archive.
+    """
+    ckpt_dir = checkpoint_dir(sim.run_dir)
+    archive_name = "{0}/checkpoint_{1:010d}.tar.gz".format(ckpt_dir, t_curr)
+    return write_checkpoint(sim, t_curr, elapsed_time, archive_name)
+
+
+def write_checkpoint(sim, t_curr, elapsed_time, archive_name):
+    """
+    Write a checkpoint of a running simulation to a given archive.
+
+    See save_checkpoint() for the arguments.
+
+    Returns
+    -------
+    The path to the checkpoint archive.
+    """
+    archive_dir = os.path.dirname(archive_name)
+    make_path_unless_exists(archive_dir)
+
+    popn = sim.popn
+    treatmt_state = dict(vars(sim.treatmt))
+    # the treatment's simulator reference is
+    # restored when the simulation is resumed
+    del treatmt_state['sim']
+
+    state = {'t_curr': t_curr,
+             'elapsed_time': elapsed_time,
+             'resources': sim.resources.state(),
+             'forced_pruning': sim.forced_pruning,
+             'opt': sim.opt,
+             'popn_params': dict((param, getattr(popn, param))
+                                 for param in POPN_PARAMS),
+             'analytics': popn.analytics_base,
+             'treatment': treatmt_state,
+             'num_clones_created': Subpopulation.num_clones_created,
+             'num_muts_created': Mutation.num_muts_created,
+             'np_rng_state': np.random.get_state(),
+             'py_rng_state': random.getstate()}
+
+    work_dir = tempfile.mkdtemp(dir=archive_dir)
+    try:
+        state_fpath = os.path.join(work_dir, STATE_FNAME)
+        mut_fpath = os.path.join(work_dir, MUT_FNAME)
+        clone_fpath = os.path.join(work_dir, CLONE_FNAME)
+
+        with open(state_fpath, 'wb') as state_file:
+            pickle.dump(state, state_file, pickle.HIGHEST_PROTOCOL)
+        snapshot.save_muts_to_file(popn.all_mutations, mut_fpath,
+                                   include_dead=True)
+        snapshot.save_clones_to_file(popn.subpop, clone_fpath)
+
+        # several processes may write the same archive at once
+        partial_name = "{0}.{1}.part".format(archive_name, os.getpid())
+        ckpt_archive = tarfile.open(partial_name, "w:gz")
+        for fpath in [state_fpath, mut_fpath, clone_fpath]:
+            ckpt_archive.add(fpath, arcname=os.path.basename(fpath))
+        ckpt_archive.close()
+        # renaming is atomic, so a checkpoint is either
+        # complete or not visible at all
+        os.rename(partial_name, archive_name)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    return archive_name
+
+
+def list_checkpoints(run_dir):
+    """List a run's checkpoint archives, newest first."""
+    pattern = "{0}/checkpoint_*.tar.gz".format(checkpoint_dir(run_dir))
+    # cycle numbers are zero-padded, so a
+    # lexical sort is also a sort by cycle
+    return sorted(glob.glob(pattern), reverse=True)
+
+
+def prune_checkpoints(run_dir, num_to_keep):
+    """Delete all but the newest `num_to_keep` checkpoints."""
+    for archive_path in list_checkpoints(run_dir)[max(num_to_keep, 1):]:
+        delete_local_file(archive_path)
+
+
+def load_checkpoint(archive_path, extract_path="."):
+    """
+    Load a simulation checkpoint.
+
+    Args
+    ----
+    archive_path : path to the checkpoint archive
+    extract_path : directory in which to (temporarily)
+        extract the archive's contents
+
+    Returns
+    -------
+    3-tuple (state, opt, popn), where `state` is the
+    dictionary of simulator state written by
+    save_checkpoint(), `opt` is the stored parameter
+    set, and `popn` is the restored Population.
+    """
+    work_dir = tempfile.mkdtemp(dir=extract_path)
+    try:
+        ckpt_archive = tarfile.open(archive_path)
+        member_names = ckpt_archive.getnames()
+        for fname in [STATE_FNAME, MUT_FNAME, CLONE_FNAME]:
+            if fname not in member_names:
+                raise Exception("checkpoint archive is missing {}".format(fname))
+        ckpt_archive.extractall(path=work_dir)
+        ckpt_archive.close()
+
+        with open(os.path.join(work_dir, STATE_FNAME), 'rb') as state_file:
+            state = pickle.load(state_file)
+        opt = state['opt']
+
+        all_muts, mutation_map = snapshot.load_muts_from_file(opt,
+                                                              os.path.join(work_dir, MUT_FNAME))
+        root_clone = snapshot.load_clones_from_file(opt, mutation_map,
+                                                    os.path.join(work_dir, CLONE_FNAME))
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    # clones pruned from the tree (see Population.update) are not
+    # stored, but the mutations which arose in them are. Give those
+    # mutations an empty stand-in clone, which, like the pruned
+    # clone, is a dead end
+    for mut in mutation_map.values():
+        if mut.original_clone is None:
+            stand_in = Subpopulation(opt=opt, prolif=0.0, mut_rate=0.0,
+                                     depth=0, t_curr=0, col='n', prev_time=0)
+            stand_in.clone_id = mut.original_clone_id
+            stand_in.size = 0
+            mut.original_clone = stand_in
+            del mut.original_clone_id
+
+    popn = Population.init_from_file(opt, state['analytics'],
+                                     state['popn_params'],
+                                     root_clone, all_muts)
+
+    return state, opt, popn
+
+
+def load_latest_checkpoint(run_dir):
+    """
+    Load the newest valid checkpoint for a run.
+
+    Checkpoints are tried newest first; any checkpoint
+    which cannot be loaded (for instance, if the archive
+    is corrupt) is skipped with a warning.
+
+    Returns
+    -------
+    The return value of load_checkpoint() for the newest
+    valid checkpoint, or None if there is no valid checkpoint.
+    """
+    for archive_path in list_checkpoints(run_dir):
+        try:
+            return load_checkpoint(archive_path,
+                                   extract_path=checkpoint_dir(run_dir))
+        except Exception as err:
+            print("Skipping invalid checkpoint {}: {}".format(archive_path, err))
+    return None
+
+
+def restore_run_state(sim, state):
+    """
+    Restore a simulator's treatment, counter and RNG state.
+
+    This must be called once `sim` has created its
+    Treatment, and after the population has been loaded,
+    as loading clones and mutations advances the ID counters.
+    """
+    treatmt_state = dict(state['treatment'])
+    treatmt_state['sim'] = sim
+    sim.treatmt.__dict__.update(treatmt_state)
+
+    restore_random_state(state)
+
+
+def restore_random_state(state):
+    """
+    Restore the clone and mutation ID counters, and RNG state.
+
+    This must be called after the population has been loaded.
+    """
+    Subpopulation.num_clones_created = state['num_clones_created']
+    Mutation.num_muts_created = state['num_muts_created']
+
+    np.random.set_state(state['np_rng_state'])
+    random.setstate(state['py_rng_state'])
@@ -0,0 +1,213 @@
+"""
+Functions for extracting and exporting tabular data
+about every clone in the clone tree.
+
+Each function makes a single iterative pass over the
+tree (see Subpopulation.iter_preorder), rather than
+recursing through it, and clones are identified by
+their stable `clone_id`, so tables written at different
+stages of a run (e.g. mid and end) can be joined.
+
+A tree table (see tree_table()) is a columnar copy of
+the whole clone tree. It holds everything needed to
+export clone summaries, clone frequencies and trees,
+and to plot a run's clones, without any reference to
+the live tree, so it can be handed to another process.
+"""
+import csv
+import numpy as np
+
+# write buffer size for clone table files, in bytes
+BUFFER_SIZE = 1 << 16
+
+CLONE_SUMMARY_COLUMNS = ("clone_id",
+                         "b_muts", "n_muts", "d_muts", "r_muts",
+                         "size", "depth", "prolif_rate", "mut_rate")
+
+# clone attributes copied into a tree table, as well as
+# each clone's parent and numbers of each type of mutation
+TREE_TABLE_ATTRS = ("clone_id", "depth", "size", "precrash_size",
+                    "prolif_rate", "mut_rate", "branch_length",
+                    "col", "s_time", "d_time")
+
+# d_time of clones which are still alive, in a tree table
+NO_D_TIME = -1
+
+
+def clone_columns(root, attr_names, inc_dead_clones=False):
+    """
+    Extract attributes of every clone as columns, in one pass.
+
+    Args
+    ----
+    root : the root clone of the tree
+    attr_names : names of the clone attributes to extract
+    inc_dead_clones : whether to include clones with no cells
+
+    Returns
+    -------
+    A dict mapping each attribute name to a NumPy array
+    of that attribute's values, one per clone, in pre-order.
+    """
+    values = dict((name, []) for name in attr_names)
+    for clone in root.iter_preorder():
+        if inc_dead_clones or not clone.is_dead():
+            for name in attr_names:
+                values[name].append(getattr(clone, name))
+    return dict((name, np.array(values[name])) for name in attr_names)
+
+
+def living_clones(columns):
+    """
+    Select the living clones from a set of columns.
+
+    `columns` must include 'size' (see clone_columns()).
+    """
+    is_alive = columns['size'] > 0
+    return dict((name, col[is_alive]) for name, col in columns.items())
+
+
+def column_rows(columns, attr_names):
+    """
+    Zip some columns into a list of rows (tuples),
+    one per clone, holding Python (not NumPy) values.
+    """
+    return list(zip(*[columns[name].tolist() for name in attr_names]))
+
+
+def tree_table(root):
+    """
+    Copy the whole clone tree into a table of columns.
+
+    Returns
+    -------
+    A dict mapping column names to NumPy arrays, with one
+    element per clone, in pre-order. There is a column for
+    each of TREE_TABLE_ATTRS (with NO_D_TIME in place of a
+    missing d_time), 'parent' (the index of each clone's
+    parent, or -1 for the root clone), and 'b_muts',
+    'n_muts', 'd_muts' and 'r_muts' (numbers of mutations).
+    """
+    clones, parents = preorder_with_parents(root)
+    table = dict((name, np.array([getattr(clone, name) for clone in clones]))
+                 for name in TREE_TABLE_ATTRS if name != "d_time")
+    table["d_time"] = np.array([NO_D_TIME if clone.d_time is None
+                                else clone.d_time for clone in clones])
+    table["parent"] = np.array(parents)
+    for mut_type in ("b", "d", "r"):
+        table[mut_type + "_muts"] = np.array([len(clone.mutations[mut_type])
+                                              for clone in clones])
+    table["n_muts"] = np.array([clone.num_neutral_mutns for clone in clones])
+    return table
+
+
+def preorder_with_parents(root):
+    """
+    List all clones in pre-order, along with their parents.
+
+    Returns
+    -------
+    2-tuple of lists (clones, parents), where parents[i]
+    is the index in `clones` of the parent of clones[i]
+    (or -1 for the root clone).
+    """
+    clones = []
+    parents = []
+    stack = [(root, -1)]
+    while stack:
+        clone, parent_idx = stack.pop()
+        clone_idx = len(clones)
+        clones.append(clone)
+        parents.append(parent_idx)
+        # push children in reverse, so the first child is visited first
+        stack.extend((child, clone_idx) for child in reversed(clone.nodes))
+    return clones, parents
+
+
+def subtree_sizes(table):
+    """
+    Count the living cells in each clone's subtree.
+
+    Accumulates clone sizes up a tree table in a single
+    (reverse pre-order, hence children-first) pass.
+    """
+    sizes = np.maximum(table["size"], 0).tolist()
+    parents = table["parent"].tolist()
+    for clone_idx in xrange(len(sizes) - 1, 0, -1):
+        sizes[parents[clone_idx]] += sizes[clone_idx]
+    return sizes
+
+
+def clone_freq_table(table, idnt="0-0"):
+    """
+    Get the number of cells carrying each living clone's mutations.
+
+    Every cell in a clone's subtree carries the mutations
+    which define that clone, so the subtree cell count,
+    as a proportion of tumour size, is the frequency of
+    those mutations.
+
+    Returns
+    -------
+    A list of (subtree cell count, identifier) pairs, one
+    per living clone, in post-order. Each identifier records
+    the clone's path from the root (the root clone's is
+    `idnt`; the i-th child of a clone with identifier p
+    has identifier str(i) + 'n' + p).
+    """
+    parents = table["parent"].tolist()
+    num_clones = len(parents)
+    cell_counts = subtree_sizes(table)
+
+    # tree depth, identifier and number of descendants of each clone;
+    # depth and identifier propagate down the tree in pre-order ...
+    tree_depths = [0] * num_clones
+    idnts = [idnt] * num_clones
+    num_children_seen = [0] * num_clones
+    for clone_idx in xrange(1, num_clones):
+        parent_idx = parents[clone_idx]
+        tree_depths[clone_idx] = tree_depths[parent_idx] + 1
+        idnts[clone_idx] = "{0}n{1}".format(num_children_seen[parent_idx],
+                                            idnts[parent_idx])
+        num_children_seen[parent_idx] += 1
+    # ... and descendant counts accumulate up it in reverse pre-order
+    num_descendants = [0] * num_clones
+    for clone_idx in xrange(num_clones - 1, 0, -1):
+        num_descendants[parents[clone_idx]] += num_descendants[clone_idx] + 1
+
+    # a clone's post-order position is its pre-order position,
+    # less its ancestors (which come after it in post-order),
+    # plus its descendants (which come before it)
+    post_order = [None] * num_clones
+    for clone_idx in xrange(num_clones):
+        post_idx = clone_idx - tree_depths[clone_idx] + num_descendants[clone_idx]
+        post_order[post_idx] = clone_idx
+
+    # TODO include the type of each clone's initial mutation
+    mut_type = 'n'
+    prolif_rates = table["prolif_rate"].tolist()
+    sizes = table["size"].tolist()
+    return [(cell_counts[clone_idx],
+             "pr-{}-{}{}".format(str(prolif_rates[clone_idx]),
+                                 mut_type, idnts[clone_idx]))
+            for clone_idx in post_order
+            if sizes[clone_idx] > 0]
+
+
+def clone_summary_rows(table):
+    """Generate one clone summary row per clone in a tree table."""
+    columns = [table[name].tolist() for name in CLONE_SUMMARY_COLUMNS]
+    return zip(*columns)
+
+
+def write_clone_summary(table, fpath):
+    """
+    Write summary data for all clones in a tree table to a CSV file.
+
+    The whole table is written in one pass, through a
+    single buffered file handle.
+    """
+    with open(fpath, 'w', BUFFER_SIZE) as summary_file:
+        writer = csv.writer(summary_file)
+        writer.writerow(CLONE_SUMMARY_COLUMNS)
+        writer.writerows(clone_summary_rows(table))
@@ -7,12 +7,55 @@ Constants for use in this package.
 # survived more than CRASH_BUFFER cycles past the crash
 CRASH_BUFFER = 25
 
+# recovery types (see analytics.completion_status) which
+# count as a recovery from the crash
+RECOVERED_TYPES = ('FULL', 'PART')
+
 # when simulation ends, we want to print a message
 # explaining why it ended
 END_POP_TOO_LARGE = "Population exceeded size limit."
 END_POP_DIED_OUT = "Population died out."
 END_MAX_CYCLES = "Simulation reached maximum cycle limit."
 END_SAVE_SNAPSHOT = "Saving pre-crash population snapshot."
+END_MEMORY_LIMIT = "Memory use exceeded hard limit; checkpoint saved."
+
+# columns of the run summary recording the resources the run used
+# (see resources); these come last, so that results files and
+# databases written before they were added can still be appended
+# to (see summarise.read_results_csv, and results_store.connect)
+RESOURCE_COLUMNS = ('cpu_time', 'peak_rss_mb', 'peak_clones',
+                    'peak_mutations', 'output_time')
+
+# columns of the simulation summary (results) files, one row per run
+SUMMARY_COLUMNS = ('param_set', 'run_number',
+                   'went_through_crash',
+                   'recovered', 'recov_type', 'recov_percent',
+                   'prolif_rate', 'death_rate', 'mut_rate',
+                   'crash_time', 'select_pressure',
+                   'max_select_pressure',
+                   'prob_ben_mut', 'prob_del_mut',
+                   'prob_mut_incr', 'prob_mut_decr',
+                   'pop_size', 'num_clones',
+                   'dom_clone_proportion', 'avg_depth',
+                   'avg_mut_rate_at_end', 'avg_prolif_rate_at_end',
+                   'elapsed_time', 'elapsed_cycles',
+                   'total_mutations',
+                   'generated_resist_mutns', 'surviving_resist_mutns',
+                   'pre_crash_min', 'pre_crash_min_time',
+                   'pre_crash_max', 'pre_crash_max_time',
+                   'post_crash_min', 'post_crash_min_time',
+                   'post_crash_max', 'post_crash_max_time') + RESOURCE_COLUMNS
+
+# files a run can write (each is only written if named in opt.outputs):
+#   summary       --- a row of the results files (or database)
+#   clone_summary --- mid, resist and end clone summary CSVs
+#   analytics     --- data/analytics_data.csv
+#   plot_data     --- data/mid_plot_data.npz, data/end_plot_data.npz
+#   plots         --- mid and end plots (unless --no_plots)
+#   tree          --- phylogenetic trees
+#   drop_data     --- drop data (heterogeneous populations only)
+OUTPUTS = ('summary', 'clone_summary', 'analytics', 'plot_data',
+           'plots', 'tree', 'drop_data')
 
 # mutation effect thresholds below which mutations will be classed as 'neutral'
 # for instance if a threshold == 0.05, a mutation must change the
@@ -0,0 +1,249 @@
+"""
+Plot distributions of clone and run data across a test group.
+
+A test group's run summaries (see summarise.load_results) and
+clone summaries (the per-run `data/<stage>_clone_summary.csv`
+files, and the clone_summaries table of any results database)
+are loaded once into two DataFrames. Every figure is drawn from
+this shared dataset, which is also cached (as a pickle in the
+test group directory) and reused by later invocations, until
+any of the files it was loaded from changes.
+
+Distributions are grouped by param set, and labelled by each
+param set's initial mutation rate. The available figures, which
+replace the homogeneous_misc/distribution_*.py scripts, are
+
+    mutation      : end mutation rates of clones
+    proliferation : end proliferation rates of clones
+    midend        : mid and end mutation rates of clones,
+                    as two separate figures
+    join          : mid and end mutation (and proliferation)
+                    rates of clones, side by side
+    times         : time to reach full size, crash time and
+                    recovery time of runs
+
+As in the old dist.dat pipeline, only clones of at least
+`--min_size` cells, and with rates below one, are included.
+
+Usage:
+
+    python distributions.py TEST_GROUP_DIR [--figures times join ...]
+"""
+from __future__ import print_function
+import argparse
+import glob
+import os
+import sqlite3
+try:
+    import cPickle as pickle
+except ImportError:
+    import pickle
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+import pandas as pd
+from summarise import find_results_tables, load_results
+
+DATASET_CACHE_FNAME = "distributions_cache.pkl"
+
+FIGURES = ('mutation', 'proliferation', 'midend', 'join', 'times')
+
+# columns of the run summaries plotted by the 'times' figure
+TIME_COLUMNS = [('pre_crash_max_time', "pre", "time taken to reach full size"),
+                ('post_crash_min_time', "crash", "time taken until crash"),
+                ('post_crash_max_time', "post", "time taken until recovery")]
+
+RATE_NAMES = {'mut_rate': "Mutation", 'prolif_rate': "Proliferation"}
+
+
+def find_clone_summaries(test_group_dir):
+    """Find the clone summary files of all runs in a test group."""
+    pattern = os.path.join(test_group_dir, "*", "*", "data",
+                           "*_clone_summary.csv")
+    return sorted(glob.glob(pattern))
+
+
+def source_signature(fpaths):
+    """Identify the current version of a set of files."""
+    return sorted((fpath, os.path.getmtime(fpath), os.path.getsize(fpath))
+                  for fpath in fpaths)
+
+
+def strip_padding(dirname):
+    """Convert a zero-padded directory name to a param set / run number."""
+    return dirname.lstrip('0') or '0'
+
+
+def load_clone_summaries(test_group_dir):
+    """Load all clone summaries for a test group into one DataFrame."""
+    tables = []
+    for fpath in find_clone_summaries(test_group_dir):
+        data_dir = os.path.dirname(fpath)
+        run_dir = os.path.dirname(data_dir)
+        param_set_dir = os.path.dirname(run_dir)
+        table = pd.read_csv(fpath)
+        table['param_set'] = strip_padding(os.path.basename(param_set_dir))
+        table['run_number'] = int(strip_padding(os.path.basename(run_dir)))
+        table['stage'] = os.path.basename(fpath)[:-len("_clone_summary.csv")]
+        tables.append(table)
+    for db_path in find_results_tables(test_group_dir)[1]:
+        conn = sqlite3.connect(db_path)
+        try:
+            tables.append(pd.read_sql_query("SELECT * FROM clone_summaries", conn))
+        finally:
+            conn.close()
+    if not tables:
+        raise IOError("No clone summaries found under {}".format(test_group_dir))
+
+    clones = pd.concat(tables, ignore_index=True)
+    clones['param_set'] = clones['param_set'].astype(str)
+    return clones.drop_duplicates(subset=['param_set', 'run_number',
+                                          'stage', 'clone_id'], keep='last')
+
+
+def load_dataset(test_group_dir, use_cache=True):
+    """
+    Load a test group's run and clone summaries.
+
+    Returns
+    -------
+    2-tuple of DataFrames (results, clones). The dataset is
+    read from the cache if the cache is up to date; otherwise
+    it is loaded from the results and clone summary files,
+    and (if `use_cache`) written to the cache.
+    """
+    csv_paths, db_paths = find_results_tables(test_group_dir)
+    sources = csv_paths + db_paths + find_clone_summaries(test_group_dir)
+    signature = source_signature(sources)
+    cache_fpath = os.path.join(test_group_dir, DATASET_CACHE_FNAME)
+
+    if use_cache and os.path.exists(cache_fpath):
+        with open(cache_fpath, 'rb') as cache_file:
+            cached = pickle.load(cache_file)
+        if cached['signature'] == signature:
+            return cached['results'], cached['clones']
+
+    results = load_results(test_group_dir)
+    clones = load_clone_summaries(test_group_dir)
+    if use_cache:
+        with open(cache_fpath, 'wb') as cache_file:
+            pickle.dump({'signature': signature,
+                         'results': results, 'clones': clones},
+                        cache_file, pickle.HIGHEST_PROTOCOL)
+    return results, clones
+
+
+def param_set_labels(results):
+    """Order param sets by initial mutation rate, and label them by it."""
+    mut_rates = results.groupby('param_set')['mut_rate'].first()
+    mut_rates = mut_rates.sort_values()
+    return list(mut_rates.index), ["{:g}".format(rate) for rate in mut_rates]
+
+
+def clone_rates(clones, param_sets, stage, rate_col, min_size):
+    """Get one array of clone rates per param set, for a given stage."""
+    selected = clones[(clones['stage'] == stage) &
+                      (clones['size'] >= min_size) &
+                      (clones[rate_col] < 1)]
+    by_param_set = selected.groupby('param_set')[rate_col]
+    return [by_param_set.get_group(param_set).values
+            if param_set in by_param_set.groups else []
+            for param_set in param_sets]
+
+
+def make_boxplot(data, labels, filename, title, ylabel, log=False):
+    """Draw one box per group of values."""
+    fig, ax = plt.subplots()
+    ax.boxplot(data)
+    ax.set_xticklabels(labels, rotation='vertical', fontsize=9)
+    ax.set_xlabel("Initial Mutation Rates", fontsize=9)
+    ax.set_ylabel(ylabel, fontsize=9)
+    if log:
+        ax.set_yscale('log')
+    plt.title(title, fontsize=9)
+    fig.tight_layout()
+    fig.savefig(filename)
+    print("PLOT CREATED: " + filename)
+    plt.close(fig)
+
+
+def plot_stage_rates(clones, results, out_prefix, stage, rate_col, min_size):
+    """Plot one stage's clone rates, by param set."""
+    param_sets, labels = param_set_labels(results)
+    rate_name = RATE_NAMES[rate_col]
+    make_boxplot(clone_rates(clones, param_sets, stage, rate_col, min_size),
+                 labels, "{0}{1}_{2}_boxplot.png".format(out_prefix, stage, rate_col),
+                 "Distribution of {0} {1} rates categorised by initial "
+                 "mutation rate".format(stage, rate_name.lower()),
+                 "{0} {1} Rates".format(stage.title(), rate_name))
+
+
+def plot_joined_rates(clones, results, out_prefix, rate_col, min_size):
+    """Plot mid and end clone rates side by side, by param set."""
+    param_sets, labels = param_set_labels(results)
+    mid_rates = clone_rates(clones, param_sets, "mid", rate_col, min_size)
+    end_rates = clone_rates(clones, param_sets, "end", rate_col, min_size)
+    data = []
+    joined_labels = []
+    for label, mid, end in zip(labels, mid_rates, end_rates):
+        data += [mid, end]
+        joined_labels += [label + " mid", label + " end"]
+    rate_name = RATE_NAMES[rate_col]
+    make_boxplot(data, joined_labels,
+                 "{0}join_{1}_boxplot.png".format(out_prefix, rate_col),
+                 "Distribution of mid and end {0} rates categorised by "
+                 "initial mutation rate".format(rate_name.lower()),
+                 "{0} Rates".format(rate_name), log=True)
+
+
+def plot_times(results, out_prefix):
+    """Plot the distributions of run timings, by param set."""
+    param_sets, labels = param_set_labels(results)
+    by_param_set = results.groupby('param_set')
+    for col, suffix, desc in TIME_COLUMNS:
+        data = [by_param_set.get_group(param_set)[col].values
+                for param_set in param_sets]
+        make_boxplot(data, labels,
+                     "{0}{1}_boxplot.png".format(out_prefix, suffix),
+                     "distribution of {} categorised by mutation rate".format(desc),
+                     "Time", log=True)
+
+
+def make_figures(results, clones, figures, out_prefix, min_size):
+    """Draw the named figures from a loaded dataset."""
+    for figure in figures:
+        if figure == 'mutation':
+            plot_stage_rates(clones, results, out_prefix, "end", 'mut_rate', min_size)
+        elif figure == 'proliferation':
+            plot_stage_rates(clones, results, out_prefix, "end", 'prolif_rate', min_size)
+        elif figure == 'midend':
+            for stage in ("mid", "end"):
+                plot_stage_rates(clones, results, out_prefix, stage, 'mut_rate', min_size)
+        elif figure == 'join':
+            for rate_col in ('mut_rate', 'prolif_rate'):
+                plot_joined_rates(clones, results, out_prefix, rate_col, min_size)
+        elif figure == 'times':
+            plot_times(results, out_prefix)
+        else:
+            raise ValueError("Unknown figure: {}".format(figure))
+
+
+def main():
+    """Plot distributions of clone and run data across a test group."""
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument('test_group_dir')
+    parser.add_argument('--figures', nargs='+', choices=FIGURES,
+                        default=list(FIGURES))
+    parser.add_argument('-o', '--output', default='',
+                        help="prefix for figure filenames")
+    parser.add_argument('--min_size', type=int, default=100)
+    parser.add_argument('--no_cache', action="store_true", default=False)
+    opt = parser.parse_args()
+
+    results, clones = load_dataset(opt.test_group_dir,
+                                   use_cache=not opt.no_cache)
+    make_figures(results, clones, opt.figures, opt.output, opt.min_size)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,32 +1,43 @@
 from __future__ import print_function
 import csv
+import clonetable
 
 
-def drop(subpop, results_dir, label):
-    ## print info for multiple populations
-    ## print by colour of population
-    #summary for all runs - add value and overwrite
+DROP_COLOURS = ['LightGray', 'Gray', 'LightSkyBlue', 'RoyalBlue',
+                'LightSeaGreen', 'MediumSeaGreen', 'Khaki', 'Goldenrod',
+                'Tomato', 'PaleVioletRed', 'DarkViolet']
 
-    cols_sizes = subpop.get_clone_attrs_as_list(["col", "size"])
 
-    cols_sizes.sort()
+def colour_totals(table):
+    """
+    Count the living cells of each colour in DROP_COLOURS.
 
-    colours = ['LightGray', 'Gray', 'LightSkyBlue', 'RoyalBlue',
-               'LightSeaGreen', 'MediumSeaGreen', 'Khaki', 'Goldenrod',
-               'Tomato', 'PaleVioletRed', 'DarkViolet']
+    `table` is a tree table (see clonetable.tree_table).
+    """
+    clones = clonetable.living_clones(table)
 
-    col_totals = [0 for col in colours]
+    unknown_cols = set(clones["col"].tolist()) - set(DROP_COLOURS)
+    if unknown_cols:
+        raise ValueError("Unknown clone colour(s): {}".format(sorted(unknown_cols)))
 
     #merge colours, super lazynaive method
     #will eventually change whole color sys to be dynamic
 
-    for col, size in cols_sizes:
-        col_totals[colours.index(col)] += size
+    return [int(clones["size"][clones["col"] == col].sum())
+            for col in DROP_COLOURS]
+
+
+def drop(table, results_dir, label):
+    ## print info for multiple populations
+    ## print by colour of population
+    #summary for all runs - add value and overwrite
+
+    col_totals = colour_totals(table)
 
     drop_fpath = "{0}/{1}dropdata.csv".format(results_dir, label)
     drop_file = open(drop_fpath, 'a')
     drop_writer = csv.writer(drop_file)
-    drop_writer.writerow(colours)
+    drop_writer.writerow(DROP_COLOURS)
     drop_writer.writerow(col_totals)
     drop_file.close()
 
@@ -0,0 +1,377 @@
+"""
+Pack a test group's runs into array jobs, and run them.
+
+run_test_group_cluster.sh submits one PBS job per param set, each
+running its param set's replicates one after another, under one
+walltime for every param set. A param set of short runs then
+holds a node far longer than it needs, while a param set of long
+runs may not finish in time.
+
+Instead, this packs every run of a test group into chunks, each
+to be run by one task of a PBS array job, on a node with
+`--cores_per_node` cores. Runs are packed longest first (as
+predicted by a runtime model; see runtime_model and sweep), each
+onto the least loaded core of the first chunk in which it still
+finishes within `--target_walltime`. The array job's walltime is
+set from the longest chunk, with a safety margin.
+
+Predicted runtimes can only be trusted when the runtime model has
+been fitted to earlier runs, recorded in the results databases
+given with `--history`. Without them, runs are instead packed by
+count, `--runs_per_core` to each core of a chunk, and the array
+job's walltime is `--target_walltime` itself.
+
+Generating the jobs makes the test group directory (as sweep.py
+and run_test_group.sh do), a manifest of the chunks, and a PBS
+script to submit:
+
+    python jobpack.py generate [--cores_per_node 8] [--target_walltime 12:00:00]
+        [--history RESULTS_DB ...] [--runs_per_core 1]
+        TEST_GROUP RUNS_PER_PARAM_SET CONFIG_FILE
+    qsub PBS-TEST_GROUP.sh
+
+With `--resume TEST_GROUP_DIR`, only the runs of an existing test
+group which have not finished are packed (see sweep).
+
+Each array task runs its chunk in a pool of warm worker processes
+(see workerpool), one per core:
+
+    python jobpack.py run MANIFEST CHUNK
+
+The same manifest can be run on a workstation, without PBS, by
+running each chunk as the array tasks would, `--tasks` at a time:
+
+    python jobpack.py local [--tasks 1] MANIFEST
+"""
+from __future__ import print_function
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+import sweep
+import workerpool
+from utils import hms_to_secs, make_path_unless_exists
+
+MANIFEST_FNAME = "jobs.json"
+
+DEFAULT_CORES_PER_NODE = 8
+DEFAULT_TARGET_WALLTIME = "12:00:00"
+DEFAULT_RUNS_PER_CORE = 1
+
+# walltime requested, as a multiple of the longest
+# chunk's predicted runtime, and at least this many seconds
+WALLTIME_MARGIN = 1.5
+MIN_WALLTIME = 600
+
+# seconds between checks on local tasks
+POLL_INTERVAL = 1.0
+
+PBS_TEMPLATE = """\
+#!/bin/bash
+#PBS -N {test_group}
+#PBS -l nodes=1:ppn={cores_per_node}
+#PBS -l walltime={walltime}
+#PBS -o {test_group}.log
+#PBS -j oe
+#PBS -t 1-{num_chunks}
+{pbs_options}
+
+cd $PBS_O_WORKDIR
+
+# if we're on the cluster, make sure correct PYTHONPATH is exported
+if [[ ! -z $PBS_SERVER ]] && [[ $PBS_SERVER == "bioinf-head.petermac.org.au" ]]; then
+  export PYTHONPATH=/usr/local/cluster/all_arch/python_libraries/production/lib/python2.7/site-packages
+  export TERM=xterm
+fi
+
+# use PBS array id to select a chunk of runs
+python2.7 jobpack.py run "{manifest}" $PBS_ARRAYID
+"""
+
+
+class Chunk(object):
+    """
+    A set of runs to be run together, one per core at a time.
+
+    Attributes
+    ----------
+    core_loads : predicted runtime, in seconds, given to each core
+    runs : the chunk's runs, as dicts with the run's job ID
+        (param set and run number), main.py arguments and
+        predicted runtime
+    """
+    def __init__(self, num_cores):
+        self.core_loads = [0.0] * num_cores
+        self.runs = []
+
+    def __repr__(self):
+        return "{}({} runs, {:.0f} sec)".format(self.__class__.__name__,
+                                                len(self.runs),
+                                                self.makespan())
+
+    def makespan(self):
+        """Predicted time for the chunk's runs to finish, in seconds."""
+        return max(self.core_loads)
+
+    def makespan_with(self, runtime):
+        """Predicted makespan if a run were added to the least loaded core."""
+        return max(self.makespan(), min(self.core_loads) + runtime)
+
+    def add(self, run):
+        """Add a run to the least loaded core."""
+        core = self.core_loads.index(min(self.core_loads))
+        self.core_loads[core] += run['predicted_runtime']
+        self.runs.append(run)
+
+
+def pack_runs(runs, num_cores, target_secs):
+    """
+    Pack runs into chunks which finish within a target time.
+
+    Runs are placed longest first, each in the first chunk
+    it fits; a run predicted to take longer than the target
+    is given a chunk of its own.
+
+    Returns
+    -------
+    A list of Chunks.
+    """
+    chunks = []
+    for run in sorted(runs, key=lambda run: -run['predicted_runtime']):
+        for chunk in chunks:
+            if chunk.makespan_with(run['predicted_runtime']) <= target_secs:
+                chunk.add(run)
+                break
+        else:
+            chunk = Chunk(num_cores)
+            chunk.add(run)
+            chunks.append(chunk)
+    return chunks
+
+
+def pack_runs_by_count(runs, num_cores, runs_per_core):
+    """
+    Pack runs into chunks of a fixed number of runs.
+
+    For when runtimes cannot be predicted: each chunk is
+    given `runs_per_core` runs for each of its cores (runs
+    are still placed longest first, as far as their nominal
+    predicted runtimes can tell).
+
+    Returns
+    -------
+    A list of Chunks.
+    """
+    runs = sorted(runs, key=lambda run: -run['predicted_runtime'])
+    chunk_size = num_cores * runs_per_core
+    chunks = []
+    for start in range(0, len(runs), chunk_size):
+        chunk = Chunk(num_cores)
+        for run in runs[start:start + chunk_size]:
+            chunk.add(run)
+        chunks.append(chunk)
+    return chunks
+
+
+def format_walltime(secs):
+    """Format a number of seconds as a PBS walltime (H:MM:SS)."""
+    mins, secs = divmod(int(secs + 0.5), 60)
+    hours, mins = divmod(mins, 60)
+    return "{:d}:{:02d}:{:02d}".format(hours, mins, secs)
+
+
+def generate(opt, test_group_dir, configs):
+    """
+    Pack a test group's runs, and write their manifest and PBS script.
+
+    Returns
+    -------
+    2-tuple (manifest_path, pbs_script_path).
+    """
+    test_group_sweep = sweep.Sweep(opt, test_group_dir, configs)
+    runs = []
+    for pset in test_group_sweep.param_sets:
+        sweep.write_param_set_config(pset, opt.test_group, test_group_dir)
+        for run_number in range(1, opt.runs_per_param_set + 1):
+            if run_number in pset.started_runs:
+                # finished before the test group was resumed
+                continue
+            runs.append({'job_id': [pset.number, run_number],
+                         'args': test_group_sweep.run_args(pset, run_number),
+                         'predicted_runtime': pset.predicted_runtime})
+
+    if not runs:
+        raise SystemExit("Every run of test group {} has finished".format(opt.test_group))
+
+    target_secs = hms_to_secs(opt.target_walltime)
+    if test_group_sweep.runtime_model.num_training_runs:
+        chunks = pack_runs(runs, opt.cores_per_node, target_secs)
+        longest = max(chunk.makespan() for chunk in chunks)
+        walltime = format_walltime(max(WALLTIME_MARGIN * longest, MIN_WALLTIME))
+    else:
+        # nominal runtimes are no basis for a walltime
+        print("No runtime history (see --history); packing {} runs "
+              "per core".format(opt.runs_per_core))
+        chunks = pack_runs_by_count(runs, opt.cores_per_node, opt.runs_per_core)
+        walltime = format_walltime(target_secs)
+
+    manifest = {'test_group': opt.test_group,
+                'test_group_dir': test_group_dir,
+                'cwd': os.getcwd(),
+                'cores_per_node': opt.cores_per_node,
+                'walltime': walltime,
+                'chunks': [chunk.runs for chunk in chunks]}
+    manifest_path = os.path.join(test_group_dir, MANIFEST_FNAME)
+    with open(manifest_path, 'w') as manifest_file:
+        json.dump(manifest, manifest_file, indent=1)
+
+    pbs_options = []
+    if opt.queue:
+        pbs_options.append("#PBS -q " + opt.queue)
+    if opt.mail:
+        pbs_options += ["#PBS -m ae", "#PBS -M " + opt.mail]
+    pbs_script_path = "PBS-{}.sh".format(opt.test_group)
+    with open(pbs_script_path, 'w') as pbs_script:
+        pbs_script.write(PBS_TEMPLATE.format(test_group=opt.test_group,
+                                             cores_per_node=opt.cores_per_node,
+                                             walltime=walltime,
+                                             num_chunks=len(chunks),
+                                             pbs_options="\n".join(pbs_options),
+                                             manifest=manifest_path))
+
+    print("Packed {} runs into {} chunks of {} cores; "
+          "walltime {}".format(len(runs), len(chunks), opt.cores_per_node,
+                               walltime))
+    return manifest_path, pbs_script_path
+
+
+def load_manifest(manifest_path):
+    """Load a job manifest written by generate()."""
+    with open(manifest_path) as manifest_file:
+        return json.load(manifest_file)
+
+
+def run_chunk(manifest, chunk_num, num_workers=None):
+    """
+    Run a chunk of a manifest (counting from 1) in a pool of workers.
+
+    Returns
+    -------
+    The number of runs which failed.
+    """
+    runs = manifest['chunks'][chunk_num - 1]
+    pool = workerpool.WorkerPool(num_workers or manifest['cores_per_node'])
+    pool.start()
+    num_failed = 0
+    try:
+        # runs were packed longest first, so are started in that order
+        for run in runs:
+            pool.submit(tuple(run['job_id']), run['args'], manifest['cwd'])
+        num_finished = 0
+        while num_finished < len(runs):
+            state, job_id, detail = pool.get_event()
+            if state == 'running':
+                continue
+            num_finished += 1
+            ps_number, run_number = job_id
+            if state == 'failed':
+                num_failed += 1
+                print("PARAM SET {} RUN {} FAILED ({}):\n{}".format(ps_number,
+                                                                    run_number,
+                                                                    detail['cause'],
+                                                                    detail['message']))
+            else:
+                print("PARAM SET {} RUN {} DONE".format(ps_number, run_number))
+            sys.stdout.flush()
+    finally:
+        pool.close()
+    return num_failed
+
+
+def run_local(manifest_path, num_tasks=1):
+    """
+    Run every chunk of a manifest on this machine, as array tasks would.
+
+    Each chunk is run by a separate `jobpack.py run` process,
+    with up to `num_tasks` running at once; each task's output
+    is written to `<test_group_dir>/jobs/chunk_<N>.log`.
+
+    Returns
+    -------
+    The chunk numbers of the tasks which failed.
+    """
+    manifest = load_manifest(manifest_path)
+    log_dir = os.path.join(manifest['cwd'], manifest['test_group_dir'], "jobs")
+    make_path_unless_exists(log_dir)
+    script_path = os.path.abspath(__file__).replace(".pyc", ".py")
+
+    pending = list(range(1, len(manifest['chunks']) + 1))
+    running = {}
+    failed = []
+    while pending or running:
+        while pending and len(running) < num_tasks:
+            chunk_num = pending.pop(0)
+            log_path = os.path.join(log_dir, "chunk_{}.log".format(chunk_num))
+            with open(log_path, 'w') as log_file:
+                running[chunk_num] = subprocess.Popen([sys.executable, script_path,
+                                                       'run', manifest_path,
+                                                       str(chunk_num)],
+                                                      stdout=log_file,
+                                                      stderr=subprocess.STDOUT)
+            print("CHUNK {} STARTED".format(chunk_num))
+        time.sleep(POLL_INTERVAL)
+        for chunk_num, task in list(running.items()):
+            if task.poll() is None:
+                continue
+            del running[chunk_num]
+            if task.returncode != 0:
+                failed.append(chunk_num)
+            print("CHUNK {} {}".format(chunk_num,
+                                       "DONE" if task.returncode == 0 else "FAILED"))
+        sys.stdout.flush()
+    return failed
+
+
+def main_cli():
+    """Pack a test group's runs into array jobs, or run packed jobs."""
+    parser = argparse.ArgumentParser(description=main_cli.__doc__)
+    commands = parser.add_subparsers(dest='command')
+
+    generate_cmd = commands.add_parser('generate')
+    sweep.add_test_group_arguments(generate_cmd)
+    generate_cmd.add_argument('--cores_per_node', type=int,
+                              default=DEFAULT_CORES_PER_NODE)
+    generate_cmd.add_argument('--target_walltime', default=DEFAULT_TARGET_WALLTIME)
+    generate_cmd.add_argument('--runs_per_core', type=int,
+                              default=DEFAULT_RUNS_PER_CORE)
+    generate_cmd.add_argument('--queue', default=None)
+    generate_cmd.add_argument('--mail', default=None)
+
+    run_cmd = commands.add_parser('run')
+    run_cmd.add_argument('manifest')
+    run_cmd.add_argument('chunk', type=int)
+    run_cmd.add_argument('--workers', type=int, default=None)
+
+    local_cmd = commands.add_parser('local')
+    local_cmd.add_argument('manifest')
+    local_cmd.add_argument('--tasks', type=int, default=1)
+    opt = parser.parse_args()
+
+    if opt.command == 'generate':
+        # only needed by the Sweep the runs are laid out by
+        opt.workers = opt.cores_per_node
+        test_group_dir, configs = sweep.setup_test_group(generate_cmd, opt)
+        generate(opt, test_group_dir, configs)
+    elif opt.command == 'run':
+        if run_chunk(load_manifest(opt.manifest), opt.chunk, opt.workers):
+            raise SystemExit(1)
+    elif opt.command == 'local':
+        failed = run_local(opt.manifest, opt.tasks)
+        if failed:
+            raise SystemExit("Chunks failed: {}".format(", ".join(map(str, failed))))
+
+
+if __name__ == '__main__':
+    main_cli()
@@ -0,0 +1,153 @@
+"""
+Run simulations from Python, in memory.
+
+simulate() takes a dict of simulation parameters, named as
+main.py's command line options are (e.g. 'pro', 'init_size',
+'select_pressure'), runs the simulation in the calling process,
+and returns a RunResult holding the run's summary values and
+analytics, and optionally its final clone table:
+
+    import library
+    result = library.simulate({'init_size': 25, 'max_cycles': 20000,
+                               'select_time': 10000})
+    result.summary['recov_type'], result.analytics['tumoursize']
+
+A seeded run can be cached (see runcache), by giving a
+'cache_dir' parameter; a cached run is returned without being
+simulated again, unless its clone table is asked for.
+
+Unlike a run started by main.py, nothing is written to the
+filesystem, unless it is asked for: `outputs` names any of the
+files a run can write (see constants.OUTPUTS), in which case
+'test_group_dir', 'param_set_dir' and 'run_dir' should be given
+as parameters too. Status updates are not printed.
+"""
+import numpy as np
+import main
+import clonetable
+import runcache
+import simulator
+from plotdata import ANALYTICS_ATTRS
+from utils import make_run_dir
+
+# identifiers and directories required by main.py, but
+# only used by a library run if it writes any outputs
+PLACEHOLDER_ARGS = ['--test_group', 'library', '--param_set', '1',
+                    '--run_number', '1', '--test_group_dir', '.',
+                    '--param_set_dir', '.', '--run_dir', '.',
+                    '--init_size', '0']
+
+# parameters set by flags which take a value, e.g.
+# `--init_diversity SUB_FILE`, and the flags they set
+FLAG_PARAMS = {'sub_file': 'init_diversity',
+               'snapshot_archive': 'load_snapshot'}
+
+
+class RunResult(object):
+    """
+    The results of a simulation run.
+
+    Attributes
+    ----------
+    opt : the full parameter set the simulation ran with
+    summary : OrderedDict of summary values, keyed by
+        constants.SUMMARY_COLUMNS (as written to the results
+        files by main.py)
+    analytics : dict of NumPy arrays, one value per cycle,
+        keyed by analytics attribute (time, tumoursize, ...)
+    end_condition : why the simulation ended (see constants)
+    runtime : simulation runtime in seconds
+    clones : the final tree table (see clonetable.tree_table),
+        if it was asked for, or else None
+    """
+    def __init__(self, opt, summary, analytics, end_condition, runtime,
+                 clones=None):
+        self.opt = opt
+        self.summary = summary
+        self.analytics = analytics
+        self.end_condition = end_condition
+        self.runtime = runtime
+        self.clones = clones
+
+    def __repr__(self):
+        return "{}({}, {} cycles, {})".format(self.__class__.__name__,
+                                              self.summary['recov_type'],
+                                              self.summary['elapsed_cycles'],
+                                              self.end_condition)
+
+
+def make_options(params, outputs=()):
+    """
+    Make a parameter set, as main.py would, from a dict of parameters.
+
+    Parameters not in `params` take main.py's default values.
+    Either 'init_size' or 'sub_file' must be given.
+
+    Raises
+    ------
+    ValueError: if a parameter is not one of main.py's options,
+        or no initial population is given.
+    """
+    opt = main.parse_cmd_line_args(PLACEHOLDER_ARGS)
+    # the placeholder initial size only satisfies the parser
+    opt.init_size = None
+    opt.outputs = list(outputs)
+    opt.quiet = True
+
+    for name, val in params.items():
+        if not hasattr(opt, name) and name not in FLAG_PARAMS:
+            raise ValueError("unknown simulation parameter: {}".format(name))
+        setattr(opt, name, val)
+        if name in FLAG_PARAMS:
+            setattr(opt, FLAG_PARAMS[name], True)
+
+    if opt.init_size is None and not opt.init_diversity:
+        raise ValueError("either init_size or sub_file must be given")
+    return opt
+
+
+def simulate(params, outputs=(), keep_clones=False):
+    """
+    Run a simulation in memory.
+
+    Args
+    ----
+    params : dict of simulation parameters (see make_options)
+    outputs : files to write (see constants.OUTPUTS); none by default
+    keep_clones : whether to return the final clone table
+
+    Returns
+    -------
+    A RunResult.
+    """
+    opt = make_options(params, outputs)
+    if opt.outputs:
+        make_run_dir(opt.run_dir)
+        if 'summary' in opt.outputs:
+            main.initialise_results(opt)
+
+    cache_key = None
+    if opt.cache_dir:
+        cache_key = runcache.run_key(opt)
+    if cache_key and not keep_clones:
+        cached = runcache.load_run(opt.cache_dir, cache_key)
+        if cached:
+            summary = main.write_cached_run(opt, cached)
+            return RunResult(opt, summary, cached.analytics,
+                             cached.end_condition, cached.runtime)
+
+    sim = simulator.Simulator(opt)
+    sim.run(sim.start_cycle)
+    # as in main.run_simulation, a run whose pruning was forced
+    # on may differ from the run its cache key describes
+    if cache_key and not sim.forced_pruning:
+        runcache.save_run(opt.cache_dir, cache_key, sim)
+
+    anlt = sim.popn.analytics_base
+    analytics = dict((name, np.array(getattr(anlt, name)))
+                     for name in ANALYTICS_ATTRS)
+    clones = None
+    if keep_clones:
+        clones = clonetable.tree_table(sim.popn.subpop)
+    return RunResult(sim.opt, sim.summary, analytics, sim.end_condition,
+                     sim.runtime, clones)
@@ -21,11 +21,22 @@ matplotlib.use('Agg')
 
 import argparse
 import os
+import sys
 import csv
+from collections import OrderedDict
 import simulator
+import resources
+import results_store
+import runcache
+from analytics import Analytics
+from plotdata import MAX_PLOT_CLONES, MAX_PLOT_POINTS
+from constants import SUMMARY_COLUMNS, RESOURCE_COLUMNS, OUTPUTS
 
+# exit status of a run stopped by its hard memory limit
+EXIT_MEMORY_LIMIT = 3
 
-def main():
+
+def main(args=None):
     """
     Create results files and run simulation with given params.
 
@@ -37,25 +48,104 @@ def main():
 
     Args
     ----
-    None
+    args : list of command line arguments
+        (defaults to sys.argv[1:])
 
     Returns
     -------
     None
     """
     # get parameters
-    opt = parse_cmd_line_args()
+    opt = parse_cmd_line_args(args)
+    try:
+        run_simulation(opt)
+    except resources.MemoryLimitExceeded as err:
+        # a checkpoint has been written; exit distinctly, so
+        # that scripts can tell the run may be resumed
+        print(err)
+        sys.exit(EXIT_MEMORY_LIMIT)
 
+
+def run_simulation(opt):
+    """
+    Create results files, and run a simulation with a given parameter set.
+
+    With a run cache (see runcache), a seeded run which has
+    been cached is not simulated again; its cached results
+    are recorded instead. Otherwise, its results are cached
+    once it finishes.
+
+    Returns
+    -------
+    The run's summary values, as an OrderedDict keyed
+    by constants.SUMMARY_COLUMNS.
+    """
     # TODO move this initialisation to simulator?
     initialise_results(opt)
 
+    cache_key = None
+    if opt.cache_dir:
+        cache_key = runcache.run_key(opt)
+    if cache_key:
+        cached = runcache.load_run(opt.cache_dir, cache_key)
+        if cached:
+            print("Using cached results for run {}".format(cache_key))
+            return write_cached_run(opt, cached)
+
     # create and run simulation
     sim = simulator.Simulator(opt)
     sim.print_info()
     sim.run(sim.start_cycle)
 
+    # a run whose pruning was forced on by its memory limit
+    # may differ from the run its cache key describes
+    if cache_key and not sim.forced_pruning:
+        runcache.save_run(opt.cache_dir, cache_key, sim)
+    return sim.summary
+
+
+def write_cached_run(opt, cached):
+    """
+    Record a cached run's results as this run's.
+
+    Only the summary and analytics data are cached, so only
+    those outputs are written. The resources the cached run
+    used (constants.RESOURCE_COLUMNS) are left blank, as this
+    run did not use them.
 
-def parse_cmd_line_args():
+    Returns
+    -------
+    The summary values recorded for this run.
+    """
+    summary = OrderedDict((col, cached.summary.get(col)) for col in SUMMARY_COLUMNS)
+    summary['param_set'] = opt.param_set
+    summary['run_number'] = opt.run_number
+    for col in RESOURCE_COLUMNS:
+        summary[col] = None
+    summary_vals = list(summary.values())
+
+    if 'summary' in opt.outputs:
+        if opt.results_backend == 'sqlite':
+            store = results_store.ResultsStore(results_paths(opt)[0],
+                                               opt.param_set, opt.run_number)
+            store.add_summary(summary_vals)
+            store.add_run_metadata(vars(opt))
+            store.flush()
+        else:
+            for summary_path in results_paths(opt):
+                with open(summary_path, 'a') as summary_file:
+                    csv.writer(summary_file).writerow(summary_vals)
+
+    if 'analytics' in opt.outputs:
+        anlt = Analytics()
+        for name, vals in cached.analytics.items():
+            setattr(anlt, name, vals.tolist())
+        anlt.write_to_file("{0}/data/analytics_data.csv".format(opt.run_dir))
+
+    return summary
+
+
+def parse_cmd_line_args(args=None):
     """
     Parse simulation parameters from command line.
 
@@ -65,6 +155,9 @@ def parse_cmd_line_args():
 
     Args
     ----
+    args : list of command line arguments to parse
+        (defaults to sys.argv[1:])
+
     The accepted command line arguments
     are as follows:
 
@@ -184,6 +277,44 @@ def parse_cmd_line_args():
         SNAPSHOT_ARCHIVE specifies the filepath of the
         snapshot archive.
 
+    MEMORY
+    ======
+    memory_soft_limit : float
+        Memory use (RSS), in MB, past which clone pruning
+        is switched on and memory compacted (0 to disable).
+    memory_hard_limit : float
+        Memory use (RSS), in MB, past which the run writes
+        a checkpoint and stops, exiting with status
+        EXIT_MEMORY_LIMIT (0 to disable).
+
+    CHECKPOINTING
+    =============
+    checkpoint_every : int
+        Write a checkpoint every this many cycles
+        (0 to disable).
+    checkpoint_interval : float
+        Write a checkpoint every this many minutes
+        of runtime (0 to disable).
+    checkpoint_keep : int
+        Number of most recent checkpoints to keep.
+    resume : bool
+        Continue the run from the newest valid
+        checkpoint in the run directory, if there is one.
+
+    SEEDING/CACHING
+    ===============
+    seed : int
+        Seed for the random number generators (by
+        default, runs are not seeded)
+    cache_dir : string
+        Directory of a run cache (see runcache); seeded
+        runs already in the cache are not run again
+    precrash_library : string
+        Directory of a pre-crash population library (see
+        precrash); seeded runs store their population there
+        as treatment is introduced, and runs with the same
+        pre-treatment parameters and seed start from it
+
     SCALING
     =======
     scale : float
@@ -201,6 +332,31 @@ def parse_cmd_line_args():
         Prune tree while running for larger executions
     --NP: bool
         Don't print plots for this simulation
+    tree_format : string
+        Format(s) for exported phylogenetic trees:
+        phyloxml, newick or both
+    gzip_trees : bool
+        Compress exported phylogenetic trees with gzip
+    results_backend : string
+        Where to record run summaries and drop data: 'csv'
+        (append to shared CSV files) or 'sqlite' (a test
+        group database, safe for parallel runs; see results_store)
+    sync_output : bool
+        Write outputs at treatment introduction in the simulation
+        process, rather than in a background worker process
+    max_plot_clones : int
+        Maximum number of clones drawn in per-clone plots
+        (lifespans, circles); above this, the plots are
+        downsampled. 0 means no limit
+    max_plot_points : int
+        Approximate maximum number of points drawn in time
+        series plots; longer series are downsampled, keeping
+        the crash minimum and recovery peak. 0 means no limit
+    outputs : list of strings
+        Which files to write (see constants.OUTPUTS); by
+        default, all of them
+    quiet : bool
+        Don't print status updates while running
 
     Returns
     -------
@@ -289,6 +445,25 @@ def parse_cmd_line_args():
                                 action=store_flag_and_vars(['snapshot_archive']),
                                 default=False, metavar="SNAPSHOT_ARCHIVE")
 
+    checkpointing = parser.add_argument_group("checkpointing")
+    checkpointing.add_argument('--checkpoint_every', type=int, default=0,
+                               metavar='CYCLES')
+    checkpointing.add_argument('--checkpoint_interval', type=float, default=0.0,
+                               metavar='MINUTES')
+    checkpointing.add_argument('--checkpoint_keep', type=int, default=2)
+    checkpointing.add_argument('--resume', action="store_true", default=False)
+
+    memory = parser.add_argument_group("memory")
+    memory.add_argument('--memory_soft_limit', type=float, default=0.0,
+                        metavar='MB')
+    memory.add_argument('--memory_hard_limit', type=float, default=0.0,
+                        metavar='MB')
+
+    seeding = parser.add_argument_group("seeding/caching")
+    seeding.add_argument('--seed', type=int, default=None)
+    seeding.add_argument('--cache_dir', default=None)
+    seeding.add_argument('--precrash_library', default=None, metavar='DIR')
+
     scaling = parser.add_argument_group("scaling")
     scaling.add_argument('--scale', type=float, default=0.5)
     scaling.add_argument('--mscale', type=float, default=1.0)
@@ -298,21 +473,51 @@ def parse_cmd_line_args():
     misc.add_argument('--auto_treatment', '--M', action="store_true", default=False)
     misc.add_argument('--prune_clones', '--Z', action="store_true", default=False)
     misc.add_argument('--no_plots', '--NP', action="store_true", default=False)
+    misc.add_argument('--tree_format', default='phyloxml',
+                      choices=['phyloxml', 'newick', 'both'])
+    misc.add_argument('--gzip_trees', action="store_true", default=False)
+    misc.add_argument('--results_backend', default='csv',
+                      choices=['csv', 'sqlite'])
+    misc.add_argument('--sync_output', action="store_true", default=False)
+    misc.add_argument('--max_plot_clones', type=int,
+                      default=MAX_PLOT_CLONES)
+    misc.add_argument('--max_plot_points', type=int,
+                      default=MAX_PLOT_POINTS)
+    misc.add_argument('--outputs', nargs='+', choices=OUTPUTS,
+                      default=list(OUTPUTS))
+    misc.add_argument('--quiet', action="store_true", default=False)
+
+    return parser.parse_args(args)
+
+
+def results_paths(opt):
+    """
+    Get the paths of the files a run records its results in.
 
-    return parser.parse_args()
-
-
-def initialise_results(opt):
-    """Create summary files, unless they already exist."""
+    These are the test group's results database, with the
+    SQLite backend, or else the test group and param set
+    summary files.
+    """
+    if opt.results_backend == 'sqlite':
+        return [results_store.results_db_path(opt.test_group_dir,
+                                              opt.test_group)]
     tgroup_summary_path = "{0}/{1}_results.csv".format(opt.test_group_dir,
                                                        opt.test_group)
     pset_summary_path = "{0}/{1}_{2}_results.csv".format(opt.param_set_dir,
                                                          opt.test_group,
                                                          opt.param_set)
-    if not os.path.exists(tgroup_summary_path):
-        create_results_file(tgroup_summary_path)
-    if not os.path.exists(pset_summary_path):
-        create_results_file(pset_summary_path)
+    return [tgroup_summary_path, pset_summary_path]
+
+
+def initialise_results(opt):
+    """Create summary files (or database), unless they already exist."""
+    if opt.results_backend == 'sqlite':
+        results_store.connect(results_paths(opt)[0]).close()
+        return
+
+    for summary_path in results_paths(opt):
+        if not os.path.exists(summary_path):
+            create_results_file(summary_path)
 
 
 def create_results_file(filepath):
@@ -325,10 +530,8 @@ def create_results_file(filepath):
 
     Note
     ----
-    This function specifies the column structure of the
-    results file; at some later date, it might make
-    sense to specify the structure elsewhere, and pass
-    that as an argument to this function.
+    The column structure of the results file is
+    specified by constants.SUMMARY_COLUMNS.
 
     Args
     ----
@@ -344,32 +547,13 @@ def create_results_file(filepath):
     IOError: If `filepath` is invalid.
     """
 
-    columns = ('param_set', 'run_number',
-               'went_through_crash',
-               'recovered', 'recov_type', 'recov_percent',
-               'prolif_rate', 'death_rate', 'mut_rate',
-               'crash_time', 'select_pressure',
-               'max_select_pressure',
-               'prob_ben_mut', 'prob_del_mut',
-               'prob_mut_incr', 'prob_mut_decr',
-               'pop_size', 'num_clones',
-               'dom_clone_proportion', 'avg_depth',
-               'avg_mut_rate_at_end', 'avg_prolif_rate_at_end',
-               'elapsed_time', 'elapsed_cycles',
-               'total_mutations',
-               'generated_resist_mutns', 'surviving_resist_mutns',
-               'pre_crash_min', 'pre_crash_min_time',
-               'pre_crash_max', 'pre_crash_max_time',
-               'post_crash_min', 'post_crash_min_time',
-               'post_crash_max', 'post_crash_max_time')
-
     try:
         results_file = open(filepath, "w")
     except IOError:
         raise
 
     results_writer = csv.writer(results_file)
-    results_writer.writerow(columns)
+    results_writer.writerow(SUMMARY_COLUMNS)
     results_file.close()
 
 
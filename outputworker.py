@@ -0,0 +1,148 @@
+"""
+A background process for writing a run's output files.
+
+Writing plots, phylogenetic trees, clone summaries and drop
+data can take minutes for a large tumour. Rather than blocking
+the simulation, these jobs are handed to a worker process,
+which writes them while the simulation carries on.
+
+Each job is a module-level function and its arguments, which
+are pickled and sent to the worker; the arguments must therefore
+be self-contained copies of the data to write (for instance, a
+tree table rather than the live clone tree; see clonetable).
+"""
+from __future__ import print_function
+import multiprocessing
+import sys
+import time
+import traceback
+import weakref
+
+# workers whose processes are running, so that they can
+# be stopped if their run fails (see terminate_all)
+running_workers = weakref.WeakSet()
+
+
+class OutputWorker(object):
+    """
+    Run output jobs in a background process.
+
+    The worker process is started when the first job is
+    submitted. Once the worker has been closed, or if it is
+    created with background=False, jobs are run immediately,
+    in the calling process.
+
+    Attributes
+    ----------
+    background : whether jobs are currently run in the background
+    queue : queue of jobs for the worker process
+    process : the worker process, once started
+    foreground_time : time spent running jobs in the calling
+        process, in seconds
+    background_time : shared value holding the time the worker
+        process has spent running jobs, in seconds
+    """
+    def __init__(self, background=True):
+        self.background = background
+        self.queue = None
+        self.process = None
+        self.foreground_time = 0.0
+        self.background_time = multiprocessing.Value('d', 0.0)
+
+    def output_time(self):
+        """Get the time spent running jobs so far, in seconds."""
+        return self.foreground_time + self.background_time.value
+
+    def submit(self, func, *args, **kwargs):
+        """Run func(*args, **kwargs), in the background if possible."""
+        if not self.background:
+            start_time = time.time()
+            try:
+                func(*args, **kwargs)
+            finally:
+                self.foreground_time += time.time() - start_time
+            return
+        if self.process is None:
+            self.queue = multiprocessing.Queue()
+            self.process = multiprocessing.Process(target=run_jobs,
+                                                   args=(self.queue,
+                                                         self.background_time))
+            self.process.daemon = True
+            self.process.start()
+            running_workers.add(self)
+        self.queue.put((func, args, kwargs))
+
+    def close(self):
+        """
+        Wait for all submitted jobs to finish.
+
+        Any jobs submitted after this are run immediately.
+
+        Raises
+        ------
+        RuntimeError: if any background job failed.
+        """
+        self.background = False
+        if self.process is None:
+            return
+        self.queue.put(None)
+        self.process.join()
+        self.queue.close()
+        exitcode = self.process.exitcode
+        self.process = None
+        running_workers.discard(self)
+        if exitcode != 0:
+            raise RuntimeError("Background output failed "
+                               "(worker exit code {})".format(exitcode))
+
+    def terminate(self):
+        """
+        Stop the worker process, abandoning any unfinished jobs.
+
+        This is for when the run has failed: unlike close, it does
+        not wait for the worker, nor for queued jobs to be sent to
+        it, so the calling process can exit. Any jobs submitted
+        after this are run immediately.
+        """
+        self.background = False
+        if self.process is None:
+            return
+        self.queue.cancel_join_thread()
+        self.process.terminate()
+        self.process.join()
+        self.queue.close()
+        self.process = None
+        running_workers.discard(self)
+
+
+def terminate_all():
+    """Stop every worker process still running, abandoning their jobs."""
+    for worker in list(running_workers):
+        worker.terminate()
+
+
+def run_jobs(queue, job_time):
+    """
+    Run jobs from a queue until a None job is received.
+
+    The time spent running jobs is added to the shared
+    value `job_time`. A failing job does not stop later
+    jobs from running, but the worker exits with a
+    non-zero status.
+    """
+    failed = False
+    while True:
+        job = queue.get()
+        if job is None:
+            break
+        func, args, kwargs = job
+        start_time = time.time()
+        try:
+            func(*args, **kwargs)
+        except Exception:
+            traceback.print_exc()
+            failed = True
+        with job_time.get_lock():
+            job_time.value += time.time() - start_time
+    sys.stdout.flush()
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,163 @@
+"""
+Summarise the clones of every run in a test group, by param set.
+
+This writes a `dist.dat` file in the layout produced by the
+summarise_misc/summarise_*xml.sh scripts (and read by the
+homogeneous_misc scripts): a blank first line, then for each
+param set in turn, one "prolif_rate mut_rate size" line per
+clone of at least `--min_size` cells, sorted by mutation rate,
+followed by an END line. As in an exported tree, rates are
+truncated to six characters.
+
+Rather than extracting clone sizes from the exported phyloXML
+trees, clones are read from each run's clone summary
+(`data/<stage>_clone_summary.csv`), or from the clones table
+of its pre-crash population snapshot. Runs are read in
+parallel, by a pool of worker processes.
+
+Usage:
+
+    python phylo_summary.py TEST_GROUP_DIR [--stage mid] [--min_size 100]
+"""
+from __future__ import print_function
+import argparse
+import csv
+import glob
+import multiprocessing
+import os
+import tarfile
+
+STAGES = ('end', 'mid', 'snapshot')
+
+
+def find_runs(test_group_dir):
+    """
+    Find the run directories of a test group.
+
+    Returns
+    -------
+    A list of (param set directory, list of run directories)
+    pairs, in param set order.
+    """
+    param_set_dirs = sorted(path for path in glob.glob(os.path.join(test_group_dir, "*"))
+                            if os.path.basename(path).isdigit() and os.path.isdir(path))
+    return [(param_set_dir,
+             sorted(path for path in glob.glob(os.path.join(param_set_dir, "*"))
+                    if os.path.basename(path).isdigit() and os.path.isdir(path)))
+            for param_set_dir in param_set_dirs]
+
+
+def open_clone_table(run_dir, stage):
+    """
+    Open a run's clone table for a given stage.
+
+    Returns
+    -------
+    An open file of CSV clone data, or None if the run
+    has no clone table for this stage.
+    """
+    if stage == 'snapshot':
+        archives = sorted(glob.glob(os.path.join(run_dir, "population_*.tar.gz")))
+        if not archives:
+            return None
+        popn_archive = tarfile.open(archives[-1])
+        for member in popn_archive.getmembers():
+            if member.name.startswith('clones_'):
+                return popn_archive.extractfile(member)
+        return None
+
+    fpath = os.path.join(run_dir, "data", "{}_clone_summary.csv".format(stage))
+    if not os.path.exists(fpath):
+        return None
+    return open(fpath)
+
+
+def read_run_clones(args):
+    """
+    Read the (prolif_rate, mut_rate, size) of a run's clones.
+
+    Only clones of at least `min_size` cells are included.
+    Takes a single tuple (run_dir, stage, min_size), so it
+    can be mapped over by a worker pool.
+    """
+    run_dir, stage, min_size = args
+    clone_file = open_clone_table(run_dir, stage)
+    if clone_file is None:
+        print("No {} clone table for run {}".format(stage, run_dir))
+        return []
+    try:
+        clones = []
+        for row in csv.DictReader(clone_file):
+            size = int(row['size'])
+            if size >= min_size:
+                clones.append((float(row['prolif_rate']),
+                               float(row['mut_rate']), size))
+        return clones
+    finally:
+        clone_file.close()
+
+
+def format_rate(rate):
+    """Format a rate as it appears in an exported tree."""
+    return str(rate)[0:6]
+
+
+def write_dist(test_group_dir, fpath, stage='end', min_size=100,
+               processes=None):
+    """
+    Write the clones of every run in a test group to a dist.dat file.
+
+    Args
+    ----
+    test_group_dir : the test group directory
+    fpath : path of the file to write
+    stage : 'end', 'mid' or 'snapshot'
+    min_size : clones smaller than this are left out
+    processes : number of worker processes
+        (defaults to the number of CPUs)
+    """
+    if stage not in STAGES:
+        raise ValueError("Bad value for stage: {}".format(stage))
+    runs = find_runs(test_group_dir)
+    jobs = [(run_dir, stage, min_size)
+            for _param_set_dir, run_dirs in runs for run_dir in run_dirs]
+
+    pool = multiprocessing.Pool(processes)
+    try:
+        run_clones = pool.map(read_run_clones, jobs)
+    finally:
+        pool.close()
+        pool.join()
+
+    with open(fpath, 'w') as dist_file:
+        dist_file.write("\n")
+        run_idx = 0
+        for _param_set_dir, run_dirs in runs:
+            param_set_clones = []
+            for clones in run_clones[run_idx:run_idx + len(run_dirs)]:
+                param_set_clones += clones
+            run_idx += len(run_dirs)
+            param_set_clones.sort(key=lambda clone: (clone[1], clone[0], clone[2]))
+            for prolif_rate, mut_rate, size in param_set_clones:
+                dist_file.write("{0} {1} {2}\n".format(format_rate(prolif_rate),
+                                                       format_rate(mut_rate),
+                                                       size))
+            dist_file.write("END\n")
+
+
+def main():
+    """Summarise the clones of every run in a test group, by param set."""
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument('test_group_dir')
+    parser.add_argument('-o', '--output', default='dist.dat')
+    parser.add_argument('--stage', default='end', choices=STAGES)
+    parser.add_argument('--min_size', type=int, default=100)
+    parser.add_argument('--processes', type=int, default=None)
+    opt = parser.parse_args()
+
+    write_dist(opt.test_group_dir, opt.output, opt.stage, opt.min_size,
+               opt.processes)
+
+
+if __name__ == '__main__':
+    main()
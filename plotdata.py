@@ -11,27 +11,130 @@ from __future__ import print_function
 import os
 import matplotlib
 import matplotlib.pyplot as plt
+from matplotlib.collections import EllipseCollection, LineCollection
+from matplotlib.colors import colorConverter
+import numpy as np
 import pandas as pd
+import clonetable
 
-def make_dual_plot(xdata, y1data, y2data, filename, title1, title2):
-    """Plot two dependent vars against the same independent var."""
-    df = pd.DataFrame({title1: y1data,
-                       title2: y2data},
-                      index=xdata)
+# analytics series included in plot data
+ANALYTICS_ATTRS = ["time", "tumoursize", "clonecount",
+                   "avg_mutation", "avg_proliferation", "select_pressure"]
 
-    ax = df.plot(secondary_y=[title2], linewidth=2, mark_right=False)
-    ax.set_xlabel("Discrete Time Intervals")
-    ax.set_ylabel(title1, color=ax.lines[0].get_color())
-    ax.right_ax.set_ylabel(title2, color=ax.right_ax.lines[0].get_color())
-    plt.title("{} vs {}".format(title1, title2))
+# separates the names of nested plot data in a saved plot data file
+PLOT_DATA_SEP = "/"
 
-    plt.savefig(filename)
+# default maximum number of clones drawn in a per-clone plot
+MAX_PLOT_CLONES = 10000
+
+# default (approximate) maximum number of points drawn in a time series plot
+MAX_PLOT_POINTS = 4000
+
+# circle edge colours by clone size: (exclusive lower bound, colour)
+CIRCLE_SIZE_COLOURS = [(500, 'r'), (200, 'y'), (100, 'm'), (50, 'b'), (1, 'c')]
+
+def minmax_indices(ydata, num_bins):
+    """
+    Find the indices of the minimum and maximum of each bin.
+
+    ydata is split into num_bins bins of (nearly) equal length.
+    """
+    ydata = np.asarray(ydata)
+    bin_size = -(-len(ydata) // num_bins)
+    num_full = len(ydata) // bin_size * bin_size
+    offsets = np.arange(0, num_full, bin_size)
+    blocks = ydata[:num_full].reshape(-1, bin_size)
+    indices = [offsets + blocks.argmin(axis=1),
+               offsets + blocks.argmax(axis=1)]
+    if num_full < len(ydata):
+        rest = ydata[num_full:]
+        indices.append([num_full + rest.argmin(), num_full + rest.argmax()])
+    return np.concatenate(indices)
+
+
+def downsample_indices(series, max_points=MAX_PLOT_POINTS, keep=()):
+    """
+    Choose which points of one or more time series to plot.
+
+    Each series is split into bins, and only the first and
+    last points, the minimum and maximum of each bin, and
+    any points in `keep` are plotted. The shape of each
+    series (and in particular its overall minimum and
+    maximum) is therefore preserved exactly.
+
+    Args
+    ----
+    series : list of equal-length series, plotted against
+        the same x values
+    max_points : approximate maximum number of points to
+        plot (0 means no limit)
+    keep : indices of points which must be plotted
+
+    Returns
+    -------
+    Sorted array of indices of the points to plot.
+    """
+    num_points = len(series[0])
+    if max_points <= 0 or num_points <= max_points:
+        return np.arange(num_points)
+    num_bins = max(1, max_points // (2 * len(series)))
+    indices = [[0, num_points - 1], np.asarray(keep, dtype=int)]
+    indices += [minmax_indices(ydata, num_bins) for ydata in series]
+    return np.unique(np.concatenate(indices))
+
+
+def crash_indices(tumoursize, select_time):
+    """
+    Find the points of a population curve which must be plotted.
+
+    These are the pre-crash maximum, the crash minimum
+    (the smallest population from select_time on), and the
+    recovery peak (the largest population after the crash
+    minimum); cf. analytics.precrash_minmax / postcrash_minmax.
+    """
+    tumoursize = np.asarray(tumoursize)
+    if not 0 < select_time < len(tumoursize):
+        return []
+    precrash_max = tumoursize[:select_time].argmax()
+    crash_min = select_time + tumoursize[select_time:].argmin()
+    recovery_max = crash_min + tumoursize[crash_min:].argmax()
+    return [precrash_max, crash_min, recovery_max]
+
+
+def make_dual_plot(xdata, y1data, y2data, filename, title1, title2,
+                   max_points=MAX_PLOT_POINTS, keep=()):
+    """
+    Plot two dependent vars against the same independent var.
+
+    Long series are downsampled first (see downsample_indices).
+    """
+    indices = downsample_indices([y1data, y2data], max_points, keep)
+    df = pd.DataFrame({title1: np.asarray(y1data)[indices],
+                       title2: np.asarray(y2data)[indices]},
+                      index=np.asarray(xdata)[indices])
+
+    # in interactive mode, pandas redraws the figure at every step
+    with matplotlib.rc_context({'interactive': False}):
+        ax = df.plot(secondary_y=[title2], linewidth=2, mark_right=False)
+        ax.set_xlabel("Discrete Time Intervals")
+        ax.set_ylabel(title1, color=ax.lines[0].get_color())
+        ax.right_ax.set_ylabel(title2, color=ax.right_ax.lines[0].get_color())
+        plt.title("{} vs {}".format(title1, title2))
+
+        plt.savefig(filename)
     print("PLOT CREATED: " + filename)
     plt.close()
 
-def make_plot(xdata, ydata, filename, title):
-    """Plot a single independent variable."""
-    plt.plot(xdata, ydata, linewidth=2)
+def make_plot(xdata, ydata, filename, title, max_points=MAX_PLOT_POINTS,
+              keep=()):
+    """
+    Plot a single independent variable.
+
+    Long series are downsampled first (see downsample_indices).
+    """
+    indices = downsample_indices([ydata], max_points, keep)
+    plt.plot(np.asarray(xdata)[indices], np.asarray(ydata)[indices],
+             linewidth=2)
     ax = plt.gca()
     ax.set_xlabel('Discrete Time Intervals')
     ax.set_ylabel(title)
@@ -50,23 +153,22 @@ def make_hist(xdata, filename, title, bins=25, log=False):
     plt.close()
 
 def make_dual_hist(x1freqs, x2freqs, filename, title):
-    """Plot two histograms on the same axes."""
-    x1data = []
-    x2data = []
-
-    #append for each 'cell'
-    for x1var, freq in x1freqs:
-        for _ in range(freq):
-            x1data.append(x1var)
-    for x2var, freq in x2freqs:
-        for _ in range(freq):
-            x2data.append(x2var)
+    """
+    Plot two histograms on the same axes.
+
+    Each of x1freqs and x2freqs is a sequence of (value, count)
+    pairs, e.g. (clone mutation rate, clone size). Each value
+    is weighted by its count, rather than being repeated once
+    per cell, so memory use does not grow with tumour size.
+    """
+    x1vals, x1counts = freqs_to_arrays(x1freqs)
+    x2vals, x2counts = freqs_to_arrays(x2freqs)
 
     num_bins = 20
 
-    plt.hist(x1data, bins=num_bins,
+    plt.hist(x1vals, bins=num_bins, weights=x1counts,
              alpha=0.45, log=True, linewidth=1)
-    plt.hist(x2data, bins=num_bins,
+    plt.hist(x2vals, bins=num_bins, weights=x2counts,
              alpha=0.45, log=True, linewidth=1)
     plt.title(title)
     plt.savefig(filename)
@@ -74,57 +176,199 @@ def make_dual_hist(x1freqs, x2freqs, filename, title):
     plt.close()
 
 def make_dual_box(end, mid, filename, title):
-    X1s = []
-    X2s = []
-    #append for each 'cell'
-    for p in mid:
-        for i in range(0, p[1]):
-            X1s.append(p[0])
-    for p in end:
-        for i in range(0, p[1]):
-            X2s.append(p[0])
-
-    data = [X1s, X2s]
+    """
+    Plot mid and end distributions as box plots.
+
+    As for make_dual_hist, `end` and `mid` are sequences
+    of (value, count) pairs; box plot statistics are
+    calculated from weighted quantiles.
+    """
+    mid_stats = weighted_boxplot_stats(*freqs_to_arrays(mid))
+    end_stats = weighted_boxplot_stats(*freqs_to_arrays(end))
+    flierprops = dict(marker='+')
 
     fig, ax1 = plt.subplots()
-    bp = plt.boxplot(data, notch=0, sym='+', vert=1, whis=1.5)
+    ax1.bxp([mid_stats, end_stats], flierprops=flierprops)
     ax1.yaxis.grid(True, linestyle='-', which='major', color='lightgrey',
                    alpha=0.5)
 
     plt.title(title)
     plt.savefig(filename)
-    plt.clf()
-
-    plt.boxplot(X1s)
-    plt.savefig(filename+"boxtest1")
-    plt.clf()
-    plt.boxplot(X2s)
-    plt.savefig(filename+"boxtest2")
     plt.close()
 
-def make_subpop_life(X, filename, title, end_time, loops, select_time):
+    for stats, suffix in [(mid_stats, "boxtest1"), (end_stats, "boxtest2")]:
+        fig, ax1 = plt.subplots()
+        ax1.bxp([stats], flierprops=flierprops)
+        plt.savefig(filename + suffix)
+        plt.close()
+
+def freqs_to_arrays(freqs):
+    """
+    Split a sequence of (value, count) pairs into two arrays.
+
+    Pairs with a count of zero (e.g. dead clones) are dropped.
+    """
+    if len(freqs) == 0:
+        return np.array([], dtype=float), np.array([], dtype=np.int64)
+    freqs = np.asarray(freqs, dtype=float)
+    values = freqs[:, 0]
+    counts = freqs[:, 1].astype(np.int64)
+    has_cells = counts > 0
+    return values[has_cells], counts[has_cells]
+
+def weighted_percentile(values, counts, percentiles):
+    """
+    Calculate percentiles of values weighted by integer counts.
+
+    The result is identical to calling np.percentile on the
+    data with each value repeated `count` times (including
+    the linear interpolation between neighbouring ranks),
+    without ever building that expanded array.
+    """
+    order = np.argsort(values, kind='mergesort')
+    sorted_vals = values[order]
+    cum_counts = np.cumsum(counts[order])
+    total = cum_counts[-1]
+
+    ranks = np.asarray(percentiles, dtype=float) / 100.0 * (total - 1)
+    lower = np.floor(ranks)
+    frac = ranks - lower
+    upper = np.minimum(lower + 1, total - 1)
+    # value at (0-based) rank r of the expanded data is the first
+    # sorted value whose cumulative count exceeds r
+    lower_vals = sorted_vals[np.searchsorted(cum_counts, lower, side='right')]
+    upper_vals = sorted_vals[np.searchsorted(cum_counts, upper, side='right')]
+    return lower_vals + frac * (upper_vals - lower_vals)
+
+def weighted_boxplot_stats(values, counts, whis=1.5):
+    """
+    Calculate box plot statistics for count-weighted values.
+
+    Returns a dictionary of statistics in the form expected
+    by Axes.bxp, calculated as matplotlib.cbook.boxplot_stats
+    would for the expanded (one value per cell) data.
+    """
+    if len(values) == 0:
+        return {'fliers': np.array([]), 'mean': np.nan, 'med': np.nan,
+                'q1': np.nan, 'q3': np.nan, 'iqr': np.nan,
+                'cilo': np.nan, 'cihi': np.nan,
+                'whislo': np.nan, 'whishi': np.nan}
+
+    num_cells = counts.sum()
+    q1, med, q3 = weighted_percentile(values, counts, [25, 50, 75])
+    iqr = q3 - q1
+    loval = q1 - whis * iqr
+    hival = q3 + whis * iqr
+
+    below_hival = values[values <= hival]
+    if len(below_hival) == 0 or below_hival.max() < q3:
+        whishi = q3
+    else:
+        whishi = below_hival.max()
+    above_loval = values[values >= loval]
+    if len(above_loval) == 0 or above_loval.min() > q1:
+        whislo = q1
+    else:
+        whislo = above_loval.min()
+
+    # each distinct outlying value need only be drawn once
+    fliers = np.unique(values[(values < whislo) | (values > whishi)])
+
+    return {'fliers': fliers,
+            'mean': np.average(values, weights=counts),
+            'med': med, 'q1': q1, 'q3': q3, 'iqr': iqr,
+            'cilo': med - 1.57 * iqr / np.sqrt(num_cells),
+            'cihi': med + 1.57 * iqr / np.sqrt(num_cells),
+            'whislo': whislo, 'whishi': whishi}
+
+def thin_indices(num, max_num):
+    """
+    Pick at most max_num evenly spaced indices from range(num).
+
+    A max_num of 0 (or less) means no limit.
+    """
+    if max_num <= 0 or num <= max_num:
+        return np.arange(num)
+    return np.linspace(0, num - 1, max_num).round().astype(int)
+
+
+def largest_clones(sizes, max_num):
+    """
+    Order clones by size, keeping at most max_num of the largest.
+
+    Returns
+    -------
+    Indices of the clones kept, from smallest to largest
+    (so that larger clones are drawn on top).
+    """
+    order = np.argsort(sizes, kind='mergesort')
+    if 0 < max_num < len(order):
+        order = order[-max_num:]
+    return order
+
+
+def size_colours(sizes, default='grey'):
+    """Get the circle colour of each clone, by clone size."""
+    conditions = [sizes > bound for bound, _col in CIRCLE_SIZE_COLOURS]
+    choices = [colorConverter.to_rgba(col) for _bound, col in CIRCLE_SIZE_COLOURS]
+    colours = np.empty((len(sizes), 4))
+    colours[:] = colorConverter.to_rgba(default)
+    # the first matching condition takes precedence
+    for cond, rgba in reversed(list(zip(conditions, choices))):
+        colours[cond] = rgba
+    return colours
+
+
+def make_subpop_life(clones, filename, title, end_time, loops, select_time,
+                     max_clones=MAX_PLOT_CLONES):
+    """
+    Plot the lifespan of each clone as a horizontal line.
+
+    Clones are ordered by colour, then by start and end time.
+    Uncoloured ('n') clones are drawn in green if they arose
+    before select_time, and in blue otherwise. If there are
+    more than max_clones clones, an evenly spaced selection
+    of max_clones of them (in this order) is drawn.
+
+    Args
+    ----
+    clones : dict of clone columns 'col', 's_time' and 'd_time'
+        (see clonetable.tree_table)
+    """
     #could 'fatten' or repeat a line if reaches a certain size
     #or colour
-    X.sort()
+    cols = np.asarray(clones['col'])
+    s_times = np.asarray(clones['s_time'])
+    d_times = np.asarray(clones['d_time'])
+    order = np.lexsort((d_times, s_times, cols))
+    order = order[thin_indices(len(order), max_clones)]
+    cols = cols[order]
+    s_times = s_times[order]
+    d_times = d_times[order]
+
+    # clones still alive (or alive at the cycle limit) end at end_time
+    still_alive = (d_times == loops + 1) | (d_times == clonetable.NO_D_TIME)
+    d_times = np.where(still_alive, end_time, d_times)
+
+    rows = np.arange(1, len(order) + 1)
+    segments = np.zeros((len(order), 2, 2))
+    segments[:, 0, 0] = s_times
+    segments[:, 1, 0] = d_times
+    segments[:, :, 1] = rows[:, np.newaxis]
+
+    colours = np.empty((len(order), 4))
+    for col in np.unique(cols):
+        if col != 'n':
+            colours[cols == col] = colorConverter.to_rgba(col)
+    uncoloured = cols == 'n'
+    pre_select = s_times < select_time
+    colours[uncoloured & pre_select] = colorConverter.to_rgba('green', alpha=0.75)
+    colours[uncoloured & ~pre_select] = colorConverter.to_rgba('blue', alpha=0.75)
+
     fig = plt.figure()
     ax1 = fig.add_subplot(111)
-    i = 0
-    for col, x1, x2 in X:
-        i += 1
-        if (x2 == loops+1):
-            x2 = end_time
-        if (x2 == None):
-            x2 = end_time
-        if x1 < select_time:
-            if col == 'n':
-                plt.plot([x1, x2], [i, i], color='green', alpha=0.75)
-            else:
-                plt.plot([x1, x2], [i, i], color=col)
-        else:
-            if col == 'n':
-                plt.plot([x1, x2], [i, i], color='blue', alpha=0.75)
-            else:
-                plt.plot([x1, x2], [i, i], color=col)
+    ax1.add_collection(LineCollection(segments, colors=colours))
+    ax1.autoscale_view()
     ax1.axes.get_yaxis().set_visible(False)
     plt.xlabel('Discrete Time Intervals')
     plt.savefig(filename)
@@ -171,24 +415,25 @@ def make_subpop_life_mut(X, filename, title, end_time, loops, select_time, mbase
     print("base mut rate ", mbase)
     plt.close()
 
-def plot_mut_effect_sizes(mutations, rate_type, filename, bins=100):
+def plot_mut_effect_sizes(effect_data, rate_type, filename, bins=100):
     """Plot the distribution of mutation effect sizes."""
-    if rate_type == 'prolif':
-        effect_data = [m.prolif_rate_effect for m in mutations]
-    elif rate_type == 'mut':
-        effect_data = [m.mut_rate_effect for m in mutations]
-    else:
+    if rate_type not in ('prolif', 'mut'):
         raise ValueError("Rate type must be `prolif` or `mut`")
 
     title = "Mutation Effect Sizes ({} Rate)".format(rate_type.title())
     make_hist(effect_data, filename, title, bins)
 
-def mutation_distribution(md, filename, title, SCALE):
+def mutation_distribution(md, filename, title, SCALE,
+                          max_clones=MAX_PLOT_CLONES):
     #print("MD",md)
     """ X [mut, precrash size, size] """
-    for elem in md:
-        if elem[1] > 0:
-            plt.scatter(int(elem[1]), int(elem[2]))
+    md = np.asarray(md, dtype=float).reshape(-1, 3)
+    md = md[largest_clones(md[:, 2], max_clones)]
+    xdata = md[:, 1].astype(int)
+    ydata = md[:, 2].astype(int)
+
+    precrash = md[:, 1] > 0
+    plt.scatter(xdata[precrash], ydata[precrash])
 
     plt.title("Clone size pre and post crash")
     plt.xlabel("Pre-crash size")
@@ -196,49 +441,50 @@ def mutation_distribution(md, filename, title, SCALE):
     plt.savefig(filename)
     plt.clf()
 
-    for elem in md:
-        plt.scatter(int(elem[1]), int(elem[2]))
+    plt.scatter(xdata, ydata)
 
     plt.savefig(filename+"all")
     print("PLOT CREATED: " + filename + "all")
     plt.close()
 
-def mutation_v_proliferation(clones, filename, title, SCALE):
-    plt.axes()
-    c2 = 0
-
-    circles = []
-    clones.sort(key=lambda tup: tup[2])
-    #NEED TO PRE SORT SO LARGER ONES COME OUT ON TOP
-
-    max_clone_size = max(clones,key=lambda x: x[:][2])[2]
-    #min_clone_size = min(clones,key=lambda x: x[:][2])[2]
+def draw_circles(ax, clones, facecolors, edgecolors):
+    """
+    Draw clones as circles at (mut rate, prolif rate).
 
-    for c in clones:
+    Circle radii are in data units, and scale with clone
+    size, as a ratio of the largest clone.
+    """
+    max_clone_size = clones[:, 2].max()
+    #number could be dynamic
+    rad = (clones[:, 2] / float(max_clone_size) * 0.0001) + 0.00005
+    circles = EllipseCollection(2 * rad, 2 * rad, np.zeros(len(rad)),
+                                units='xy', offsets=clones[:, :2],
+                                transOffset=ax.transData,
+                                facecolors=facecolors, edgecolors=edgecolors)
+    ax.add_collection(circles)
+    corners = np.vstack((clones[:, :2] - rad[:, np.newaxis],
+                         clones[:, :2] + rad[:, np.newaxis]))
+    ax.update_datalim(corners)
+    ax.autoscale_view()
+
+def mutation_v_proliferation(clones, filename, title, SCALE,
+                             max_clones=MAX_PLOT_CLONES):
+    """
+    Plot clones as circles by mutation and proliferation rate.
 
-        fcol = 'grey'
+    Args
+    ----
+    clones : (mut rate, prolif rate, size) of each clone
+    max_clones : at most this many of the largest
+        clones are drawn
+    """
+    ax = plt.axes()
 
-        c2 = c[2]
+    clones = np.asarray(clones, dtype=float).reshape(-1, 3)
+    #NEED TO PRE SORT SO LARGER ONES COME OUT ON TOP
+    clones = clones[largest_clones(clones[:, 2], max_clones)]
 
-        if c2 > 1:
-            fcol = 'c'
-            if c2 > 50:
-                fcol = 'b'
-                if c2 > 100:
-                    fcol = 'm'
-                    if c2 > 200:
-                        fcol = 'y'
-                        if c2 > 500:
-                            fcol = 'r'
-
-
-        #Get size of clone as ratio of largest
-        rad = (c[2] / float(max_clone_size) * 0.0001) + 0.00005 #number could be dynamic
-        #rad = 0.0001
-        circle = plt.Circle((c[0], c[1]), \
-                radius=rad, \
-                facecolor='none', edgecolor=fcol)
-        plt.gca().add_patch(circle)
+    draw_circles(ax, clones, 'none', size_colours(clones[:, 2]))
 
     plt.axis('scaled')
     plt.savefig(filename)
@@ -270,47 +516,32 @@ def mutation_v_proliferation_dat(clones, filename, title, SCALE):
 
         print(c[0],c[1],c[2],file = file_summary)
 
-def mutation_crash(clones, filename, title, SCALE):
-    """ mutation distribution """
-    plt.axes()
-    c2 = 0
+def mutation_crash(clones, filename, title, SCALE,
+                   max_clones=MAX_PLOT_CLONES):
+    """
+    Plot clones as circles by mutation and proliferation rate,
+    filling in clones which were alive before the crash.
+
+    Args
+    ----
+    clones : (mut rate, prolif rate, size, precrash size)
+        of each clone
+    max_clones : at most this many of the largest
+        clones are drawn
+    """
+    ax = plt.axes()
 
-    circles = []
-    clones.sort(key=lambda tup: tup[2])
+    clones = np.asarray(clones, dtype=float).reshape(-1, 4)
     #NEED TO PRE SORT SO LARGER ONES COME OUT ON TOP
+    clones = clones[largest_clones(clones[:, 2], max_clones)]
 
-    max_clone_size = max(clones,key=lambda x: x[:][2])[2]
-    #min_clone_size = min(clones,key=lambda x: x[:][2])[2]
-
-    for c in clones:
-
-        fcol = 'grey'
-
-        c2 = c[2]
+    edgecolors = size_colours(clones[:, 2])
+    facecolors = np.zeros((len(clones), 4))
+    precrash = clones[:, 3] > 0
+    edgecolors[precrash] = colorConverter.to_rgba('g')
+    facecolors[precrash] = colorConverter.to_rgba('green')
 
-        if c2 > 1:
-            fcol = 'c'
-            if c2 > 50:
-                fcol = 'b'
-                if c2 > 100:
-                    fcol = 'm'
-                    if c2 > 200:
-                        fcol = 'y'
-                        if c2 > 500:
-                            fcol = 'r'
-        face = 'none'
-        if c[3] > 0:
-            fcol = 'g'
-            face = 'green'
-
-
-        #Get size of clone as ratio of largest
-        rad = (c[2] / float(max_clone_size) * 0.0001) + 0.00005 #number could be dynamic
-        #rad = 0.0001
-        circle = plt.Circle((c[0], c[1]), \
-                radius=rad, \
-                facecolor=face, edgecolor=fcol)
-        plt.gca().add_patch(circle)
+    draw_circles(ax, clones, facecolors, edgecolors)
 
     plt.axis('scaled')
     plt.savefig(filename)
@@ -318,19 +549,114 @@ def mutation_crash(clones, filename, title, SCALE):
     plt.close()
 
 
-def print_results(popn, when, end_time, plot_style=None):
+def collect_plot_data(popn, when, end_time, table=None):
+    """
+    Gather the data needed by print_results() and print_plots().
+
+    The plot data is a self-contained copy, made of NumPy
+    arrays and scalars, so plots can be drawn from it after
+    the population has moved on (or in another process).
+
+    Args
+    ----
+    popn : a tumour population
+    when : label for this stage of the run ('mid' or 'end')
+    end_time : current time step
+    table : a tree table of popn's clones (see
+        clonetable.tree_table), if one has already been made
+
+    Returns
+    -------
+    A dict of plot data.
+    """
+    if table is None:
+        table = clonetable.tree_table(popn.subpop)
+    anlt = popn.analytics_base
+
+    # mutation effect sizes are only plotted at the end
+    all_muts = []
+    if when == "end":
+        for mut_type in popn.all_mutations:
+            all_muts += popn.all_mutations[mut_type]
+
+    return {'when': when,
+            'end_time': end_time,
+            'run_dir': popn.opt.run_dir,
+            'param_set_dir': popn.opt.param_set_dir,
+            'param_set': popn.opt.param_set,
+            'scale': popn.opt.scale,
+            'max_cycles': popn.opt.max_cycles,
+            'select_time': popn.opt.select_time,
+            'max_plot_clones': popn.opt.max_plot_clones,
+            'max_plot_points': popn.opt.max_plot_points,
+            'tumoursize': popn.tumoursize,
+            'clones': table,
+            'analytics': dict((name, np.array(getattr(anlt, name)))
+                              for name in ANALYTICS_ATTRS),
+            'prolif_effects': np.array([mut.prolif_rate_effect for mut in all_muts]),
+            'mut_effects': np.array([mut.mut_rate_effect for mut in all_muts]),
+            'mid_proliferation': np.asarray(popn.mid_proliferation),
+            'mid_mutation': np.asarray(popn.mid_mutation)}
+
+
+def plot_data_path(run_dir, when):
+    """Get the path of the plot data file for one stage of a run."""
+    return "{0}/data/{1}_plot_data.npz".format(run_dir, when)
+
+
+def save_plot_data(plot_data, fpath):
+    """
+    Save plot data (see collect_plot_data) to a compressed .npz file.
+
+    Nested dicts of arrays (the clone and analytics tables) are
+    flattened, with keys of the form 'clones/size'.
+    """
+    arrays = {}
+    for key, val in plot_data.items():
+        if isinstance(val, dict):
+            for sub_key, sub_val in val.items():
+                arrays[key + PLOT_DATA_SEP + sub_key] = np.asarray(sub_val)
+        else:
+            arrays[key] = np.asarray(val)
+    np.savez_compressed(fpath, **arrays)
+
+
+def load_plot_data(fpath):
+    """Load plot data saved by save_plot_data()."""
+    plot_data = {}
+    with np.load(fpath) as arrays:
+        for name in arrays.files:
+            val = arrays[name]
+            if val.ndim == 0:
+                val = val.item()
+            if PLOT_DATA_SEP in name:
+                key, sub_key = name.split(PLOT_DATA_SEP, 1)
+                plot_data.setdefault(key, {})[sub_key] = val
+            else:
+                plot_data[name] = val
+    return plot_data
+
+
+def print_results(plot_data, plot_style=None, write_circles=True):
     """ Print all results to plots / file
 
-    Print result to graphs using matplotlib
+    Print result to graphs using matplotlib, from
+    plot data gathered by collect_plot_data()
     If --r_output option parsed print raw output to file
+    If write_circles, also append clone rates and sizes
+    to the param set's circles data files
 
     """
     if plot_style:
         plt.style.use(plot_style)
 
-    filename = "{0}/plots/{1}_".format(popn.opt.run_dir, when)
+    when = plot_data['when']
+    end_time = plot_data['end_time']
+    filename = "{0}/plots/{1}_".format(plot_data['run_dir'], when)
 
-    anlt = popn.analytics_base
+    anlt = plot_data['analytics']
+    max_clones = plot_data.get('max_plot_clones', MAX_PLOT_CLONES)
+    max_points = plot_data.get('max_plot_points', MAX_PLOT_POINTS)
 
     """
     if popn.opt.r_output:
@@ -338,100 +664,109 @@ def print_results(popn, when, end_time, plot_style=None):
                 mutation_v_proliferation, mutation_v_proliferation_dat
     """
 
+    all_clones = plot_data['clones']
+    clones = clonetable.living_clones(all_clones)
+    popn_is_dead = plot_data['tumoursize'] <= 0
+
     # Only make these plots at the end of the sim
     if when == "end":
+        # time series are downsampled, keeping the crash and recovery
+        crash_points = crash_indices(anlt['tumoursize'],
+                                     plot_data['select_time'])
         # Population vs Time
-        make_plot(anlt.time, anlt.tumoursize,
-                  filename + "population_graph", "Population Size")
+        make_plot(anlt['time'], anlt['tumoursize'],
+                  filename + "population_graph", "Population Size",
+                  max_points, crash_points)
         # Clone count vs Time
-        make_plot(anlt.time, anlt.clonecount,
-                  filename + "subpop_graph", "No. of Clones")
+        make_plot(anlt['time'], anlt['clonecount'],
+                  filename + "subpop_graph", "No. of Clones",
+                  max_points, crash_points)
         # Effective Proliferation Rate
-        make_plot(anlt.time, anlt.avg_proliferation,
-                  filename + "effect_prolif", "Effective Proliferation Rate")
+        make_plot(anlt['time'], anlt['avg_proliferation'],
+                  filename + "effect_prolif", "Effective Proliferation Rate",
+                  max_points, crash_points)
         # Avg Mutation Rate
-        make_plot(anlt.time, anlt.avg_mutation,
-                  filename + "mutation_avg", "Average Mutation Rate")
+        make_plot(anlt['time'], anlt['avg_mutation'],
+                  filename + "mutation_avg", "Average Mutation Rate",
+                  max_points, crash_points)
         # Selective pressure
-        make_plot(anlt.time, anlt.select_pressure,
-                  filename + "select_pressure", "Qty of Selective Pressure")
+        make_plot(anlt['time'], anlt['select_pressure'],
+                  filename + "select_pressure", "Qty of Selective Pressure",
+                  max_points, crash_points)
 
         # Population vs Clone count
-        make_dual_plot(anlt.time,
-                       anlt.tumoursize, anlt.clonecount,
+        make_dual_plot(anlt['time'],
+                       anlt['tumoursize'], anlt['clonecount'],
                        filename + "popsubpop",
-                       'Tumour Size', 'No. of Clones')
+                       'Tumour Size', 'No. of Clones',
+                       max_points, crash_points)
         # Mutation rate vs Clone count
-        make_dual_plot(anlt.time,
-                       anlt.avg_mutation, anlt.clonecount,
+        make_dual_plot(anlt['time'],
+                       anlt['avg_mutation'], anlt['clonecount'],
                        filename + "mutsubpop",
-                       'Average Mutation Rate', 'No. of Clones')
+                       'Average Mutation Rate', 'No. of Clones',
+                       max_points, crash_points)
         # Proliferation Rate vs Mutation Rate
-        make_dual_plot(anlt.time,
-                       anlt.avg_mutation, anlt.avg_proliferation,
+        make_dual_plot(anlt['time'],
+                       anlt['avg_mutation'], anlt['avg_proliferation'],
                        filename + "prolifmut",
-                       'Mutation Rate', 'Proliferation Rate')
+                       'Mutation Rate', 'Proliferation Rate',
+                       max_points, crash_points)
         # Proliferation Rate vs Population
-        make_dual_plot(anlt.time,
-                       anlt.tumoursize, anlt.avg_proliferation,
+        make_dual_plot(anlt['time'],
+                       anlt['tumoursize'], anlt['avg_proliferation'],
                        filename + "prolifandpop",
-                       'Tumour Size', 'Proliferation Rate')
+                       'Tumour Size', 'Proliferation Rate',
+                       max_points, crash_points)
         # Selective pressure vs Population
-        make_dual_plot(anlt.time,
-                       anlt.tumoursize, anlt.select_pressure,
+        make_dual_plot(anlt['time'],
+                       anlt['tumoursize'], anlt['select_pressure'],
                        filename + "pop_v_select_pressure",
-                       'Tumour Size', 'Selective Pressure')
-
-        all_muts_flat_list = []
-        for mut_type in popn.all_mutations:
-            all_muts_flat_list += popn.all_mutations[mut_type]
+                       'Tumour Size', 'Selective Pressure',
+                       max_points, crash_points)
 
         # Histogram of mutation effect sizes
-        plot_mut_effect_sizes(all_muts_flat_list, 'prolif',
+        plot_mut_effect_sizes(plot_data['prolif_effects'], 'prolif',
                               filename + "mut_effect_sizes_prolif")
-        plot_mut_effect_sizes(all_muts_flat_list, 'mut',
+        plot_mut_effect_sizes(plot_data['mut_effects'], 'mut',
                               filename + "mut_effect_sizes_mut")
 
         # Mutation...
-        mut_distro = popn.subpop.get_clone_attrs_as_list(["mut_rate",
-                                                          "prolif_rate",
-                                                          "size"])
+        mut_distro = np.column_stack((clones["mut_rate"],
+                                      clones["prolif_rate"],
+                                      clones["size"]))
         mutation_distribution(mut_distro,
                               filename + "mutation_distribution",
                               "Mutation vs Time - Pre/Post Crash",
-                              popn.opt.scale)
+                              plot_data['scale'], max_clones)
 
         # Mutation
-        if not popn.is_dead():
-            mut_distro = popn.subpop.get_clone_attrs_as_list(["mut_rate",
-                                                              "prolif_rate",
-                                                              "size",
-                                                              "precrash_size"])
+        if not popn_is_dead:
+            mut_distro = np.column_stack((clones["mut_rate"],
+                                          clones["prolif_rate"],
+                                          clones["size"],
+                                          clones["precrash_size"]))
             mutation_crash(mut_distro,
                            filename + "mutation_distribution_1",
                            "Mutation vs Time - Pre/Post Crash",
-                           popn.opt.scale)
+                           plot_data['scale'], max_clones)
 
         #cell lines graph  - [(popn.s_time,popn.d_time)]
-        cell_line_time = popn.subpop.get_clone_attrs_as_list(["col",
-                                                              "s_time",
-                                                              "d_time"],
-                                                             inc_dead_clones=True)
-        make_subpop_life(cell_line_time, filename + "cell_lines_alpha",
-                         "Cell Lifespan", end_time, popn.opt.max_cycles,
-                         popn.opt.select_time)
-        # make clonal frequency plot from clone summary CSV files
-        plot_clone_freqs_from_file(popn.opt.run_dir)
+        make_subpop_life(all_clones, filename + "cell_lines_alpha",
+                         "Cell Lifespan", end_time, plot_data['max_cycles'],
+                         plot_data['select_time'], max_clones)
+        # make clonal frequency plot from clone summary CSV files,
+        # which are only written with the clone_summary output
+        if has_clone_summaries(plot_data['run_dir']):
+            plot_clone_freqs_from_file(plot_data['run_dir'])
 
     # Print these plots both at the crash, and at the end of sim
-    if not popn.is_dead():
+    if not popn_is_dead:
         #PROLIFERATION HISTOGRAM
         # [(popn.proliferation-popn.prolif_adj,popn.size)]
 
-        pro_hist = popn.subpop.get_clone_attrs_as_list("prolif_rate")
-        pro_hist.sort()
-        mut_hist = popn.subpop.get_clone_attrs_as_list("mut_rate")
-        mut_hist.sort()
+        pro_hist = np.sort(clones["prolif_rate"])
+        mut_hist = np.sort(clones["mut_rate"])
 
         make_hist(pro_hist,
                   filename+"proliferation_hist",
@@ -444,61 +779,64 @@ def print_results(popn, when, end_time, plot_style=None):
         #POPULATION HISTOGRAM
         # [popn.size]
 
-        pop_hist = popn.subpop.get_clone_attrs_as_list("size"),
+        pop_hist = clones["size"]
 
         make_hist(pop_hist,
                   filename+"population_hist",
                   "Population Division", log=True)
         #ALLELE FREQ
         # just_allele_freq z = z + [i/float(tumoursize)]
-        norm, r, just_allele_freq = \
-                popn.subpop.freq_of_mutation(popn.tumoursize)
+        just_allele_freq = [count / float(plot_data['tumoursize'])
+                            for count, _idnt in
+                            clonetable.clone_freq_table(all_clones)]
         make_hist(just_allele_freq,
                   filename + "allele",
                   "Allele Freq",
                   #bins equal to number of sub pops
-                  bins=anlt.clonecount[-1], log=True)
+                  bins=anlt['clonecount'][-1], log=True)
         #CELL CIRCLE MUT V PRO RATES
         # if size > 0 [(popn.mutation,popn.proliferation,popn.size)]
-        circles = popn.subpop.get_clone_attrs_as_list(["mut_rate",
-                                                       "prolif_rate",
-                                                       "size"])
+        circles = clonetable.column_rows(clones, ["mut_rate",
+                                                  "prolif_rate",
+                                                  "size"])
         mutation_v_proliferation(circles, filename + "circles",
                                  "Mutation vs Proliferation Rates",
-                                 popn.opt.scale)
+                                 plot_data['scale'], max_clones)
 
         # [(popn.mutation,popn.proliferation,popn.size)]
-        circles_all = popn.subpop.get_clone_attrs_as_list(["mut_rate",
-                                                           "prolif_rate",
-                                                           "size"],
-                                                          inc_dead_clones=True)
+        circles_all = clonetable.column_rows(all_clones, ["mut_rate",
+                                                          "prolif_rate",
+                                                          "size"])
         mutation_v_proliferation(circles_all, filename + "circles_all",
                                  "Mutation vs Proliferation Rates",
-                                 popn.opt.scale)
+                                 plot_data['scale'], max_clones)
 
+        if not write_circles:
+            return
         #MAKE CIRCLES ACROSS ALL GRAPHS BY WRITING TO 1 FILE
         # if size > 0 [(popn.mutation,popn.proliferation,popn.size)]
-        fpath = "{0}/{1}-circles.dat".format(popn.opt.param_set_dir,
-                                             popn.opt.param_set)
+        fpath = "{0}/{1}-circles.dat".format(plot_data['param_set_dir'],
+                                             plot_data['param_set'])
         mutation_v_proliferation_dat(circles, fpath,
                                      "Mutation vs Proliferation Rates",
-                                     popn.opt.scale)
+                                     plot_data['scale'])
         # [(popn.mutation,popn.proliferation,popn.size)]
-        fpath = "{0}/{1}-circles_all.dat".format(popn.opt.param_set_dir,
-                                                 popn.opt.param_set)
+        fpath = "{0}/{1}-circles_all.dat".format(plot_data['param_set_dir'],
+                                                 plot_data['param_set'])
         mutation_v_proliferation_dat(circles_all, fpath,
                                      "Mutation vs Proliferation Rates",
-                                     popn.opt.scale)
+                                     plot_data['scale'])
 
 
-def print_plots(popn, when):
+def print_plots(plot_data, when):
     """ Print all results to plots / file
 
-    Print result to graphs using matplotlib
+    Print result to graphs using matplotlib, from
+    plot data gathered by collect_plot_data()
     If --r_output option parsed print raw output to file
     """
 
-    filename = "{0}/plots/{1}_".format(popn.opt.run_dir, when)
+    filename = "{0}/plots/{1}_".format(plot_data['run_dir'], when)
 
     """
     if popn.opt.r_output:
@@ -508,28 +846,31 @@ def print_plots(popn, when):
 
     # Proliferation Histogram #
 
-    if not popn.is_dead():
-        end_proliferation = popn.subpop.get_clone_attrs_as_list(["prolif_rate",
-                                                                 "size"])
-
-        end_mutation = popn.subpop.get_clone_attrs_as_list(["mut_rate", "size"])
+    if plot_data['tumoursize'] > 0:
+        clones = clonetable.living_clones(plot_data['clones'])
+        end_proliferation = np.column_stack((clones["prolif_rate"],
+                                             clones["size"]))
+        end_mutation = np.column_stack((clones["mut_rate"], clones["size"]))
 
         #PROLIFERATION HISTOGRAM
         # [(popn.proliferation-popn.prolif_adj,popn.size)]
 
-        end_proliferation.sort()
-        popn.mid_proliferation.sort()
-        make_dual_hist(end_proliferation, popn.mid_proliferation,
+        make_dual_hist(end_proliferation, plot_data['mid_proliferation'],
                        filename + "prolif_hist", "Proliferation Rates")
 
-        end_mutation.sort()
-        popn.mid_mutation.sort()
-        make_dual_hist(end_mutation, popn.mid_mutation,
+        make_dual_hist(end_mutation, plot_data['mid_mutation'],
                        filename + "mutation_hist", "Mutation Rates")
 
-        make_dual_box(end_mutation, popn.mid_mutation,
+        make_dual_box(end_mutation, plot_data['mid_mutation'],
                       filename + "mutation_box", "Mutation Rate Box")
 
+def has_clone_summaries(run_dir):
+    """Determine whether a run has the clone summaries plot_clone_freqs_from_file needs."""
+    return all(os.path.isfile(os.path.join(run_dir, "data",
+                                           "{}_clone_summary.csv".format(stage)))
+               for stage in ("mid", "end"))
+
+
 def plot_clone_freqs_from_file(run_dir):
     """
     Plot pre-crash clone frequencies against post-crash frequencies.
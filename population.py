@@ -9,6 +9,8 @@ Yoshua Wakeham : yoshua.wakeham@petermac.org
 
 from __future__ import print_function
 import gc
+import numpy as np
+import clonetable
 from analytics import Analytics
 from subpopulation import Subpopulation
 
@@ -166,5 +168,9 @@ class Population(object):
         self.opt.select_time = treatmt.select_time
         self.selective_pressure_applied = True
         self.subpop.set_precrash_size()
-        self.mid_proliferation = self.subpop.get_clone_attrs_as_list(["prolif_rate", "size"])
-        self.mid_mutation = self.subpop.get_clone_attrs_as_list(["mut_rate", "size"])
+        clones = clonetable.clone_columns(self.subpop,
+                                          ["prolif_rate", "mut_rate", "size"])
+        self.mid_proliferation = np.column_stack((clones["prolif_rate"],
+                                                  clones["size"]))
+        self.mid_mutation = np.column_stack((clones["mut_rate"],
+                                             clones["size"]))
@@ -0,0 +1,95 @@
+"""
+A library of pre-crash populations, shared by runs which differ
+only in their treatment.
+
+Many test groups vary only treatment parameters (select_pressure,
+decay_type, treatment_freq, ...), yet every run regrows its
+tumour from its initial size up to the crash. A seeded run's
+growth phase depends only on its pre-treatment parameters (see
+PRECRASH_PARAMS) and its seed, so it need only be simulated once.
+
+When a run with a pre-crash library introduces treatment, it
+stores its population in the library, as it was at the end of the
+previous cycle, unless the library already holds it. A later run
+with the same pre-treatment parameters and seed loads that
+population instead of growing its own, and starts at the cycle
+treatment was introduced.
+
+Each entry is a checkpoint archive (see checkpoint), so a run
+loaded from the library continues with exactly the state (clone
+tree, mutations, analytics, ID counters and RNG state) that the
+uninterrupted run would have had. Its results are therefore the
+same as if it had grown the tumour itself. Entries are stored as
+
+    <library_dir>/<first two characters of key>/<key>.tar.gz
+"""
+import hashlib
+import json
+import os
+import checkpoint
+import runcache
+
+# parameters which determine a run's growth phase, up to (and
+# including) the cycle at which treatment is introduced
+PRECRASH_PARAMS = ['pro', 'die', 'mut',
+                   'prob_mut_pos', 'prob_mut_neg',
+                   'prob_inc_mut', 'prob_dec_mut',
+                   'scale', 'mscale',
+                   'init_size', 'init_diversity', 'sub_file',
+                   'max_size_lim', 'select_time', 'auto_treatment',
+                   'prune_clones', 'seed']
+
+
+def precrash_key(opt):
+    """
+    Get the library key of a run's pre-crash population.
+
+    Returns None if the run cannot use the library (because
+    it is unseeded, or loads its population from a snapshot).
+    """
+    if getattr(opt, 'seed', None) is None or opt.load_snapshot:
+        return None
+    params = {}
+    for name in PRECRASH_PARAMS:
+        val = getattr(opt, name, None)
+        if name in runcache.FILE_PARAMS and val:
+            val = runcache.file_hash(val)
+        params[name] = val
+    key_data = json.dumps({'params': params, 'code': runcache.code_version()},
+                          sort_keys=True)
+    return hashlib.sha1(key_data.encode('utf-8')).hexdigest()
+
+
+def entry_path(library_dir, key):
+    """Get the path of a library entry."""
+    return os.path.join(library_dir, key[:2], key + ".tar.gz")
+
+
+def load_entry(library_dir, key):
+    """
+    Load a pre-crash population from the library.
+
+    Returns
+    -------
+    The return value of checkpoint.load_checkpoint(), or
+    None if the library does not hold the population.
+    """
+    fpath = entry_path(library_dir, key)
+    if not os.path.exists(fpath):
+        return None
+    return checkpoint.load_checkpoint(fpath,
+                                      extract_path=os.path.dirname(fpath))
+
+
+def save_entry(library_dir, key, sim, t_curr, elapsed_time):
+    """
+    Store a simulation's pre-crash population in the library.
+
+    This must be called as treatment is introduced at cycle
+    `t_curr`, before the population has been updated (or any
+    random numbers drawn) for that cycle.
+    """
+    fpath = entry_path(library_dir, key)
+    if os.path.exists(fpath):
+        return
+    checkpoint.write_checkpoint(sim, t_curr - 1, elapsed_time, fpath)
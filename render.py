@@ -0,0 +1,147 @@
+"""
+Render the plots of runs from their saved plot data.
+
+Every run saves the data its plots are drawn from (see
+plotdata.save_plot_data) to `data/mid_plot_data.npz` and
+`data/end_plot_data.npz`, whether or not it was run with
+`--no_plots`. This draws the plots of any number of runs from
+those files, in parallel, by a pool of worker processes. Each
+run's plots are written to its `plots` directory, as they would
+have been by the run itself.
+
+Run directories, or any directory above them (e.g. a param set
+or test group directory), may be given:
+
+    python render.py TEST_GROUP_DIR [--stages mid end] [--processes 4]
+
+The per-param-set circles data files are only appended to if
+`--circles_dat` is given, so that rendering the same runs twice
+does not duplicate their clones.
+"""
+from __future__ import print_function
+import argparse
+import multiprocessing
+import os
+import traceback
+import matplotlib
+matplotlib.use('Agg')
+import plotdata
+
+STAGES = ('mid', 'end')
+
+
+def find_plot_data(paths, stages=STAGES):
+    """Find the plot data files of the runs under a list of paths."""
+    fnames = set(os.path.basename(plotdata.plot_data_path("", stage))
+                 for stage in stages)
+    fpaths = []
+    for path in paths:
+        if os.path.isfile(path):
+            fpaths.append(path)
+            continue
+        for dirpath, _dirnames, filenames in os.walk(path):
+            fpaths += [os.path.join(dirpath, fname)
+                       for fname in filenames if fname in fnames]
+    return sorted(fpaths)
+
+
+def render_run(args):
+    """
+    Render the plots of one stage of a run from its plot data file.
+
+    Takes a single tuple (fpath, plot_style, write_circles,
+    max_plot_clones, max_plot_points), so it can be mapped over
+    by a worker pool. If either limit is None, the run's own
+    limit is used.
+
+    Returns
+    -------
+    None if the plots were rendered, or else the error message.
+    """
+    fpath, plot_style, write_circles, max_plot_clones, max_plot_points = args
+    try:
+        plot_data = plotdata.load_plot_data(fpath)
+        # the run (and so its plot data) may have been moved since
+        run_dir = os.path.relpath(os.path.dirname(os.path.dirname(fpath)))
+        plot_data['run_dir'] = run_dir
+        plot_data['param_set_dir'] = os.path.dirname(run_dir)
+        if max_plot_clones is not None:
+            plot_data['max_plot_clones'] = max_plot_clones
+        if max_plot_points is not None:
+            plot_data['max_plot_points'] = max_plot_points
+        plots_dir = os.path.join(run_dir, "plots")
+        if not os.path.isdir(plots_dir):
+            os.makedirs(plots_dir)
+
+        plotdata.print_results(plot_data, plot_style, write_circles)
+        if plot_data['when'] == "end":
+            plotdata.print_plots(plot_data, "new")
+    except Exception:
+        return "{0}:\n{1}".format(fpath, traceback.format_exc())
+
+
+def render(paths, stages=STAGES, processes=None, plot_style=None,
+           write_circles=False, max_plot_clones=None,
+           max_plot_points=None):
+    """
+    Render the plots of every run under a list of paths.
+
+    Args
+    ----
+    paths : run directories, directories containing
+        runs, or plot data files
+    stages : which stages' plots to render
+    processes : number of worker processes
+        (defaults to the number of CPUs)
+    plot_style : matplotlib style to plot in
+    write_circles : whether to append to the circles data files
+    max_plot_clones : maximum number of clones drawn in per-clone
+        plots (by default, each run's own --max_plot_clones)
+    max_plot_points : approximate maximum number of points drawn
+        in time series plots (by default, each run's own
+        --max_plot_points)
+
+    Returns
+    -------
+    A list of error messages, one per plot data file
+    whose plots could not be rendered.
+    """
+    jobs = [(fpath, plot_style, write_circles, max_plot_clones,
+             max_plot_points)
+            for fpath in find_plot_data(paths, stages)]
+    if not jobs:
+        raise IOError("No plot data found under {}".format(", ".join(paths)))
+
+    pool = multiprocessing.Pool(processes)
+    try:
+        errors = pool.map(render_run, jobs)
+    finally:
+        pool.close()
+        pool.join()
+    return [error for error in errors if error]
+
+
+def main():
+    """Render the plots of runs from their saved plot data."""
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument('paths', nargs='+')
+    parser.add_argument('--stages', nargs='+', choices=STAGES,
+                        default=list(STAGES))
+    parser.add_argument('--processes', type=int, default=None)
+    parser.add_argument('--plot_style', default=None)
+    parser.add_argument('--circles_dat', action="store_true", default=False)
+    parser.add_argument('--max_plot_clones', type=int, default=None)
+    parser.add_argument('--max_plot_points', type=int, default=None)
+    opt = parser.parse_args()
+
+    errors = render(opt.paths, opt.stages, opt.processes, opt.plot_style,
+                    opt.circles_dat, opt.max_plot_clones,
+                    opt.max_plot_points)
+    for error in errors:
+        print("FAILED TO RENDER", error)
+    if errors:
+        raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,212 @@
+"""
+Account for the computing resources a run uses.
+
+For planning cluster time, each run's summary records, besides
+its walltime (elapsed_time), its CPU time, the peak resident
+memory (RSS) of the simulating process, the peak number of clones
+and of mutations held, and the time spent writing outputs (see
+outputworker). These are measured by a ResourceUsage, which the
+Simulator samples as it runs.
+
+CPU time includes the time of finished child processes, such
+as the background output worker. Peak RSS is read from /proc,
+where the process's high-water mark is reset as a run starts, so
+runs sharing a process (see workerpool) are measured separately;
+elsewhere, it falls back on getrusage(), which gives the peak of
+the process as a whole. Memory figures are zero where neither
+is available.
+
+Resource usage is stored in checkpoints, so that a resumed run
+accounts for the resources used before it was interrupted.
+
+A run's memory use (its RSS, or, where that cannot be read, an
+estimate from its numbers of clones and mutations) can also be
+guarded against soft and hard limits (see Simulator.check_memory).
+Past the soft limit, clone pruning is switched on, and freed memory
+is compacted; past the hard limit, the run writes a checkpoint and
+stops, raising MemoryLimitExceeded, so that it can be resumed rather
+than killed by the scheduler.
+"""
+import ctypes
+import ctypes.util
+import gc
+import os
+import sys
+from utils import secs_to_hms
+try:
+    import resource
+except ImportError:
+    # not available on Windows
+    resource = None
+
+# cycles between samples of the population's mutation
+# count, and checks on the run's memory use
+SAMPLE_CYCLES = 100
+
+# rough memory held by each clone in the tree, and by each
+# mutation, in bytes, for estimating memory use where RSS
+# cannot be read
+BYTES_PER_CLONE = 1024
+BYTES_PER_MUTATION = 512
+
+
+class MemoryLimitExceeded(MemoryError):
+    """Raised when a run stops for exceeding its hard memory limit."""
+
+
+def cpu_time():
+    """Get the CPU time of this process and its finished children, in seconds."""
+    times = os.times()
+    return times[0] + times[1] + times[2] + times[3]
+
+
+def current_rss(pid='self'):
+    """Get the resident memory of a process, in bytes (0 if unknown)."""
+    try:
+        with open("/proc/{}/statm".format(pid)) as statm_file:
+            rss_pages = int(statm_file.read().split()[1])
+    except (IOError, OSError, ValueError, IndexError):
+        return 0
+    return rss_pages * os.sysconf('SC_PAGE_SIZE')
+
+
+def reset_peak_rss():
+    """
+    Reset this process's peak resident memory (Linux only).
+
+    Returns
+    -------
+    True if the peak was reset, otherwise False.
+    """
+    try:
+        with open("/proc/self/clear_refs", 'w') as clear_refs:
+            clear_refs.write("5")
+    except (IOError, OSError):
+        return False
+    return True
+
+
+def peak_rss():
+    """Get the peak resident memory of this process, in bytes (0 if unknown)."""
+    try:
+        with open("/proc/self/status") as status_file:
+            for line in status_file:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) * 1024
+    except (IOError, OSError, ValueError):
+        pass
+    if resource is None:
+        return 0
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # reported in bytes on OS X, but in kB elsewhere
+    return max_rss if sys.platform == 'darwin' else max_rss * 1024
+
+
+def count_mutations(popn):
+    """Count the mutations held by a population."""
+    return sum(len(muts) for muts in popn.all_mutations.values())
+
+
+def estimate_memory(popn):
+    """Estimate the memory held by a population's clones and mutations, in bytes."""
+    num_clones = sum(1 for _ in popn.subpop.iter_preorder())
+    return (BYTES_PER_CLONE * num_clones
+            + BYTES_PER_MUTATION * count_mutations(popn))
+
+
+def memory_use(popn):
+    """Get this process's RSS, or if it is unknown, an estimate (in bytes)."""
+    return current_rss() or estimate_memory(popn)
+
+
+def compact_memory():
+    """
+    Collect garbage, and return free heap memory to the system.
+
+    Freed memory is only returned with glibc (i.e. on Linux);
+    elsewhere, garbage is just collected.
+    """
+    gc.collect()
+    libc_name = ctypes.util.find_library('c')
+    if not libc_name:
+        return
+    try:
+        ctypes.CDLL(libc_name).malloc_trim(0)
+    except (OSError, AttributeError):
+        # not glibc
+        pass
+
+
+class ResourceUsage(object):
+    """
+    The resources used by a run so far.
+
+    Attributes
+    ----------
+    prior_cpu_time : CPU time used before this process
+        started (non-zero only when resuming a run)
+    start_cpu_time : this process's CPU time as the run started
+    peak_rss : peak resident memory, in bytes
+    peak_mutations : peak number of mutations held
+    prior_output_time : time spent writing outputs before
+        this process started, in seconds
+    output_worker : the run's OutputWorker, whose time spent
+        writing outputs is counted (once it has been created)
+    """
+    def __init__(self):
+        self.prior_cpu_time = 0.0
+        self.start_cpu_time = cpu_time()
+        self.peak_rss = 0
+        self.peak_mutations = 0
+        self.prior_output_time = 0.0
+        self.output_worker = None
+        reset_peak_rss()
+
+    def __repr__(self):
+        return "{}({:.1f} CPU sec, {:.0f} MB)".format(self.__class__.__name__,
+                                                      self.cpu_time(),
+                                                      self.peak_rss / 2.0**20)
+
+    def cpu_time(self):
+        """Get the CPU time used by the run so far, in seconds."""
+        return self.prior_cpu_time + cpu_time() - self.start_cpu_time
+
+    def output_time(self):
+        """Get the time spent writing outputs so far, in seconds."""
+        if self.output_worker is None:
+            return self.prior_output_time
+        return self.prior_output_time + self.output_worker.output_time()
+
+    def sample(self, popn):
+        """Update the peak memory and mutation count."""
+        self.peak_rss = max(self.peak_rss, peak_rss())
+        self.peak_mutations = max(self.peak_mutations, count_mutations(popn))
+
+    def state(self):
+        """Get the usage so far, as a dict to store in a checkpoint."""
+        return {'cpu_time': self.cpu_time(),
+                'peak_rss': max(self.peak_rss, peak_rss()),
+                'peak_mutations': self.peak_mutations,
+                'output_time': self.output_time()}
+
+    def restore(self, state):
+        """Continue from the usage stored in a checkpoint (see state)."""
+        self.prior_cpu_time = state['cpu_time']
+        self.peak_rss = state['peak_rss']
+        self.peak_mutations = state['peak_mutations']
+        self.prior_output_time = state['output_time']
+
+    def summary_values(self, popn):
+        """
+        Get the run's resource usage, for its summary.
+
+        Returns
+        -------
+        A tuple of values, in the order of constants.RESOURCE_COLUMNS.
+        """
+        self.sample(popn)
+        peak_clones = max(popn.analytics_base.clonecount or [0])
+        return (secs_to_hms(self.cpu_time()),
+                '{:.1f}'.format(self.peak_rss / 2.0**20),
+                peak_clones, self.peak_mutations,
+                secs_to_hms(self.output_time()))
@@ -0,0 +1,228 @@
+"""
+A SQLite-backed store for simulation results.
+
+When many runs of a test group execute in parallel, appending
+rows to shared CSV files (the test group and param set summary
+files, and the drop data files) lets writes from different
+processes interleave. Instead, each run can record its results
+in a single SQLite database per test group, which serialises
+concurrent writers safely.
+
+The database is opened in WAL (write-ahead log) mode, so that
+readers do not block writers. Records are buffered by the
+ResultsStore, and written in a single transaction when the
+store is flushed; a connection is only held open for the
+duration of a flush. Note that WAL mode requires a local
+filesystem (e.g. not NFS).
+
+There is one table per kind of record:
+
+    summaries : one row per run (see constants.SUMMARY_COLUMNS)
+    clone_summaries : one row per clone, per stage, per run
+    drop_data : one row per colour, per stage, per run
+    run_metadata : one (name, value) row per parameter, per run
+    failures : one row per failed attempt at a run, giving the
+        cause of the failure (see workerpool) and its error message
+
+Summaries and drop data can be exported to CSV files laid out
+as the CSV backend writes them, e.g.
+
+    python results_store.py DB_PATH --out tg_results.csv
+"""
+from __future__ import print_function
+import argparse
+import csv
+import sqlite3
+import numpy as np
+from clonetable import CLONE_SUMMARY_COLUMNS
+from constants import SUMMARY_COLUMNS
+from dropdata import DROP_COLOURS
+
+# seconds to wait for another process's write lock
+LOCK_TIMEOUT = 120.0
+
+RUN_KEY_COLUMNS = ('param_set', 'run_number')
+
+TABLE_SCHEMAS = {
+    'summaries': (SUMMARY_COLUMNS, RUN_KEY_COLUMNS),
+    'clone_summaries': (RUN_KEY_COLUMNS + ('stage',) + CLONE_SUMMARY_COLUMNS,
+                        RUN_KEY_COLUMNS + ('stage', 'clone_id')),
+    'drop_data': (RUN_KEY_COLUMNS + ('stage', 'colour', 'size'),
+                  RUN_KEY_COLUMNS + ('stage', 'colour')),
+    'run_metadata': (RUN_KEY_COLUMNS + ('name', 'value'),
+                     RUN_KEY_COLUMNS + ('name',)),
+    'failures': (RUN_KEY_COLUMNS + ('attempt', 'cause', 'message'),
+                 RUN_KEY_COLUMNS + ('attempt',)),
+}
+
+
+def results_db_path(test_group_dir, test_group):
+    """Get the path of a test group's results database."""
+    return "{0}/{1}_results.db".format(test_group_dir, test_group)
+
+
+def connect(db_path, timeout=LOCK_TIMEOUT):
+    """Open a results database, creating its tables if need be."""
+    conn = sqlite3.connect(db_path, timeout=timeout)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    with conn:
+        for table, (columns, key_columns) in TABLE_SCHEMAS.items():
+            conn.execute("CREATE TABLE IF NOT EXISTS {0} ({1}, PRIMARY KEY ({2}))"
+                         .format(table, ", ".join(columns), ", ".join(key_columns)))
+            # columns added since the table was created (e.g. the
+            # resource columns of summaries) are added at the end
+            existing = [row[1] for row in conn.execute("PRAGMA table_info({0})"
+                                                       .format(table))]
+            for column in columns:
+                if column not in existing:
+                    conn.execute("ALTER TABLE {0} ADD COLUMN {1}".format(table, column))
+    return conn
+
+
+def to_sql_value(val):
+    """Convert a value (e.g. a NumPy scalar) to a type SQLite accepts."""
+    if isinstance(val, np.generic):
+        return val.item()
+    return val
+
+
+class ResultsStore(object):
+    """
+    Buffered writer for a single run's results.
+
+    Attributes
+    ----------
+    db_path : path to the results database
+    param_set : param set of the run
+    run_number : run number of the run
+    pending : dict mapping table names to lists of rows
+        which have not yet been written to the database
+    """
+    def __init__(self, db_path, param_set, run_number):
+        self.db_path = db_path
+        self.param_set = param_set
+        self.run_number = run_number
+        self.pending = dict((table, []) for table in TABLE_SCHEMAS)
+
+    def add_row(self, table, row):
+        """Buffer a row for writing to a table."""
+        self.pending[table].append(tuple(to_sql_value(val) for val in row))
+
+    def add_summary(self, summary_vals):
+        """Buffer a run summary (see constants.SUMMARY_COLUMNS)."""
+        self.add_row('summaries', summary_vals)
+
+    def add_clone_summary(self, stage, rows):
+        """Buffer clone summary rows (see clonetable.clone_summary_rows)."""
+        for row in rows:
+            self.add_row('clone_summaries',
+                         (self.param_set, self.run_number, stage) + tuple(row))
+
+    def add_drop_data(self, stage, colours, col_totals):
+        """Buffer the number of cells of each colour."""
+        for colour, size in zip(colours, col_totals):
+            self.add_row('drop_data',
+                         (self.param_set, self.run_number, stage, colour, size))
+
+    def add_run_metadata(self, metadata):
+        """Buffer a dict of (name, value) metadata about the run."""
+        for name, val in sorted(metadata.items()):
+            self.add_row('run_metadata',
+                         (self.param_set, self.run_number, name, str(val)))
+
+    def add_failure(self, attempt, cause, message):
+        """Buffer the cause of a failed attempt (counting from 1) at the run."""
+        self.add_row('failures',
+                     (self.param_set, self.run_number, attempt, cause, message))
+
+    def flush(self):
+        """Write all buffered rows to the database in one transaction."""
+        if not any(self.pending.values()):
+            return
+        conn = connect(self.db_path)
+        try:
+            with conn:
+                for table, rows in self.pending.items():
+                    if rows:
+                        columns = TABLE_SCHEMAS[table][0]
+                        # rerunning (e.g. resuming) a run replaces its rows;
+                        # columns are named, as a table may have columns
+                        # no longer written (left NULL)
+                        conn.executemany("INSERT OR REPLACE INTO {0} ({1}) VALUES ({2})"
+                                         .format(table, ", ".join(columns),
+                                                 ", ".join("?" * len(columns))),
+                                         rows)
+        finally:
+            conn.close()
+        self.pending = dict((table, []) for table in TABLE_SCHEMAS)
+
+
+def export_summaries(db_path, fpath, param_set=None):
+    """
+    Export run summaries to a CSV file.
+
+    The file has the same header as the summary files
+    written by the CSV backend. If `param_set` is given,
+    only that param set's runs are exported.
+    """
+    query = "SELECT * FROM summaries"
+    params = ()
+    if param_set is not None:
+        query += " WHERE param_set = ?"
+        params = (param_set,)
+    query += " ORDER BY param_set, run_number"
+    conn = connect(db_path)
+    try:
+        with open(fpath, 'w') as summary_file:
+            writer = csv.writer(summary_file)
+            writer.writerow(SUMMARY_COLUMNS)
+            writer.writerows(conn.execute(query, params))
+    finally:
+        conn.close()
+
+
+def export_drop_data(db_path, fpath, stage, colours):
+    """
+    Export drop data for one stage to a CSV file.
+
+    The file has a header row of colours, followed by
+    one row of colour totals per run (cf. dropdata.drop).
+    """
+    conn = connect(db_path)
+    try:
+        totals = {}
+        for param_set, run_number, colour, size in conn.execute(
+                "SELECT param_set, run_number, colour, size FROM drop_data "
+                "WHERE stage = ?", (stage,)):
+            run_totals = totals.setdefault((param_set, run_number),
+                                           dict.fromkeys(colours, 0))
+            run_totals[colour] = size
+    finally:
+        conn.close()
+    with open(fpath, 'w') as drop_file:
+        writer = csv.writer(drop_file)
+        writer.writerow(colours)
+        for run_key in sorted(totals):
+            writer.writerow([totals[run_key][colour] for colour in colours])
+
+
+def main():
+    """Export results from a results database to CSV."""
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument('db_path')
+    parser.add_argument('--out', required=True)
+    parser.add_argument('--param_set', default=None)
+    parser.add_argument('--drop_stage', default=None,
+                        help="export drop data for this stage (e.g. mid0, end) "
+                             "instead of run summaries")
+    opt = parser.parse_args()
+
+    if opt.drop_stage:
+        export_drop_data(opt.db_path, opt.out, opt.drop_stage, DROP_COLOURS)
+    else:
+        export_summaries(opt.db_path, opt.out, opt.param_set)
+
+
+if __name__ == '__main__':
+    main()
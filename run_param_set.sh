@@ -72,9 +72,26 @@ while [ $run_number -le $runs_per_param_set ]; do
   sim_params="$sim_params $snapshot"
   sim_params="$sim_params --scale $scale --mscale $mscale"
   sim_params="$sim_params $r_flag $m_flag $z_flag $np_flag"
+  # optional: seed each run (seed + run number), and reuse cached runs
+  # and stored pre-crash populations. Seeded runs share the test group's
+  # pre-crash library, unless the config names another (or sets it empty)
+  if [[ -n $seed ]]; then
+    precrash_library=${precrash_library-$test_group_dir/precrash}
+  fi
+  sim_params="$sim_params ${seed:+--seed $((seed + run_number))}"
+  sim_params="$sim_params ${cache_dir:+--cache_dir $cache_dir}"
+  sim_params="$sim_params ${precrash_library:+--precrash_library $precrash_library}"
+  # optional: memory limits, in MB (see Simulator.check_memory)
+  sim_params="$sim_params ${memory_soft_limit:+--memory_soft_limit $memory_soft_limit}"
+  sim_params="$sim_params ${memory_hard_limit:+--memory_hard_limit $memory_hard_limit}"
 
   # run simulation with the full set of parameters
   python2.7 main.py $sim_params
+  # exit status 3 (main.EXIT_MEMORY_LIMIT): the run stopped at its
+  # hard memory limit, and left a checkpoint to resume from
+  if [[ $? -eq 3 ]]; then
+    echo "Run $run_number stopped at its memory limit; resume it with --resume"
+  fi
 
   run_number=$((run_number+1))
 done
@@ -5,7 +5,7 @@
 
 # check for correct invocation
 E_WRONG_ARGS=85
-script_parameters="[-m MAIL_ADDRESS] [-w WALLTIME] [-q QUEUE_NAME] testgroup_name runs_per_param_set config_file"
+script_parameters="[-m MAIL_ADDRESS] [-w WALLTIME] [-q QUEUE_NAME] [-c CORES_PER_NODE] [-H RESULTS_DB ...] testgroup_name runs_per_param_set config_file"
 
 function usage-exit () {
   echo "Usage: ./`basename $0` $script_parameters"
@@ -20,8 +20,10 @@ walltime="1:00:00"
 queue=""
 mailopt=""
 mailadd=""
+cores_per_node=""
+history=""
 
-while getopts "h?w:m:q:" opt; do
+while getopts "h?w:m:q:c:H:" opt; do
     case "$opt" in
     h|\?)
         usage-exit
@@ -30,8 +32,14 @@ while getopts "h?w:m:q:" opt; do
         ;;
     m)  mailopt="#PBS -m ae"
 	mailadd="#PBS -M "$OPTARG
+	mail_address=$OPTARG
 	;;
     q)  queue="#PBS -q "$OPTARG
+        queue_name=$OPTARG
+        ;;
+    c)  cores_per_node=$OPTARG
+        ;;
+    H)  history="$history $OPTARG"
         ;;
     esac
 done
@@ -67,6 +75,18 @@ else
   test_group=$1
 fi
 
+# with -c, pack all runs into array jobs of CORES_PER_NODE cores,
+# each finishing within WALLTIME (as predicted from the earlier
+# runs in the results databases given with -H; see jobpack.py)
+if [ -n "$cores_per_node" ]; then
+  # (--history takes any number of values, so it is given first)
+  python2.7 jobpack.py generate ${history:+--history $history} \
+    --cores_per_node $cores_per_node --target_walltime $walltime \
+    ${queue_name:+--queue $queue_name} ${mail_address:+--mail $mail_address} \
+    $test_group $runs_per_param_set $tg_config_file
+  exit $?
+fi
+
 # make directory for today's date, unless it already exists
 today=$(date +'%Y-%m-%d')
 today_dir="results/$today"
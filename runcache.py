@@ -0,0 +1,158 @@
+"""
+A local cache of run results, keyed by parameter set and seed.
+
+Test groups often share parameter sets, so re-running a group
+repeats many runs which have been run before. A seeded run is
+reproducible, so its results need only be computed once: a run
+is cached under a hash of its simulation parameters (every
+option but those which only identify or control the run; see
+NON_SIMULATION_PARAMS), its seed, and the source code of the
+simulation modules (see SIMULATION_MODULES), so any change to
+the simulation itself invalidates the cache.
+
+Each entry holds the run's summary values, analytics and end
+condition, in a compressed .npz file named by its key:
+
+    <cache_dir>/<first two characters of key>/<key>.npz
+
+Entries are written under a temporary name and then renamed, so
+concurrent runs can share a cache. Unseeded runs, and runs which
+save a snapshot, are not cached.
+"""
+import hashlib
+import json
+import os
+import tempfile
+from collections import OrderedDict
+import numpy as np
+from checkpoint import RUN_CONTROL_PARAMS
+from constants import SUMMARY_COLUMNS
+from plotdata import ANALYTICS_ATTRS
+from utils import make_path_unless_exists, delete_local_file
+
+# options which identify a run, or control how it is run or
+# recorded, rather than what is simulated
+NON_SIMULATION_PARAMS = set(['test_group', 'param_set', 'run_number',
+                             'test_group_dir', 'param_set_dir', 'run_dir',
+                             'r_output', 'cache_dir'] + RUN_CONTROL_PARAMS)
+
+# options naming input files, which are keyed by the files' contents
+FILE_PARAMS = ['sub_file', 'snapshot_archive']
+
+# modules whose source determines a run's results
+SIMULATION_MODULES = ['simulator', 'population', 'subpopulation', 'mutation',
+                      'treatment', 'analytics', 'constants', 'snapshot',
+                      'checkpoint', 'clonetable']
+
+# the hash of the simulation modules' source, once calculated
+_code_version = None
+
+
+def code_version():
+    """Get a hash of the source code of the simulation modules."""
+    global _code_version
+    if _code_version is None:
+        src_dir = os.path.dirname(os.path.abspath(__file__))
+        code_hash = hashlib.sha1()
+        for module in SIMULATION_MODULES:
+            with open(os.path.join(src_dir, module + ".py"), 'rb') as src_file:
+                code_hash.update(src_file.read())
+        _code_version = code_hash.hexdigest()
+    return _code_version
+
+
+def file_hash(fpath):
+    """Get a hash of a file's contents."""
+    with open(fpath, 'rb') as input_file:
+        return hashlib.sha1(input_file.read()).hexdigest()
+
+
+def run_key(opt):
+    """
+    Get the cache key of a run.
+
+    Returns None if the run cannot be cached (because it
+    is unseeded, or saves a snapshot).
+    """
+    if getattr(opt, 'seed', None) is None or opt.save_snapshot:
+        return None
+    params = {}
+    for name, val in vars(opt).items():
+        if name in NON_SIMULATION_PARAMS:
+            continue
+        if name in FILE_PARAMS and val:
+            val = file_hash(val)
+        params[name] = val
+    key_data = json.dumps({'params': params, 'code': code_version()},
+                          sort_keys=True)
+    return hashlib.sha1(key_data.encode('utf-8')).hexdigest()
+
+
+def entry_path(cache_dir, key):
+    """Get the path of a cache entry."""
+    return os.path.join(cache_dir, key[:2], key + ".npz")
+
+
+class CachedRun(object):
+    """
+    The cached results of a run.
+
+    Attributes
+    ----------
+    summary : OrderedDict of summary values, keyed by
+        constants.SUMMARY_COLUMNS
+    analytics : dict of NumPy arrays, keyed by analytics attribute
+    end_condition : why the simulation ended (see constants)
+    runtime : runtime of the original run, in seconds
+    """
+    def __init__(self, summary, analytics, end_condition, runtime):
+        self.summary = summary
+        self.analytics = analytics
+        self.end_condition = end_condition
+        self.runtime = runtime
+
+
+def load_run(cache_dir, key):
+    """Load a cached run, or return None if it has not been cached."""
+    fpath = entry_path(cache_dir, key)
+    if not os.path.exists(fpath):
+        return None
+    with np.load(fpath) as arrays:
+        summary = OrderedDict(zip(SUMMARY_COLUMNS,
+                                  json.loads(arrays['summary'].item())))
+        analytics = dict((name, arrays[name]) for name in ANALYTICS_ATTRS)
+        return CachedRun(summary, analytics,
+                         arrays['end_condition'].item(),
+                         arrays['runtime'].item())
+
+
+def save_run(cache_dir, key, sim):
+    """Cache the results of a finished Simulator run."""
+    fpath = entry_path(cache_dir, key)
+    make_path_unless_exists(os.path.dirname(fpath))
+    anlt = sim.popn.analytics_base
+    arrays = dict((name, np.array(getattr(anlt, name)))
+                  for name in ANALYTICS_ATTRS)
+    arrays['summary'] = np.array(json.dumps([to_json_value(val)
+                                             for val in sim.summary.values()]))
+    arrays['end_condition'] = np.array(sim.end_condition)
+    arrays['runtime'] = np.array(sim.runtime)
+
+    # write under a temporary name, then rename, so that
+    # a partly written entry is never loaded
+    tmp_fd, tmp_fpath = tempfile.mkstemp(dir=os.path.dirname(fpath),
+                                         suffix=".part")
+    try:
+        with os.fdopen(tmp_fd, 'wb') as tmp_file:
+            np.savez_compressed(tmp_file, **arrays)
+        os.rename(tmp_fpath, fpath)
+    except Exception:
+        delete_local_file(tmp_fpath)
+        raise
+
+
+def to_json_value(val):
+    """Convert a value (e.g. a NumPy scalar) to a type JSON accepts."""
+    if isinstance(val, np.generic):
+        return val.item()
+    return val
@@ -0,0 +1,189 @@
+"""
+Predict the runtime of a simulation from its parameters.
+
+A run's runtime is the number of cycles it lasts times the time
+each cycle takes. A run lasts from a few hundred cycles (if the
+population dies out soon after the crash) to `max_cycles`, and
+the time per cycle grows with the number of clones, so runtimes
+within a test group range from seconds to days.
+
+The model is fitted to earlier runs recorded in results databases
+(see results_store), which hold each run's elapsed time and cycles
+(in the summaries table) and its parameters (in the run_metadata
+table). The logs of the number of cycles and of the time per
+cycle are each fitted by (ridge) least squares to the run
+parameters in FEATURES (the scale parameters in LOG_FEATURES by
+their logs). The predicted runtime is the product of the two.
+
+Without enough earlier runs, the model falls back on a nominal
+cost per cycle, times `max_cycles`. That is only useful for
+ordering runs, and for estimates which are then corrected by
+the runtimes actually observed (see sweep).
+"""
+import math
+import sqlite3
+import numpy as np
+from utils import hms_to_secs
+
+# run parameters the runtime is predicted from
+FEATURES = ['max_cycles', 'max_size_lim', 'init_size', 'select_time',
+            'pro', 'die', 'mut', 'select_pressure', 'mutagenic_pressure',
+            'prob_mut_pos', 'prob_mut_neg', 'prob_inc_mut', 'prob_dec_mut',
+            'scale', 'mscale']
+
+# scale parameters, which are fitted by their logs
+LOG_FEATURES = set(['max_cycles', 'max_size_lim', 'init_size', 'select_time'])
+
+# fewest earlier runs the model is fitted to
+MIN_TRAINING_RUNS = 10
+
+RIDGE_PENALTY = 1e-3
+
+# cost per cycle assumed without earlier runs
+NOMINAL_SECS_PER_CYCLE = 1e-3
+
+
+def to_number(val):
+    """Convert a stored parameter value to a float, or None."""
+    try:
+        return float(val)
+    except (TypeError, ValueError):
+        if val == 'True':
+            return 1.0
+        if val == 'False':
+            return 0.0
+        return None
+
+
+def param_features(params):
+    """
+    Get the feature vector of a run, from a dict of its parameters.
+
+    Missing or non-numeric parameters are taken to be zero.
+    """
+    features = []
+    for name in FEATURES:
+        val = to_number(params.get(name))
+        if val is None:
+            val = 0.0
+        if name in LOG_FEATURES:
+            val = math.log(max(val, 1.0))
+        features.append(val)
+    return np.array(features)
+
+
+class TrainingRun(object):
+    """
+    An earlier run the model is fitted to.
+
+    Attributes
+    ----------
+    params : dict of the run's parameters
+    runtime : the run's runtime, in seconds
+    cycles : number of cycles the run lasted
+    """
+    def __init__(self, params, runtime, cycles):
+        self.params = params
+        self.runtime = runtime
+        self.cycles = cycles
+
+
+def load_training_runs(db_paths):
+    """Load the runs recorded in results databases, as TrainingRuns."""
+    runs = []
+    for db_path in db_paths:
+        conn = sqlite3.connect(db_path)
+        try:
+            params = {}
+            for param_set, run_number, name, val in conn.execute(
+                    "SELECT param_set, run_number, name, value FROM run_metadata"):
+                params.setdefault((param_set, run_number), {})[name] = val
+            for param_set, run_number, elapsed_time, elapsed_cycles in conn.execute(
+                    "SELECT param_set, run_number, elapsed_time, elapsed_cycles "
+                    "FROM summaries"):
+                run_key = (param_set, run_number)
+                if run_key in params:
+                    runs.append(TrainingRun(params[run_key],
+                                            hms_to_secs(elapsed_time),
+                                            int(elapsed_cycles)))
+        finally:
+            conn.close()
+    return runs
+
+
+def fit_ridge(features, targets):
+    """
+    Fit targets to (standardised) features by ridge least squares.
+
+    Returns
+    -------
+    3-tuple (coefs, means, scales), such that the prediction
+    for features x is coefs[0] + dot(coefs[1:], (x - means) / scales).
+    """
+    means = features.mean(axis=0)
+    scales = features.std(axis=0)
+    # features which never vary carry no information
+    scales[scales == 0] = np.inf
+    std_features = (features - means) / scales
+    design = np.column_stack((np.ones(len(targets)), std_features))
+    penalty = RIDGE_PENALTY * np.eye(design.shape[1])
+    penalty[0, 0] = 0.0
+    coefs = np.linalg.solve(design.T.dot(design) + penalty,
+                            design.T.dot(targets))
+    return coefs, means, scales
+
+
+def apply_fit(fit, features):
+    """Predict a target from features, with a fit from fit_ridge()."""
+    coefs, means, scales = fit
+    return coefs[0] + coefs[1:].dot((features - means) / scales)
+
+
+class RuntimeModel(object):
+    """
+    Predict a run's runtime, in seconds, from its parameters.
+
+    Attributes
+    ----------
+    num_training_runs : number of runs the model was fitted to
+        (zero if it has not been fitted)
+    cycle_fit : fit of the log number of cycles (see fit_ridge)
+    rate_fit : fit of the log time per cycle (see fit_ridge)
+    """
+    def __init__(self):
+        self.num_training_runs = 0
+        self.cycle_fit = None
+        self.rate_fit = None
+
+    def __repr__(self):
+        return "{}({} training runs)".format(self.__class__.__name__,
+                                             self.num_training_runs)
+
+    def fit(self, runs):
+        """
+        Fit the model to a list of TrainingRuns.
+
+        With fewer than MIN_TRAINING_RUNS runs, the
+        model is left unfitted. Returns the model.
+        """
+        runs = [run for run in runs if run.cycles > 0 and run.runtime > 0]
+        if len(runs) < MIN_TRAINING_RUNS:
+            return self
+        features = np.array([param_features(run.params) for run in runs])
+        log_cycles = np.log([run.cycles for run in runs])
+        log_rates = np.log([run.runtime / run.cycles for run in runs])
+        self.cycle_fit = fit_ridge(features, log_cycles)
+        self.rate_fit = fit_ridge(features, log_rates)
+        self.num_training_runs = len(runs)
+        return self
+
+    def predict(self, params):
+        """Predict the runtime of a run, from a dict of its parameters."""
+        max_cycles = to_number(params.get('max_cycles')) or 0.0
+        if not self.num_training_runs:
+            return NOMINAL_SECS_PER_CYCLE * max_cycles
+        features = param_features(params)
+        cycles = math.exp(apply_fit(self.cycle_fit, features))
+        if max_cycles:
+            cycles = min(cycles, max_cycles)
+        return cycles * math.exp(apply_fit(self.rate_fit, features))
@@ -0,0 +1,309 @@
+"""
+A local simulation daemon, and a client for submitting runs to it.
+
+The daemon keeps a pool of warm worker processes (see workerpool),
+so that a submitted run starts straight away, without paying for
+interpreter start-up and imports. It listens on a Unix socket for
+runs, given as main.py command line arguments; it queues them,
+runs them in turn, and reports their status and result paths.
+
+Start the daemon (it runs in the foreground until stopped):
+
+    python simdaemon.py start --workers 4
+
+Submit a run (the arguments after `--` are passed to main.py, and
+relative paths are taken relative to the current directory):
+
+    python simdaemon.py submit [--wait] -- --test_group tg --param_set 1 ...
+
+Check on runs, and stop the daemon once its queued runs finish:
+
+    python simdaemon.py status [JOB_ID]
+    python simdaemon.py stop
+
+Requests and responses are single lines of JSON. A request is an
+object with a 'command' ('submit', 'status' or 'stop') and its
+arguments; a response has 'ok' set to true, or else false with an
+'error' message.
+"""
+from __future__ import print_function
+import argparse
+import errno
+import json
+import os
+import socket
+import sys
+import threading
+import time
+try:
+    import socketserver
+except ImportError:
+    import SocketServer as socketserver
+try:
+    from StringIO import StringIO
+except ImportError:
+    from io import StringIO
+import main
+import workerpool
+
+DEFAULT_SOCKET = os.path.expanduser("~/.popln_simdaemon.sock")
+
+# seconds between status requests when waiting for a run
+POLL_INTERVAL = 1.0
+
+
+class SimulationDaemon(object):
+    """
+    Queue submitted runs, and track their progress.
+
+    Attributes
+    ----------
+    pool : the WorkerPool which runs the jobs
+    jobs : dict mapping job IDs to job records (dicts
+        with the job's state, arguments, timings, and its
+        result or error)
+    lock : lock guarding the job records
+    """
+    def __init__(self, num_workers=None):
+        self.pool = workerpool.WorkerPool(num_workers)
+        self.jobs = {}
+        self.num_jobs_submitted = 0
+        self.lock = threading.Lock()
+        self.event_thread = None
+
+    def start(self):
+        """Start the worker pool, and a thread to track job progress."""
+        self.pool.start()
+        self.event_thread = threading.Thread(target=self.track_jobs)
+        self.event_thread.daemon = True
+        self.event_thread.start()
+
+    def stop(self):
+        """Wait for all queued jobs to finish, then stop the workers."""
+        self.pool.close()
+        self.event_thread.join()
+
+    def track_jobs(self):
+        """Update job records from worker events, until the pool closes."""
+        while True:
+            event = self.pool.get_event()
+            if event is None:
+                break
+            state, job_id, detail = event
+            with self.lock:
+                job = self.jobs[job_id]
+                job['state'] = state
+                if state == 'running':
+                    job['pid'] = detail
+                    job['started'] = time.time()
+                else:
+                    job['finished'] = time.time()
+                    job['result' if state == 'done' else 'error'] = detail
+            print("JOB {} {}".format(job_id, state.upper()))
+            sys.stdout.flush()
+
+    def handle_request(self, request):
+        """Carry out a client request, and return the response."""
+        command = request.get('command')
+        if command == 'submit':
+            job_id = self.submit(request['args'], request['cwd'])
+            return {'ok': True, 'job_id': job_id}
+        elif command == 'status':
+            with self.lock:
+                job_id = request.get('job_id')
+                if job_id is None:
+                    return {'ok': True, 'jobs': sorted(self.jobs.values(),
+                                                       key=lambda job: job['job_id'])}
+                if job_id not in self.jobs:
+                    raise ValueError("no such job: {}".format(job_id))
+                return {'ok': True, 'job': self.jobs[job_id]}
+        elif command == 'stop':
+            return {'ok': True}
+        raise ValueError("unknown command: {}".format(command))
+
+    def submit(self, args, cwd):
+        """
+        Queue a run, and return its job ID.
+
+        Raises
+        ------
+        ValueError: if `args` are not valid main.py arguments.
+        """
+        check_args(args)
+        with self.lock:
+            self.num_jobs_submitted += 1
+            job_id = self.num_jobs_submitted
+            self.jobs[job_id] = {'job_id': job_id, 'state': 'queued',
+                                 'args': args, 'cwd': cwd,
+                                 'submitted': time.time(),
+                                 'started': None, 'finished': None,
+                                 'pid': None, 'result': None, 'error': None}
+        print("JOB {} QUEUED: {}".format(job_id, " ".join(args)))
+        sys.stdout.flush()
+        self.pool.submit(job_id, args, cwd)
+        return job_id
+
+
+# parsing arguments can print to stderr, which is shared by all threads
+parse_lock = threading.Lock()
+
+
+def check_args(args):
+    """Raise a ValueError if `args` are not valid main.py arguments."""
+    with parse_lock:
+        saved_stderr = sys.stderr
+        sys.stderr = StringIO()
+        try:
+            main.parse_cmd_line_args(args)
+        except SystemExit:
+            raise ValueError("invalid arguments: " + sys.stderr.getvalue().strip())
+        finally:
+            sys.stderr = saved_stderr
+
+
+class RequestHandler(socketserver.StreamRequestHandler):
+    """Read a single JSON request, and write back the JSON response."""
+    def handle(self):
+        request = {}
+        try:
+            request = json.loads(self.rfile.readline().decode('utf-8'))
+            response = self.server.sim_daemon.handle_request(request)
+        except Exception as err:
+            response = {'ok': False, 'error': str(err)}
+        self.wfile.write((json.dumps(response) + "\n").encode('utf-8'))
+        if request.get('command') == 'stop' and response['ok']:
+            # shutdown() waits for serve_forever() to return,
+            # so it must be called from a different thread
+            threading.Thread(target=self.server.shutdown).start()
+
+
+class DaemonServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """Serve each client connection in its own thread."""
+    daemon_threads = True
+
+
+def serve(socket_path=DEFAULT_SOCKET, num_workers=None):
+    """Run the daemon until a stop request is received."""
+    if os.path.exists(socket_path):
+        try:
+            send_request(socket_path, {'command': 'status', 'job_id': None})
+        except socket.error:
+            # left behind by a daemon which did not stop cleanly
+            os.remove(socket_path)
+        else:
+            raise RuntimeError("a daemon is already listening on "
+                               + socket_path)
+
+    sim_daemon = SimulationDaemon(num_workers)
+    sim_daemon.start()
+    server = DaemonServer(socket_path, RequestHandler)
+    server.sim_daemon = sim_daemon
+    print("Listening on {} with {} workers".format(socket_path,
+                                                  sim_daemon.pool.num_workers))
+    sys.stdout.flush()
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+        os.remove(socket_path)
+        print("Waiting for queued runs to finish ...")
+        sim_daemon.stop()
+
+
+def send_request(socket_path, request):
+    """
+    Send a request to the daemon, and return its response.
+
+    Raises
+    ------
+    socket.error: if the daemon cannot be reached.
+    RuntimeError: if the daemon could not carry out the request.
+    """
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(socket_path)
+        sock.sendall((json.dumps(request) + "\n").encode('utf-8'))
+        response = json.loads(sock.makefile('rb').readline().decode('utf-8'))
+    finally:
+        sock.close()
+    if not response['ok']:
+        raise RuntimeError(response['error'])
+    return response
+
+
+def wait_for_job(socket_path, job_id, poll_interval=POLL_INTERVAL):
+    """Wait for a job to finish, and return its job record."""
+    while True:
+        job = send_request(socket_path, {'command': 'status',
+                                         'job_id': job_id})['job']
+        if job['state'] in ('done', 'failed'):
+            return job
+        time.sleep(poll_interval)
+
+
+def format_job(job):
+    """Describe a job record in a line or two of text."""
+    lines = ["{0:>5}  {1:<8}  {2}".format(job['job_id'], job['state'],
+                                          " ".join(job['args']))]
+    if job['result']:
+        lines.append("       run dir: {}".format(job['result']['run_dir']))
+        lines.append("       results: {}".format(", ".join(job['result']['results'])))
+    if job['error']:
+        lines.append("       {}: {}".format(job['error']['cause'],
+                                            job['error']['message'].strip().splitlines()[-1]))
+    return "\n".join(lines)
+
+
+def main_cli():
+    """Start, stop, or submit runs to a simulation daemon."""
+    parser = argparse.ArgumentParser(description=main_cli.__doc__)
+    parser.add_argument('--socket', default=DEFAULT_SOCKET)
+    commands = parser.add_subparsers(dest='command')
+
+    start_cmd = commands.add_parser('start')
+    start_cmd.add_argument('--workers', type=int, default=None)
+
+    submit_cmd = commands.add_parser('submit')
+    submit_cmd.add_argument('--wait', action="store_true", default=False)
+    submit_cmd.add_argument('args', nargs=argparse.REMAINDER)
+
+    status_cmd = commands.add_parser('status')
+    status_cmd.add_argument('job_id', type=int, nargs='?', default=None)
+
+    commands.add_parser('stop')
+    opt = parser.parse_args()
+
+    try:
+        if opt.command == 'start':
+            serve(opt.socket, opt.workers)
+        elif opt.command == 'submit':
+            args = opt.args
+            if args and args[0] == '--':
+                args = args[1:]
+            job_id = send_request(opt.socket, {'command': 'submit',
+                                               'args': args,
+                                               'cwd': os.getcwd()})['job_id']
+            print("Submitted job {}".format(job_id))
+            if opt.wait:
+                job = wait_for_job(opt.socket, job_id)
+                print(format_job(job))
+                if job['state'] == 'failed':
+                    raise SystemExit(1)
+        elif opt.command == 'status':
+            response = send_request(opt.socket, {'command': 'status',
+                                                 'job_id': opt.job_id})
+            for job in response.get('jobs', [response.get('job')]):
+                print(format_job(job))
+        elif opt.command == 'stop':
+            send_request(opt.socket, {'command': 'stop'})
+            print("Daemon stopping once queued runs finish")
+    except socket.error as err:
+        if err.errno in (errno.ENOENT, errno.ECONNREFUSED):
+            raise SystemExit("No daemon is listening on " + opt.socket)
+        raise
+    except RuntimeError as err:
+        raise SystemExit("Error: {}".format(err))
+
+
+if __name__ == '__main__':
+    main_cli()
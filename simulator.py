@@ -22,19 +22,33 @@ Change log
 from __future__ import print_function
 import time
 import os
+import random
 import csv
+from collections import OrderedDict
 from textwrap import dedent
 import numpy as np
 import population
 import treatment
 import analytics
 import snapshot
+import checkpoint
+import precrash
 import mutation
+import resources
 from utils import secs_to_hms
-import tree_to_xml
+import tree_export
+import clonetable
+import results_store
+import outputworker
 import plotdata
 import dropdata
+from subpopulation import Subpopulation
 from constants import END_POP_TOO_LARGE, END_POP_DIED_OUT, END_MAX_CYCLES, END_SAVE_SNAPSHOT
+from constants import END_MEMORY_LIMIT
+from constants import SUMMARY_COLUMNS
+
+# outputs which are written from a copy of the clone tree
+TABLE_OUTPUTS = ('clone_summary', 'plot_data', 'plots', 'tree', 'drop_data')
 
 
 class Simulator(object):
@@ -54,11 +68,23 @@ class Simulator(object):
         elapsed in simulation.
     popn : the tumour
     treatmt : the treatment
+    end_condition : why the simulation ended, once finished
+    summary : OrderedDict of the run's summary values (see
+        constants.SUMMARY_COLUMNS), once finished
+    resources : the ResourceUsage of the run (see resources)
+    forced_pruning : whether clone pruning was switched on
+        by the soft memory limit (see check_memory)
     """
-    def __init__(self, opt):
+    def __init__(self, opt, ckpt=None):
         """
         Initialise Simulator from command line parameters.
 
+        Args
+        ----
+        opt : the run's parameter set
+        ckpt : a loaded checkpoint (see checkpoint.load_checkpoint)
+            to continue from, rather than starting a new run
+
         Note
         ----
         See popln.main.parse_cmd_line_args() for a
@@ -67,6 +93,9 @@ class Simulator(object):
         # copy entire option set
         self.opt = opt
 
+        # account for the resources used from here on
+        self.resources = resources.ResourceUsage()
+
         # copy over identifier variables
         self.test_group = opt.test_group
         self.param_set = opt.param_set
@@ -75,7 +104,47 @@ class Simulator(object):
         self.param_set_dir = opt.param_set_dir
         self.run_dir = opt.run_dir
 
-        if opt.load_snapshot:
+        # when resuming, look for a checkpoint to continue from
+        if ckpt is None and opt.resume:
+            ckpt = checkpoint.load_latest_checkpoint(self.run_dir)
+            if ckpt is None:
+                print("No valid checkpoint found; starting run from scratch")
+
+        # a resumed run restores its generators' state instead
+        if not ckpt and opt.seed is not None:
+            random.seed(opt.seed)
+            np.random.seed(opt.seed)
+
+        # a seeded run may start from a stored pre-crash
+        # population, instead of growing its own (see precrash)
+        self.precrash_key = None
+        precrash_entry = None
+        if not ckpt and opt.precrash_library:
+            self.precrash_key = precrash.precrash_key(opt)
+        if self.precrash_key:
+            precrash_entry = precrash.load_entry(opt.precrash_library,
+                                                 self.precrash_key)
+            # a run which ends before the stored cycle must grow its own
+            if precrash_entry and precrash_entry[0]['t_curr'] + 1 >= opt.max_cycles:
+                precrash_entry = None
+        self.from_precrash = precrash_entry is not None
+
+        if ckpt:
+            ckpt_state, ckpt_opt, popn = ckpt
+            print("Resuming from checkpoint at cycle {}".format(ckpt_state['t_curr']))
+
+            # simulation parameters are taken from the checkpoint,
+            # but options controlling how the run is executed
+            # are taken from this invocation
+            for param in checkpoint.RUN_CONTROL_PARAMS:
+                setattr(ckpt_opt, param, getattr(opt, param))
+            self.opt = ckpt_opt
+            popn.opt = self.opt
+            self.popn = popn
+
+            # the checkpointed cycle has already been completed
+            self.start_cycle = ckpt_state['t_curr'] + 1
+        elif opt.load_snapshot:
             print("Loading population ...")
             start_load = time.time()
 
@@ -107,10 +176,30 @@ class Simulator(object):
 
             # start from snapshot cycle
             self.start_cycle = curr_cycle
+        elif precrash_entry:
+            precrash_state, precrash_opt, popn = precrash_entry
+            print("Loading pre-crash population from cycle {}".format(precrash_state['t_curr']))
+
+            # the stored population was grown with the same
+            # pre-treatment parameters, so only the derived
+            # proliferation limit needs to be copied over
+            self.opt.prolif_lim = precrash_opt.prolif_lim
+            self.popn = popn
+            self.popn.opt = self.opt
+
+            # treatment is introduced in the first cycle
+            # after the stored population was recorded
+            self.start_cycle = precrash_state['t_curr'] + 1
+            self.opt.select_time = self.start_cycle
         else:
             # manually calculate proliferation limit
             self.opt.prolif_lim = opt.pro - opt.die
 
+            # number clones and mutations from zero, even if
+            # this process has already run a simulation
+            Subpopulation.num_clones_created = 0
+            mutation.Mutation.num_muts_created = 0
+
             # create a new Population
             self.popn = population.Population(self.opt)
 
@@ -124,6 +213,28 @@ class Simulator(object):
         self.treatment_introduced = False
         self.runtime = None
         self.total_cycles = self.max_cycles
+        # runtime accumulated before this process started
+        # (non-zero only when resuming from a checkpoint)
+        self.prior_runtime = 0.0
+        self.start_time = None
+        self.last_checkpoint_time = None
+        self.end_condition = None
+        self.summary = None
+        self.forced_pruning = False
+
+        # with the SQLite backend, results are buffered here, and
+        # written to the test group's database in batches
+        self.results_store = None
+        if self.opt.results_backend == 'sqlite' and self.opt.outputs:
+            db_path = results_store.results_db_path(self.test_group_dir,
+                                                    self.test_group)
+            self.results_store = results_store.ResultsStore(db_path,
+                                                            self.param_set,
+                                                            self.run_number)
+
+        # writes output files in the background (see outputworker)
+        self.output_worker = outputworker.OutputWorker(background=not self.opt.sync_output)
+        self.resources.output_worker = self.output_worker
 
         # finally, create Treatment object
         if opt.treatment_type == 'single_dose':
@@ -135,6 +246,20 @@ class Simulator(object):
         else:
             raise ValueError("Bad value for treatment type parameter")
 
+        if ckpt:
+            checkpoint.restore_run_state(self, ckpt_state)
+            self.prior_runtime = ckpt_state['elapsed_time']
+            # checkpoints written before resources were accounted for
+            # lack the usage, which is then counted from here
+            if 'resources' in ckpt_state:
+                self.resources.restore(ckpt_state['resources'])
+            # pruning forced on before the checkpoint stays on
+            # (prune_clones is restored with the parameters)
+            self.forced_pruning = ckpt_state.get('forced_pruning', False)
+        elif precrash_entry:
+            # treatment starts afresh, with this run's parameters
+            checkpoint.restore_random_state(precrash_state)
+
 
     def __repr__(self):
         return "{}({}, ps {}, run {})".format(self.__class__.__name__,
@@ -161,36 +286,51 @@ class Simulator(object):
         Returns
         -------
         None. Concludes with a call to Simulator.finish().
+
+        Raises
+        ------
+        resources.MemoryLimitExceeded: if the run exceeds its
+            hard memory limit (see stop_for_memory).
         """
 
         # begin timing simulation
         start_time = time.time()
+        self.start_time = start_time
+        self.last_checkpoint_time = start_time
 
         end_condition = END_MAX_CYCLES
-        for t_curr in xrange(start_cycle, self.max_cycles):
-            self.update(t_curr)
-
-            # test for end conditions
-            if self.popn.exceeds_size_limit(self.max_size_lim, tolerance=0.05):
-                if self.treatmt.is_introduced:
-                    end_condition = END_POP_TOO_LARGE
+        try:
+            for t_curr in xrange(start_cycle, self.max_cycles):
+                self.update(t_curr)
+
+                # test for end conditions
+                cycle_end_condition = self.check_end_conditions()
+                if cycle_end_condition:
+                    end_condition = cycle_end_condition
                     self.total_cycles = t_curr
                     break
-            if self.popn.is_dead():
-                end_condition = END_POP_DIED_OUT
-                self.total_cycles = t_curr
-                break
-            if self.treatmt.is_introduced and self.opt.save_snapshot:
-                end_condition = END_SAVE_SNAPSHOT
-                self.total_cycles = t_curr
-                break
-
-        # finish timing
-        end_time = time.time()
-        self.runtime = end_time - start_time
-
-        # end simulation
-        self.finish(end_condition)
+
+                if t_curr % resources.SAMPLE_CYCLES == 0:
+                    self.resources.sample(self.popn)
+                    if self.check_memory() == END_MEMORY_LIMIT:
+                        elapsed = self.prior_runtime + time.time() - start_time
+                        self.stop_for_memory(t_curr, elapsed)
+
+                if self.checkpoint_due(t_curr):
+                    elapsed = self.prior_runtime + time.time() - start_time
+                    self.save_checkpoint(t_curr, elapsed)
+
+            # finish timing
+            end_time = time.time()
+            self.runtime = self.prior_runtime + end_time - start_time
+
+            # end simulation
+            self.finish(end_condition)
+        finally:
+            # the output worker has been closed if the run finished;
+            # if it failed, stop the worker, so that it is not left
+            # running, and the calling process can exit
+            self.output_worker.terminate()
 
     def update(self, t_curr):
         """
@@ -215,15 +355,125 @@ class Simulator(object):
         self.popn.analytics_base.update(self.popn, self.treatmt, t_curr)
 
         # print status message
-        if t_curr % 1000 == 0:
+        if t_curr % 1000 == 0 and not self.opt.quiet:
             self.print_status_update(t_curr)
 
+    def check_end_conditions(self):
+        """
+        Test whether the simulation should end after this time step.
+
+        Returns
+        -------
+        The end condition met (see constants), or None.
+        """
+        if self.popn.exceeds_size_limit(self.max_size_lim, tolerance=0.05):
+            if self.treatmt.is_introduced:
+                return END_POP_TOO_LARGE
+        if self.popn.is_dead():
+            return END_POP_DIED_OUT
+        if self.treatmt.is_introduced and self.opt.save_snapshot:
+            return END_SAVE_SNAPSHOT
+        return None
+
+    def check_memory(self):
+        """
+        Check the run's memory use against its limits.
+
+        Past the soft limit (`memory_soft_limit` MB), clone
+        pruning is switched on for the rest of the run (see
+        Population.update), and memory is compacted each time
+        it is checked. Either limit is disabled by setting it
+        to zero.
+
+        Returns
+        -------
+        END_MEMORY_LIMIT if memory use exceeds the hard
+        limit (`memory_hard_limit` MB), otherwise None.
+        """
+        soft_limit = self.opt.memory_soft_limit * 2**20
+        hard_limit = self.opt.memory_hard_limit * 2**20
+        if not soft_limit and not hard_limit:
+            return None
+        mem_use = resources.memory_use(self.popn)
+        if hard_limit and mem_use > hard_limit:
+            return END_MEMORY_LIMIT
+        if soft_limit and mem_use > soft_limit:
+            if not self.opt.prune_clones:
+                print("Memory use ({:.0f} MB) exceeded soft limit; "
+                      "pruning clones".format(mem_use / 2.0**20))
+                self.opt.prune_clones = True
+                self.forced_pruning = True
+                # the population no longer grows as its
+                # pre-crash library key describes
+                self.precrash_key = None
+            self.popn.subpop.prune_dead_end_clones()
+            resources.compact_memory()
+        return None
+
+    def stop_for_memory(self, t_curr, elapsed_time):
+        """
+        Stop a run which has exceeded its hard memory limit.
+
+        A checkpoint is written, so that the run can be
+        resumed (with --resume, e.g. with a higher limit);
+        no summary or end-of-run outputs are written.
+
+        Raises
+        ------
+        resources.MemoryLimitExceeded
+        """
+        print("SIMULATION ENDED: {}".format(END_MEMORY_LIMIT))
+        self.end_condition = END_MEMORY_LIMIT
+        self.total_cycles = t_curr
+        self.runtime = elapsed_time
+        self.save_checkpoint(t_curr, elapsed_time)
+        self.output_worker.close()
+        if self.results_store:
+            self.results_store.flush()
+        raise resources.MemoryLimitExceeded(
+            "{} exceeded its hard memory limit ({} MB) at cycle {}; "
+            "resume it from {}".format(self, self.opt.memory_hard_limit, t_curr,
+                                       checkpoint.checkpoint_dir(self.run_dir)))
+
+    def checkpoint_due(self, t_curr):
+        """
+        Determine whether to write a checkpoint after this time step.
+
+        A checkpoint is due every `checkpoint_every` cycles,
+        or once `checkpoint_interval` minutes have passed since
+        the last checkpoint; either trigger is disabled by
+        setting it to zero.
+        """
+        every = self.opt.checkpoint_every
+        if every > 0 and (t_curr + 1) % every == 0:
+            return True
+        interval = self.opt.checkpoint_interval
+        if interval > 0:
+            mins_elapsed = (time.time() - self.last_checkpoint_time) / 60.0
+            return mins_elapsed >= interval
+        return False
+
+    def save_checkpoint(self, t_curr, elapsed_time):
+        """Write a checkpoint, and delete all but the newest few."""
+        checkpoint.save_checkpoint(self, t_curr, elapsed_time)
+        checkpoint.prune_checkpoints(self.run_dir, self.opt.checkpoint_keep)
+        self.last_checkpoint_time = time.time()
+
+    def writes(self, output):
+        """Determine whether this run writes an output (see constants.OUTPUTS)."""
+        if output == 'plots' and self.opt.no_plots:
+            return False
+        return output in self.opt.outputs
+
     def finish(self, end_condition):
         """
         Complete the simulation.
 
-        Write summary files and print plots
-        to complete this sim run.
+        Write the run's outputs and print plots, then record
+        its summary, to complete this sim run. The summary is
+        written last, so that it accounts for the resources
+        used in writing the other outputs, but is written even
+        if they fail.
 
         Args
         ----
@@ -235,25 +485,51 @@ class Simulator(object):
         None.
         """
         print("SIMULATION ENDED: {}".format(end_condition))
-        # write to summary file
-        self.write_summary(self.popn, self.treatmt,
-                           self.total_cycles, self.runtime)
-        self.write_clone_summary(self.popn, label="end")
+        self.end_condition = end_condition
+        # wait for outputs from treatment introduction to be written;
+        # from here on, outputs are written in this process (and
+        # still timed by the output worker; see resources)
+        self.output_worker.close()
+        summary_vals = self.summary_values(self.popn, self.treatmt,
+                                           self.total_cycles, self.runtime)
+        try:
+            self.write_end_outputs()
+        finally:
+            # write to summary file, with the resources used,
+            # even if some other output could not be written
+            summary_vals += self.resources.summary_values(self.popn)
+            self.summary = OrderedDict(zip(SUMMARY_COLUMNS, summary_vals))
+            if self.writes('summary'):
+                self.write_summary(summary_vals)
+            if self.results_store:
+                self.results_store.add_run_metadata(vars(self.opt))
+                self.results_store.flush()
+
+    def write_end_outputs(self):
+        """Write the clone summary, analytics, plots and tree at the end of the run."""
+        table = self.tree_table()
+        self.write_clone_summary(table, label="end")
         # dump all run data to CSV file
-        data_dump_fpath = "{0}/data/analytics_data.csv".format(self.run_dir)
-        self.popn.analytics_base.write_to_file(data_dump_fpath)
-        # make plots
-        if not self.opt.no_plots:
-            plotdata.print_results(self.popn, "end", self.total_cycles)
-            plotdata.print_plots(self.popn, "new")
-        fname = ""
-        # write phylogenetic tree to XML file
-        tree_to_xml.tree_parse(self.popn.subpop, self.popn.tumoursize,
-                               self.total_cycles, self.run_dir, fname)
+        if self.writes('analytics'):
+            data_dump_fpath = "{0}/data/analytics_data.csv".format(self.run_dir)
+            self.output_worker.submit(self.popn.analytics_base.write_to_file,
+                                      data_dump_fpath)
+        # save plot data, and make plots
+        if self.writes('plot_data') or self.writes('plots'):
+            plot_data = plotdata.collect_plot_data(self.popn, "end",
+                                                   self.total_cycles, table)
+        if self.writes('plot_data'):
+            self.output_worker.submit(plotdata.save_plot_data, plot_data,
+                                      plotdata.plot_data_path(self.run_dir, "end"))
+        if self.writes('plots'):
+            self.output_worker.submit(plotdata.print_results, plot_data)
+            self.output_worker.submit(plotdata.print_plots, plot_data, "new")
+        # write phylogenetic tree to file
+        self.export_tree(table, self.total_cycles, "")
         # if heterogeneous initial pop, output drop data
         if self.opt.init_diversity:
             print("Printing drop data")
-            dropdata.drop(self.popn.subpop, self.test_group_dir, "end")
+            self.write_drop_data(table, "end")
 
 
     def print_status_update(self, t_curr):
@@ -270,23 +546,53 @@ class Simulator(object):
             """)
         print(status_msg.format(t_curr, self.max_cycles, self.popn.tumoursize))
 
+    def store_precrash_population(self, t_curr):
+        """
+        Store the population in the pre-crash library (see precrash).
+
+        This is called as treatment is introduced, before the
+        population or treatment has been updated for this cycle.
+        Runs which started from the library store nothing.
+        """
+        if not self.precrash_key or self.from_precrash:
+            return
+        elapsed = self.prior_runtime + time.time() - self.start_time
+        precrash.save_entry(self.opt.precrash_library, self.precrash_key,
+                            self, t_curr, elapsed)
+
     def record_treatment_introduction(self, t_curr):
-        """Make plots and record data at time of treatment introduction."""
-        if not self.opt.no_plots:
-            plotdata.print_results(self.popn, "mid", t_curr)
+        """
+        Make plots and record data at time of treatment introduction.
+
+        Output files are written by the background output
+        worker, from a copy of the clone tree, so that the
+        simulation can continue in the meantime.
+        """
+        table = self.tree_table()
 
-        tree_to_xml.tree_parse(self.popn.subpop, self.popn.tumoursize,
-                               t_curr, self.opt.run_dir, "mid0")
+        # plot data is saved even without plots, so that
+        # plots can be rendered later (see render.py)
+        if self.writes('plot_data') or self.writes('plots'):
+            plot_data = plotdata.collect_plot_data(self.popn, "mid", t_curr, table)
+        if self.writes('plot_data'):
+            self.output_worker.submit(plotdata.save_plot_data, plot_data,
+                                      plotdata.plot_data_path(self.run_dir, "mid"))
+        if self.writes('plots'):
+            self.output_worker.submit(plotdata.print_results, plot_data)
+
+        self.export_tree(table, t_curr, "mid0")
 
         # TODO deprecate this drop?
         if self.opt.init_diversity:
-            dropdata.drop(self.popn.subpop, self.opt.test_group_dir, "mid0")
+            self.write_drop_data(table, "mid0")
 
-        self.write_clone_summary(self.popn, label="mid")
+        self.write_clone_summary(table, label="mid")
 
         if self.opt.save_snapshot:
             # save snapshot; don't bother generating resistance
             snapshot.save_population_to_file(t_curr, self.popn, self.run_dir)
+            if self.results_store:
+                self.results_store.flush()
             return
 
         if self.opt.resistance:
@@ -295,7 +601,33 @@ class Simulator(object):
                                          self.popn.tumoursize,
                                          self.opt.num_resist_mutns)
 
-        self.write_clone_summary(self.popn, label="resist")
+        if self.writes('clone_summary'):
+            self.write_clone_summary(clonetable.tree_table(self.popn.subpop),
+                                     label="resist")
+
+        # record pre-treatment results now, as a
+        # resumed run will not introduce treatment again
+        if self.results_store:
+            self.results_store.flush()
+
+    def tree_table(self):
+        """
+        Copy the clone tree into a tree table (see clonetable).
+
+        Returns None if none of this run's outputs need the table.
+        """
+        if any(self.writes(output) for output in TABLE_OUTPUTS):
+            return clonetable.tree_table(self.popn.subpop)
+        return None
+
+    def export_tree(self, table, t_curr, fname):
+        """Write the phylogenetic tree in the configured format(s)."""
+        if not self.writes('tree'):
+            return
+        self.output_worker.submit(tree_export.export_tree,
+                                  table, t_curr, self.run_dir, fname,
+                                  fmt=self.opt.tree_format,
+                                  compress=self.opt.gzip_trees)
 
     def print_info(self):
         """Print simulation's initial parameter set."""
@@ -308,15 +640,9 @@ class Simulator(object):
             print("{}: {}".format(attr, val))
         print('\n')
 
-    def write_summary(self, popn, treatmt, tot_cycles, elapsed_time):
+    def summary_values(self, popn, treatmt, tot_cycles, elapsed_time):
         """
-        Write simulation summary to file(s).
-
-        Write summary data about this simulation run
-        to two summary files, in CSV format:
-
-        'testgroup_results.csv' (master summary file for this test group)
-        'testgroup_paramset_results.csv' (summary for this param set only)
+        Calculate summary data about this simulation run.
 
         Args
         ----
@@ -327,7 +653,9 @@ class Simulator(object):
 
         Returns
         -------
-        None
+        A tuple of summary values, in the order of
+        constants.SUMMARY_COLUMNS, except for the resource
+        columns (see ResourceUsage.summary_values).
         """
         # Get pre-crash min and max population size, and
         # the times at which they occurred
@@ -350,17 +678,6 @@ class Simulator(object):
         recovery_status = analytics.completion_status(self, treatmt, popn)
         recovered, recover_type, recover_percent = recovery_status
 
-        # open files (these should have been created already)
-        tg_summary_fpath = "{0}/{1}_results.csv".format(self.test_group_dir,
-                                                        self.test_group)
-        ps_summary_fpath = "{0}/{1}_{2}_results.csv".format(self.param_set_dir,
-                                                            self.test_group,
-                                                            self.param_set)
-        tg_results_file = open(tg_summary_fpath, 'a')
-        ps_results_file = open(ps_summary_fpath, 'a')
-        tg_writer = csv.writer(tg_results_file)
-        ps_writer = csv.writer(ps_results_file)
-
         # determine proportion of tumour taken up by dominant clone
         if not popn.is_dead():
             dom_clone_size = analytics.get_dom_clone_size(popn.subpop)
@@ -400,21 +717,59 @@ class Simulator(object):
                         generated_resist_mutns, surviving_resist_mutns,
                         min_val, min_time, max_val, max_time,
                         cmin_val, cmin_time, cmax_val, cmax_time)
+        return summary_vals
+
+    def write_summary(self, summary_vals):
+        """
+        Write simulation summary to file(s).
+
+        Write summary data about this simulation run
+        (see summary_values) to two summary files,
+        in CSV format:
+
+        'testgroup_results.csv' (master summary file for this test group)
+        'testgroup_paramset_results.csv' (summary for this param set only)
+
+        or, with the SQLite results backend, to the
+        summaries table of the test group's database.
+        """
+        if self.results_store:
+            self.results_store.add_summary(summary_vals)
+            return
+
+        # open files (these should have been created already)
+        tg_summary_fpath = "{0}/{1}_results.csv".format(self.test_group_dir,
+                                                        self.test_group)
+        ps_summary_fpath = "{0}/{1}_{2}_results.csv".format(self.param_set_dir,
+                                                            self.test_group,
+                                                            self.param_set)
+        tg_results_file = open(tg_summary_fpath, 'a')
+        ps_results_file = open(ps_summary_fpath, 'a')
+        tg_writer = csv.writer(tg_results_file)
+        ps_writer = csv.writer(ps_results_file)
 
         tg_writer.writerow(summary_vals)
         ps_writer.writerow(summary_vals)
         tg_results_file.close()
         ps_results_file.close()
 
-    def write_clone_summary(self, popn, label):
-        """Write summary data for all clones."""
+    def write_clone_summary(self, table, label):
+        """Write summary data for all clones in a tree table."""
+        if not self.writes('clone_summary'):
+            return
         fpath = "{0}/data/{1}_clone_summary.csv".format(self.run_dir, label)
-        clone_summary_file = open(fpath, 'w')
-        writer = csv.writer(clone_summary_file)
-        header = ("clone_id",
-                  "b_muts", "n_muts", "d_muts", "r_muts",
-                  "size", "depth", "prolif_rate", "mut_rate")
-        writer.writerow(header)
-        clone_summary_file.close()
-
-        popn.subpop.write_details_to_file(fpath)
+        self.output_worker.submit(clonetable.write_clone_summary, table, fpath)
+        if self.results_store:
+            self.results_store.add_clone_summary(label,
+                                                 clonetable.clone_summary_rows(table))
+
+    def write_drop_data(self, table, label):
+        """Record the number of cells of each colour (see dropdata)."""
+        if not self.writes('drop_data'):
+            return
+        if self.results_store:
+            self.results_store.add_drop_data(label, dropdata.DROP_COLOURS,
+                                             dropdata.colour_totals(table))
+        else:
+            self.output_worker.submit(dropdata.drop, table,
+                                      self.test_group_dir, label)
@@ -5,6 +5,7 @@ to a file, and loading it again.
 from __future__ import print_function
 import datetime
 import csv, tarfile
+from ast import literal_eval
 from collections import deque
 try:
     import cPickle as pickle
@@ -77,10 +78,15 @@ def save_parameters_to_file(t_curr, popn, param_fname):
         param_file.write(pickled_params)
 
 
-def save_muts_to_file(all_muts, mut_fname):
+def save_muts_to_file(all_muts, mut_fname, include_dead=False):
     """
     Save the entire mutation dictionary to a CSV file.
 
+    Mutations which have been marked 'dead' (see
+    mutation.generate_resistance) are skipped, unless
+    `include_dead` is set; checkpoints need them, as
+    dead-end clones still in the tree refer to them.
+
     NOTE: there is an implicit, currently unenforced contract
     between this function and Mutation.init_from_file(). That
     method relies on this function storing valid mutation
@@ -99,7 +105,7 @@ def save_muts_to_file(all_muts, mut_fname):
 
         for mut_type in all_muts:
             # don't write dead mutations to file
-            if mut_type == 'dead':
+            if mut_type == 'dead' and not include_dead:
                 continue
             for mut in all_muts[mut_type]:
                 mut_data = [mut.mut_id, mut.mut_type,
@@ -130,7 +136,7 @@ def save_clones_to_file(root_clone, clone_fname):
         writer = csv.writer(clone_file)
         header = ['clone_id', 'parent_id', 'num_children',
                   'prolif_rate', 'mut_rate', 'size', 'precrash_size',
-                  'depth', 's_time', 'd_time', 'branch_length',
+                  'depth', 's_time', 'd_time', 'branch_length', 'col',
                   'is_resistant', 'resist_strength',
                   'mutations', 'num_neutral_mutns',]
         writer.writerow(header)
@@ -162,7 +168,7 @@ def save_clones_to_file(root_clone, clone_fname):
                           curr_clone.size, curr_clone.precrash_size,
                           curr_clone.depth,
                           curr_clone.s_time, curr_clone.d_time,
-                          curr_clone.branch_length,
+                          curr_clone.branch_length, curr_clone.col,
                           curr_clone.is_resistant, curr_clone.resist_strength,
                           # mutations
                           mut_id_dict, curr_clone.num_neutral_mutns]
@@ -282,17 +288,19 @@ def load_muts_from_file(opt, mut_fname):
     with open(mut_fname) as mut_file:
         mut_reader = csv.DictReader(mut_file)
         for row in mut_reader:
-            # initialise new Mutation object
-            new_mut = Mutation.init_from_file(opt, all_muts, row)
-
-            # add it to ID map
-            mutation_map[new_mut.mut_id] = new_mut
+            # checkpoints also store 'dead' mutations
+            if literal_eval(row['mut_type']) == 'dead':
+                all_muts.setdefault('dead', [])
 
-            # add it to main mutation dictionary
+            # initialise new Mutation object; this also
+            # adds it to the main mutation dictionary
             try:
-                all_muts[new_mut.mut_type].append(new_mut)
+                new_mut = Mutation.init_from_file(opt, all_muts, row)
             except KeyError:
-                raise KeyError("invalid mutation type (from file): {}".format(new_mut.mut_type))
+                raise KeyError("invalid mutation type (from file): {}".format(row['mut_type']))
+
+            # add it to ID map
+            mutation_map[new_mut.mut_id] = new_mut
 
     return all_muts, mutation_map
 
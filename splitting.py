@@ -0,0 +1,332 @@
+"""
+Estimate the probability of rare recoveries, by multilevel splitting.
+
+Under strong selective pressure, a tumour may recover from the
+crash (recovery type FULL or PART; see analytics.completion_status)
+in only one run in a thousand, so estimating the recovery rate by
+running independent replicates takes tens of thousands of full
+runs. Splitting instead follows the tumour's progress towards
+recovery after the crash, measured by its size or by the number
+of resistant cells, through a series of increasing levels.
+
+The fixed-effort scheme is used: at each stage, `num_trajectories`
+trajectories are run, each until it reaches the next level, or
+its run ends. The first stage starts from new runs (each seeded
+differently); later stages start from copies of the states in
+which trajectories of the previous stage reached its level,
+chosen at random, each continued with a new seed. The last stage
+runs each trajectory to the end of its run. Each trajectory of a
+stage stands for 1/num_trajectories of the probability of having
+reached the stage, so the recovery probability is estimated by
+
+    P(recovery) = p_1 * p_2 * ... * p_K
+
+where p_k is the proportion of stage k's trajectories which
+succeeded. Only the trajectories near recovery are simulated
+from one level to the next, so far fewer cycles are needed than
+for the same accuracy from independent runs.
+
+A level is reached only once the population has fallen below it
+after treatment is introduced, so the tumour's size before the
+crash does not count. Levels are given as fractions of the size
+limit (`max_size_lim`); size levels must lie below the PART
+recovery threshold, half the size limit.
+
+States are stored as checkpoints (see checkpoint), in a temporary
+directory. A seeded first stage can use a pre-crash library (see
+precrash), so the growth phase is only simulated once per seed.
+
+    import library, splitting
+    opt = library.make_options({'init_size': 25, 'select_pressure': 0.5,
+                                'resistance': True, 'max_cycles': 20000,
+                                'select_time': 10000})
+    estimate = splitting.estimate_recovery(opt, levels=[0.001, 0.01, 0.1],
+                                           num_trajectories=200)
+    estimate.probability, estimate.rel_error
+
+or, with main.py's options on the command line:
+
+    python splitting.py --levels 0.001 0.01 0.1 -- --init_size 25 ...
+"""
+from __future__ import print_function
+import argparse
+import copy
+import math
+import os
+import random
+import shutil
+import tempfile
+import time
+import numpy as np
+import analytics
+import checkpoint
+import library
+import main
+from simulator import Simulator
+from constants import CRASH_BUFFER, RECOVERED_TYPES
+
+DEFAULT_LEVELS = (0.001, 0.01, 0.1)
+DEFAULT_NUM_TRAJECTORIES = 100
+
+# progress measures, and the fraction of the size limit
+# below which size levels must lie (the PART threshold)
+MEASURES = ('size', 'resistant')
+RECOVERY_FRACTION = 0.5
+
+# trajectory outcomes
+REACHED_LEVEL = 'reached level'
+RECOVERED = 'recovered'
+FAILED = 'failed'
+
+# largest seed accepted by np.random.seed
+MAX_SEED = 2**32 - 1
+
+
+class SplittingEstimate(object):
+    """
+    An estimate of a recovery probability, by multilevel splitting.
+
+    Attributes
+    ----------
+    probability : the estimated probability of recovery
+    stage_probs : the proportion of trajectories which
+        succeeded at each stage (the last being recovery)
+    levels : the levels, as numbers of cells
+    rel_error : approximate relative standard error of
+        the estimate (infinite if it is zero)
+    num_trajectories : trajectories run per stage
+    total_cycles : total number of cycles simulated
+    """
+    def __init__(self, stage_probs, levels, num_trajectories, total_cycles):
+        self.stage_probs = stage_probs
+        self.levels = levels
+        self.num_trajectories = num_trajectories
+        self.total_cycles = total_cycles
+        self.probability = float(np.prod(stage_probs))
+        if self.probability > 0:
+            # relative variances of the stage estimates
+            # add up, if the stages are independent
+            self.rel_error = math.sqrt(sum((1.0 - prob) / (num_trajectories * prob)
+                                           for prob in stage_probs))
+        else:
+            self.rel_error = float('inf')
+
+    def __repr__(self):
+        return "{}({:.3g} +/- {:.0%}, {} cycles)".format(self.__class__.__name__,
+                                                         self.probability,
+                                                         self.rel_error,
+                                                         self.total_cycles)
+
+
+def resistant_size(popn):
+    """Count the cells in a population's resistant clones."""
+    return sum(clone.size for clone in popn.subpop.iter_preorder()
+               if clone.is_resistant)
+
+
+def tumour_size(popn):
+    """Count the cells in a population."""
+    return popn.tumoursize
+
+
+def level_sizes(opt, levels, measure):
+    """
+    Convert levels, as fractions of the size limit, to numbers of cells.
+
+    Raises
+    ------
+    ValueError: if the levels are not increasing, or some
+        size level is not below the recovery threshold.
+    """
+    if measure not in MEASURES:
+        raise ValueError("unknown progress measure: {}".format(measure))
+    if measure == 'resistant' and not opt.resistance:
+        raise ValueError("the resistant measure needs resistance mutations")
+    if list(levels) != sorted(set(levels)) or levels[0] <= 0:
+        raise ValueError("levels must be positive and increasing")
+    if measure == 'size' and levels[-1] >= RECOVERY_FRACTION:
+        raise ValueError("size levels must be below the recovery threshold "
+                         "({} of the size limit)".format(RECOVERY_FRACTION))
+    return [level * opt.max_size_lim for level in levels]
+
+
+def run_trajectory(sim, start_cycle, level, measure_func, dipped):
+    """
+    Run a simulation until it reaches a level, or its run ends.
+
+    Args
+    ----
+    sim : a Simulator
+    start_cycle : the cycle to begin from
+    level : the level to reach, in cells, or None
+        to run the simulation to its end
+    measure_func : function giving a population's progress
+    dipped : whether the population has already fallen
+        below the level since treatment was introduced
+
+    Returns
+    -------
+    3-tuple (outcome, t_curr, cycles), where `outcome` is one
+    of REACHED_LEVEL, RECOVERED or FAILED, `t_curr` is the last
+    cycle simulated, and `cycles` the number of cycles simulated.
+    """
+    # as Simulator.run does, for storing pre-crash populations
+    sim.start_time = time.time()
+    t_curr = start_cycle - 1
+    for t_curr in xrange(start_cycle, sim.max_cycles):
+        sim.update(t_curr)
+        if sim.check_end_conditions():
+            break
+        if level is None or not sim.treatmt.is_introduced:
+            continue
+        progress = measure_func(sim.popn)
+        if progress < level:
+            dipped = True
+        elif dipped and t_curr > sim.treatmt.crash_time + CRASH_BUFFER:
+            return REACHED_LEVEL, t_curr, t_curr - start_cycle + 1
+
+    sim.output_worker.close()
+    recov_type = analytics.completion_status(sim, sim.treatmt, sim.popn)[1]
+    outcome = RECOVERED if recov_type in RECOVERED_TYPES else FAILED
+    return outcome, t_curr, t_curr - start_cycle + 1
+
+
+def trajectory_options(opt):
+    """Copy a parameter set, for a run which writes nothing."""
+    traj_opt = copy.copy(opt)
+    traj_opt.outputs = []
+    traj_opt.quiet = True
+    traj_opt.resume = False
+    traj_opt.save_snapshot = False
+    traj_opt.checkpoint_every = 0
+    traj_opt.checkpoint_interval = 0.0
+    traj_opt.cache_dir = None
+    return traj_opt
+
+
+def reseed(seed):
+    """Seed both random number generators."""
+    random.seed(seed)
+    np.random.seed(seed)
+
+
+def estimate_recovery(opt, levels=DEFAULT_LEVELS,
+                      num_trajectories=DEFAULT_NUM_TRAJECTORIES,
+                      measure='size', seed=0, work_dir=None):
+    """
+    Estimate a parameter set's probability of recovery, by splitting.
+
+    Args
+    ----
+    opt : the parameter set (see library.make_options)
+    levels : increasing levels, as fractions of the size limit
+    num_trajectories : trajectories to run at each stage
+    measure : progress measure, 'size' (tumour size) or
+        'resistant' (number of resistant cells)
+    seed : seed from which each trajectory's seed is drawn
+    work_dir : directory in which to store the states
+        (by default, a new temporary directory)
+
+    Returns
+    -------
+    A SplittingEstimate.
+    """
+    level_cells = level_sizes(opt, levels, measure)
+    measure_func = resistant_size if measure == 'resistant' else tumour_size
+    traj_opt = trajectory_options(opt)
+    seeder = random.Random(seed)
+
+    store_dir = tempfile.mkdtemp(dir=work_dir)
+    stage_probs = []
+    total_cycles = 0
+    try:
+        # a start state is a stored checkpoint, or None for a
+        # new run, or RECOVERED for a trajectory which recovered
+        # before reaching a level (which it would have reached)
+        start_states = [None] * num_trajectories
+        for stage, level in enumerate(level_cells + [None]):
+            reached_states = []
+            num_successes = 0
+            for traj_num, start_state in enumerate(start_states):
+                if start_state == RECOVERED:
+                    num_successes += 1
+                    reached_states.append(RECOVERED)
+                    continue
+
+                traj_seed = seeder.randint(0, MAX_SEED)
+                if start_state is None:
+                    sim_opt = copy.copy(traj_opt)
+                    sim_opt.seed = traj_seed
+                    sim = Simulator(sim_opt)
+                else:
+                    ckpt = checkpoint.load_checkpoint(start_state,
+                                                      extract_path=store_dir)
+                    sim = Simulator(traj_opt, ckpt=ckpt)
+                    reseed(traj_seed)
+
+                outcome, t_curr, cycles = run_trajectory(sim, sim.start_cycle,
+                                                         level, measure_func,
+                                                         start_state is not None)
+                total_cycles += cycles
+                if outcome == FAILED:
+                    continue
+                num_successes += 1
+                if outcome == RECOVERED:
+                    reached_states.append(RECOVERED)
+                else:
+                    state_path = os.path.join(store_dir,
+                                              "stage{}_{}.tar.gz".format(stage,
+                                                                         traj_num))
+                    checkpoint.write_checkpoint(sim, t_curr, 0.0, state_path)
+                    reached_states.append(state_path)
+
+            stage_probs.append(num_successes / float(num_trajectories))
+            print("Stage {}: {} of {} trajectories succeeded".format(stage + 1,
+                                                                     num_successes,
+                                                                     num_trajectories))
+            if not num_successes:
+                break
+            # the next stage starts from states chosen at random, with
+            # replacement, from those in which this stage succeeded
+            start_states = [seeder.choice(reached_states)
+                            for _ in range(num_trajectories)]
+    finally:
+        shutil.rmtree(store_dir, ignore_errors=True)
+
+    return SplittingEstimate(stage_probs, level_cells, num_trajectories,
+                             total_cycles)
+
+
+def main_cli():
+    """Estimate a probability of recovery by multilevel splitting."""
+    parser = argparse.ArgumentParser(description=main_cli.__doc__)
+    parser.add_argument('--levels', type=float, nargs='+',
+                        default=list(DEFAULT_LEVELS))
+    parser.add_argument('--trajectories', type=int,
+                        default=DEFAULT_NUM_TRAJECTORIES)
+    parser.add_argument('--measure', choices=MEASURES, default='size')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--work_dir', default=None)
+    parser.add_argument('args', nargs=argparse.REMAINDER)
+    cli_opt = parser.parse_args()
+
+    args = cli_opt.args
+    if args and args[0] == '--':
+        args = args[1:]
+    # identifiers and directories are not needed, as nothing is written
+    opt = main.parse_cmd_line_args(library.PLACEHOLDER_ARGS + args)
+    if opt.init_diversity and '--init_size' not in args:
+        opt.init_size = None
+
+    estimate = estimate_recovery(opt, cli_opt.levels, cli_opt.trajectories,
+                                 cli_opt.measure, cli_opt.seed,
+                                 cli_opt.work_dir)
+    print("Recovery probability: {:.4g} (relative error {:.1%})".format(estimate.probability,
+                                                                        estimate.rel_error))
+    print("Stage success rates: " + ", ".join("{:.3f}".format(prob)
+                                              for prob in estimate.stage_probs))
+    print("Total cycles simulated: {}".format(estimate.total_cycles))
+
+
+if __name__ == '__main__':
+    main_cli()
@@ -14,6 +14,7 @@ from ast import literal_eval
 #import random
 import numpy as np
 from mutation import Mutation
+import clonetable
 from constants import MUT_THRESHOLD, BEN_THRESHOLD, DEL_THRESHOLD
 
 class Subpopulation(object):
@@ -429,90 +430,48 @@ class Subpopulation(object):
     # GATHER DATA FOR ANALYTICS
     # Dangerous loops beyond this sign
 
-    def pop_as_list(self):
-        n = self.get_clone_attrs_as_list("size")
-        n.sort()
-        #out = filter(lambda a: a!=0, n)
-        return n
+    def iter_preorder(self):
+        """
+        Iterate over this clone and all its descendants, in pre-order.
 
-    def pop_count(self):
-        x = self.pop_as_list()
-        z = 0
-        for i in x:
-            z = z + i
-        return z
+        Clones are yielded in the same order as a recursive
+        traversal (each clone, then each of its children's
+        subtrees in turn), but using an explicit stack, so
+        that very deep trees cannot exceed the recursion limit.
+        """
+        stack = [self]
+        while stack:
+            clone = stack.pop()
+            yield clone
+            # push children in reverse, so the first child is visited first
+            stack.extend(reversed(clone.nodes))
+
+    def freq_of_mutation(self, tumoursize):
+        """
+        Get the frequency of each living clone's mutations in the tumour.
 
-    def freq_of_mutation(self,tumoursize):
+        Returns
+        -------
+        3-tuple (x, y, z), where x is the list of (cell count,
+        identifier) pairs from freq_to_list(), y is a flat list
+        [freq, identifier, freq, identifier, ...], and z is the
+        list of frequencies alone.
+        """
         x = self.freq_to_list("0-0")
+        z = [count / float(tumoursize) for count, _idnt in x]
         y = []
-        z = []
-        for i, j in x:
-            y = y + [i/float(tumoursize), j]
-            z = z + [i/float(tumoursize)]
+        for freq, (_count, idnt) in zip(z, x):
+            y += [freq, idnt]
         return x, y, z
 
     def freq_to_list(self, idnt):
-        self_node = []
-        blank_ctree = []
-        # TODO fix this - it's currently broken.
-        # TODO Should subpop store type of its initial mutation?
-        #if self.mutations:
-        #    mut_type = self.mutations[-1].mut_type
-        #else:
-        #    mut_type = 'n'
-        mut_type = 'n'
-
-        if self.size > 0:
-            self_node = [(self.pop_count(),
-                          "pr-{}-{}{}".format(str(self.prolif_rate),
-                                              mut_type, idnt))]
-            #self.idnt = idnt + str(self.depth)
-            #if len(self.nodes) == 0: #deepest point in tree
-                #self_node = [
-
-        if not self.nodes:
-            return self_node
-        else:
-            for node in self.nodes:
-                # TODO fix this - it's currently broken.
-                #if node.mutations:
-                #    mut_type = node.mutations[-1].mut_type
-                #else:
-                #    mut_type = 'n'
-                mut_type = 'n'
-                new_idnt = str(self.nodes.index(node)) + mut_type + idnt
-                blank_ctree += node.freq_to_list(new_idnt)
-            return blank_ctree + self_node
-
-    def get_clone_attrs_as_list(self, attr_names, inc_dead_clones=False):
-        """
-        Get specified attributes of clone, and its children, as a flat list.
         """
-        if isinstance(attr_names, basestring):
-            attr_names = [attr_names]
+        List the cells carrying each living clone's mutations.
 
-        # get attributes of this particular clone
-        attr_list = []
-        if not self.is_dead() or inc_dead_clones:
-            for name in attr_names:
-                try:
-                    attr_val = getattr(self, name)
-                except AttributeError:
-                    raise
-                attr_list.append(attr_val)
-
-        if len(attr_list) > 1:
-            # multiple attributes have been recorded;
-            # need to condense to a single list element
-            attr_list = [tuple(attr_list)]
-
-        # get attributes of children, if any
-        if self.has_children():
-            for node in self.nodes:
-                # note the need to use 'splat' operator to unpack attr_names
-                attr_list += node.get_clone_attrs_as_list(attr_names,
-                                                          inc_dead_clones)
-        return attr_list
+        See clonetable.clone_freq_table(), which computes the
+        subtree cell counts of every clone in a single pass.
+        """
+        return clonetable.clone_freq_table(clonetable.tree_table(self), idnt)
 
     def is_dead(self):
         """Determine if this clone is dead, i.e. has no cells."""
@@ -560,22 +519,6 @@ class Subpopulation(object):
                           sort_keys=True, indent=4)
     '''
 
-    def write_details_to_file(self, fpath):
-        """Write summary details about this clone to a summary file."""
-        summary_file = open(fpath, 'a')
-        writer = csv.writer(summary_file)
-
-        vals = (id(self),
-                len(self.mutations['b']), self.num_neutral_mutns,
-                len(self.mutations['d']), len(self.mutations['r']),
-                self.size, self.depth, self.prolif_rate, self.mut_rate)
-
-        writer.writerow(vals)
-        summary_file.close()
-
-        for node in self.nodes:
-            node.write_details_to_file(fpath)
-
 '''
 def subpop_to_JSON(obj):
     if isinstance(obj, Subpopulation):
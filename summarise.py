@@ -0,0 +1,191 @@
+"""
+Summarise the results of a test group, one line per param set.
+
+All results tables under a test group directory (the summary
+CSV files written by each run, and any results database; see
+results_store) are loaded in bulk, with named columns, into a
+single DataFrame. For each param set, this reports how many
+runs recovered fully or partially from the crash, and the
+average crash timings of the runs which recovered fully.
+
+This replaces compact.py, which parsed a single results file
+line by line, and relied on END_GROUP markers and hard-coded
+column positions. The same output modes are supported:
+
+    python summarise.py TEST_GROUP_DIR            (plain text)
+    python summarise.py TEST_GROUP_DIR --latex    (LaTeX table rows)
+    python summarise.py TEST_GROUP_DIR --plot     (mut_rate select_pressure
+                                                   proportion_full)
+
+A single results CSV file may be given in place of the directory.
+"""
+from __future__ import print_function
+import argparse
+import csv
+import glob
+import os
+import sqlite3
+import pandas as pd
+from constants import SUMMARY_COLUMNS, RESOURCE_COLUMNS
+
+# recovery types counted as a full recovery
+FULL_RECOVERY_TYPES = ('FULL', 'FULLNC')
+
+# columns which take a single value within a param set
+PARAM_COLUMNS = ['prolif_rate', 'death_rate', 'mut_rate', 'select_pressure',
+                 'prob_ben_mut', 'prob_del_mut',
+                 'prob_mut_incr', 'prob_mut_decr']
+
+# crash timings, averaged over the fully recovered runs of a param set
+CRASH_TIME_COLUMNS = ['pre_crash_max_time',
+                      'post_crash_min_time', 'post_crash_max_time']
+
+
+def find_results_tables(path):
+    """
+    Find all results tables for a test group.
+
+    Returns
+    -------
+    2-tuple of lists (csv_paths, db_paths).
+    """
+    if os.path.isfile(path):
+        if path.endswith(".db"):
+            return [], [path]
+        return [path], []
+    csv_paths = (glob.glob(os.path.join(path, "*_results.csv")) +
+                 glob.glob(os.path.join(path, "*", "*_results.csv")))
+    db_paths = glob.glob(os.path.join(path, "*_results.db"))
+    return sorted(csv_paths), sorted(db_paths)
+
+
+def read_results_csv(fpath):
+    """
+    Read a results CSV file into a DataFrame.
+
+    A file created before columns were added to the summary
+    (e.g. constants.RESOURCE_COLUMNS) keeps its older, shorter
+    header, while the rows appended to it since are longer;
+    the columns of such a file are named by SUMMARY_COLUMNS,
+    and its older rows lack the newer columns' values.
+    """
+    with open(fpath) as results_file:
+        header = next(csv.reader(results_file), [])
+    names = header
+    if tuple(header) == SUMMARY_COLUMNS[:len(header)]:
+        names = SUMMARY_COLUMNS
+    return pd.read_csv(fpath, header=None, skiprows=1, names=list(names),
+                       dtype={'param_set': str}, skipinitialspace=True)
+
+
+def load_results(path):
+    """
+    Load every results table for a test group into one DataFrame.
+
+    Both the test group and param set summary files hold
+    each run's summary, so duplicate runs (by param set and
+    run number) are dropped.
+    """
+    csv_paths, db_paths = find_results_tables(path)
+    tables = [read_results_csv(fpath) for fpath in csv_paths]
+    for db_path in db_paths:
+        conn = sqlite3.connect(db_path)
+        try:
+            tables.append(pd.read_sql_query("SELECT * FROM summaries", conn))
+        finally:
+            conn.close()
+    if not tables:
+        raise IOError("No results tables found under {}".format(path))
+
+    results = pd.concat(tables, ignore_index=True)
+    # results recorded before resource usage was lack its columns
+    missing_cols = [col for col in SUMMARY_COLUMNS
+                    if col not in results and col not in RESOURCE_COLUMNS]
+    if missing_cols:
+        raise ValueError("Results tables are missing columns: {}".format(missing_cols))
+    results = results.drop_duplicates(subset=['param_set', 'run_number'],
+                                      keep='last')
+    results['param_set'] = results['param_set'].astype(str)
+    results['recov_type'] = results['recov_type'].astype(str).str.strip()
+    return results
+
+
+def summarise(results):
+    """
+    Summarise results, one row per param set.
+
+    Returns
+    -------
+    A DataFrame indexed by param set, with columns 'full',
+    'part' and 'total' (numbers of runs), PARAM_COLUMNS,
+    the mean of 'avg_mut_rate_at_end' and 'pop_size', and
+    CRASH_TIME_COLUMNS averaged over fully recovered runs
+    (zero for param sets with no such runs).
+    """
+    is_full = results['recov_type'].isin(FULL_RECOVERY_TYPES)
+    is_part = results['recov_type'] == 'PART'
+    by_param_set = results.assign(full=is_full, part=is_part).groupby('param_set')
+
+    summary = by_param_set[['full', 'part']].sum().astype(int)
+    summary['total'] = by_param_set.size()
+    summary = summary.join(by_param_set[PARAM_COLUMNS].first())
+    summary = summary.join(by_param_set[['avg_mut_rate_at_end', 'pop_size']].mean())
+
+    full_runs = results[is_full]
+    crash_times = full_runs.groupby('param_set')[CRASH_TIME_COLUMNS].mean()
+    summary = summary.join(crash_times).fillna({col: 0.0
+                                                for col in CRASH_TIME_COLUMNS})
+    return summary
+
+
+def print_summary(summary, latex=False, plot=False):
+    """Print a summary in one of the compact.py output formats."""
+    if latex:
+        print("%% full, part, total, mut, end mut, sel_pre, prob pos mut, "
+              "prob neg mut, prob of mut incr, prob of mut decr, max time, "
+              "cmin time, cmax time, pop size")
+    elif not plot:
+        print("FULL, PART, TOTAL, pro, die, mut, end mut, sel_pre, "
+              "prob pos mut, prob neg mut, prob of mut incr, prob of mut decr, "
+              "maxtime, cmintime, cmaxtime, pop size")
+
+    for param_set, row in summary.iterrows():
+        # iterrows() gives each row a common (float) dtype
+        full, part, total = [int(row[col]) for col in ('full', 'part', 'total')]
+        if plot:
+            print(row['mut_rate'], row['select_pressure'],
+                  full / float(total))
+            continue
+        crash_times = [str(row[col])[:6] for col in CRASH_TIME_COLUMNS]
+        if latex:
+            vals = ([full, part, total, row['mut_rate'],
+                     str(row['avg_mut_rate_at_end'])[:8],
+                     row['select_pressure'],
+                     row['prob_ben_mut'], row['prob_del_mut'],
+                     row['prob_mut_incr'], row['prob_mut_decr']] +
+                    crash_times + [row['pop_size']])
+            print(" & ".join(str(val) for val in vals), " \\\\ ")
+        else:
+            print("FULL ", full, " PART ", part, " out of ", total, "details: ",
+                  row['prolif_rate'], row['death_rate'], row['mut_rate'],
+                  str(row['avg_mut_rate_at_end'])[:8], row['select_pressure'],
+                  row['prob_ben_mut'], row['prob_del_mut'],
+                  row['prob_mut_incr'], row['prob_mut_decr'],
+                  " ".join(crash_times), row['pop_size'])
+
+
+def main():
+    """Summarise the results of a test group, one line per param set."""
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument('path', help="test group directory, "
+                                     "or a single results file")
+    parser.add_argument('-l', '--latex', action="store_true", default=False)
+    parser.add_argument('-p', '--plot', action="store_true", default=False)
+    opt = parser.parse_args()
+
+    summary = summarise(load_results(opt.path))
+    print_summary(summary, latex=opt.latex, plot=opt.plot)
+
+
+if __name__ == '__main__':
+    main()
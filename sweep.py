@@ -0,0 +1,640 @@
+"""
+Run a test group in parallel, with sequential sampling of replicates.
+
+Like run_test_group.sh, this reads a config file (one param set
+per line, with a header row of parameter names) and runs each
+param set a number of times, in the same results directory
+layout; but runs are shared among a pool of warm worker
+processes (see workerpool), rather than run one after another:
+
+    python sweep.py [--workers N] TEST_GROUP RUNS_PER_PARAM_SET CONFIG_FILE
+
+With `--ci_width W`, replicates are sampled sequentially. Once a
+param set has at least `--min_runs` finished runs, and the
+confidence interval (a Wilson score interval) on its proportion
+of recovered runs (recovery type FULL or PART) is no wider than
+W, no more of its runs are started; RUNS_PER_PARAM_SET is then
+only an upper limit. Free workers are always given to the param
+set with the fewest runs started, so the workers freed by a
+settled param set go to those still being sampled. Runs already
+started when a param set settles are allowed to finish.
+
+As with run_param_set.sh, a config file (or the command line)
+may give a `seed`, in which case run N of each param set is
+seeded with seed + N, and a `cache_dir` and `precrash_library`
+(and a config may give memory limits; see Simulator.check_memory).
+
+Runs are started longest first, as predicted by a runtime model
+(see runtime_model) fitted to the runs recorded in any results
+databases given with `--history`, so that long runs do not hold
+up the end of the sweep while other workers sit idle. (When
+sampling sequentially, param sets still take turns, but the
+longest runs start first in each turn.) An estimated time of
+completion is printed as runs finish; it is corrected by the
+runtimes of the runs finished so far.
+
+A run may be limited to `--max_walltime` (H:MM:SS) and to
+`--max_rss` MB of resident memory; a run exceeding a limit is
+killed (see workerpool). Every failed attempt at a run is recorded,
+with its cause, in the failures table of the test group's results
+database (see results_store). A run which failed for a transient
+reason (its worker died, or an I/O error) is retried, with the same
+arguments (and so the same seed), up to `--retries` times.
+
+A sweep which was interrupted can be resumed, in its existing test
+group directory, with `--resume TEST_GROUP_DIR` (and the same
+arguments as before). Runs with a summary in the test group's
+results are not run again; the others are rerun, continuing from
+their newest checkpoint if they have one (see checkpoint).
+
+Once all runs have finished, the number of runs, recovered
+proportion and its confidence interval for each param set are
+written to `<test_group>_sweep.csv` in the test group directory.
+"""
+from __future__ import print_function
+import argparse
+import csv
+import datetime
+import math
+import os
+import shlex
+import shutil
+import sqlite3
+import sys
+import time
+from collections import OrderedDict
+import main
+import results_store
+import runtime_model
+import workerpool
+from constants import RECOVERED_TYPES
+from utils import hms_to_secs, secs_to_hms
+
+RESULTS_DIR = "results"
+
+# main.py options taken from config columns,
+# as in run_param_set.sh, and the columns they
+# are taken from (where they are named differently)
+OPTION_COLUMNS = [('max_cycles', 'max_cycles'),
+                  ('max_size_lim', 'max_size_lim'),
+                  ('pro', 'proliferation_rate'),
+                  ('die', 'death_rate'),
+                  ('mut', 'mutation_rate'),
+                  ('treatment_type', 'treatment_type'),
+                  ('decay_type', 'decay_type'),
+                  ('decay_rate', 'decay_rate'),
+                  ('treatment_freq', 'treatment_freq'),
+                  ('adaptive_increment', 'adaptive_increment'),
+                  ('adaptive_threshold', 'adaptive_threshold'),
+                  ('select_time', 'select_time'),
+                  ('select_pressure', 'selective_pressure'),
+                  ('prob_mut_pos', 'prob_mut_pos'),
+                  ('prob_mut_neg', 'prob_mut_neg'),
+                  ('prob_inc_mut', 'prob_inc_mut'),
+                  ('prob_dec_mut', 'prob_dec_mut'),
+                  ('scale', 'scale'),
+                  ('mscale', 'mscale'),
+                  ('cache_dir', 'cache_dir'),
+                  ('precrash_library', 'precrash_library'),
+                  ('memory_soft_limit', 'memory_soft_limit'),
+                  ('memory_hard_limit', 'memory_hard_limit')]
+
+# config columns whose values are main.py arguments
+# themselves, e.g. '--init_size 25' or '--M'
+ARGUMENT_COLUMNS = ['init_size', 'init_diversity',
+                    'resistance_flag', 'num_resist_mutns', 'resist_strength',
+                    'snapshot', 'r_flag', 'm_flag', 'z_flag', 'np_flag']
+
+SWEEP_COLUMNS = ('param_set', 'runs', 'failed_runs', 'recovered_runs',
+                 'recov_proportion', 'ci_lower', 'ci_upper', 'stopped_early')
+
+
+class ParamSet(object):
+    """
+    A param set of a sweep, and the outcomes of its runs so far.
+
+    Attributes
+    ----------
+    number : the param set number (counting from 1)
+    params : OrderedDict of config values, keyed by column name
+    param_set_dir : the param set's results directory
+    started_runs : run numbers of the runs started so far
+        (including those finished before a sweep was resumed)
+    outcomes : whether each finished run recovered
+    failed_runs : run numbers of runs which failed
+    predicted_runtime : predicted runtime of each run, in seconds
+    """
+    def __init__(self, number, params, param_set_dir):
+        self.number = number
+        self.params = params
+        self.param_set_dir = param_set_dir
+        self.predicted_runtime = 0.0
+        self.started_runs = set()
+        self.outcomes = []
+        self.failed_runs = []
+
+    def __repr__(self):
+        return "{}({}, {} of {} runs recovered)".format(self.__class__.__name__,
+                                                       self.number,
+                                                       sum(self.outcomes),
+                                                       len(self.outcomes))
+
+    @property
+    def runs_started(self):
+        """Number of runs started so far."""
+        return len(self.started_runs)
+
+    def next_run_number(self):
+        """Get the lowest run number which has not been started."""
+        run_number = 1
+        while run_number in self.started_runs:
+            run_number += 1
+        return run_number
+
+    def recovery_interval(self, confidence):
+        """Get a confidence interval on the proportion of recovered runs."""
+        return wilson_interval(sum(self.outcomes), len(self.outcomes),
+                               confidence)
+
+    def is_settled(self, min_runs, ci_width, confidence):
+        """
+        Determine whether this param set needs no more runs.
+
+        A param set is settled once it has at least `min_runs`
+        finished runs, and its confidence interval is no wider
+        than `ci_width`. Without a `ci_width`, it never is.
+        """
+        if not ci_width or len(self.outcomes) < min_runs:
+            return False
+        lower, upper = self.recovery_interval(confidence)
+        return upper - lower <= ci_width
+
+
+def normal_quantile(prob):
+    """Get the standard normal quantile of a probability, by bisection."""
+    lower, upper = -10.0, 10.0
+    while upper - lower > 1e-9:
+        mid = (lower + upper) / 2.0
+        if 0.5 * (1.0 + math.erf(mid / math.sqrt(2.0))) < prob:
+            lower = mid
+        else:
+            upper = mid
+    return (lower + upper) / 2.0
+
+
+def wilson_interval(successes, trials, confidence):
+    """
+    Get the Wilson score interval on a binomial proportion.
+
+    Unlike the normal approximation, this interval is
+    sensible for proportions near 0 or 1, as the
+    recovery rates of many param sets are.
+
+    Returns
+    -------
+    2-tuple (lower, upper); (0, 1) if there are no trials.
+    """
+    if trials == 0:
+        return 0.0, 1.0
+    z_val = normal_quantile(0.5 + confidence / 2.0)
+    prop = successes / float(trials)
+    denom = 1.0 + z_val**2 / trials
+    centre = (prop + z_val**2 / (2.0 * trials)) / denom
+    half_width = (z_val / denom) * math.sqrt(prop * (1.0 - prop) / trials
+                                             + z_val**2 / (4.0 * trials**2))
+    return max(0.0, centre - half_width), min(1.0, centre + half_width)
+
+
+def read_config(config_fpath):
+    """
+    Read the param sets from a test group config file.
+
+    Lines beginning with '#' are skipped; the first remaining
+    line names the parameters. Values are read as the shell
+    reads them in run_param_set.sh, so quoted values may hold
+    several words, and a quoted empty value ('') is empty.
+
+    Returns
+    -------
+    A list of OrderedDicts, one per param set, mapping
+    parameter names to values (as strings).
+    """
+    with open(config_fpath) as config_file:
+        lines = [line.strip() for line in config_file
+                 if line.strip() and not line.startswith('#')]
+    param_names = lines[0].split(',')
+    param_sets = []
+    for line in lines[1:]:
+        vals = [" ".join(shlex.split(val)) for val in line.split(',')]
+        param_sets.append(OrderedDict(zip(param_names, vals)))
+    return param_sets
+
+
+def config_args(params):
+    """Get the main.py arguments set by a param set's config values."""
+    args = []
+    for option, column in OPTION_COLUMNS:
+        if params.get(column):
+            args += ['--' + option, params[column]]
+    for column in ARGUMENT_COLUMNS:
+        args += params.get(column, "").split()
+    return args
+
+
+def make_test_group_dir(test_group):
+    """
+    Make a directory for a test group, under today's date.
+
+    As in run_test_group.sh, if the test group already has
+    results, a new directory 'test_group(i)' is made instead.
+    """
+    today = datetime.date.today().strftime('%Y-%m-%d')
+    test_group_dir = os.path.join(RESULTS_DIR, today, test_group)
+    if os.path.isdir(test_group_dir):
+        print("Warning: results for test group {} already exist".format(test_group))
+        i = 1
+        while os.path.isdir("{}({})".format(test_group_dir, i)):
+            i += 1
+        test_group_dir = "{}({})".format(test_group_dir, i)
+    os.makedirs(test_group_dir)
+    return test_group_dir
+
+
+def finished_runs(test_group_dir, test_group):
+    """
+    Find the runs of a test group which have finished.
+
+    Runs are found in the test group's results database
+    and summary file, so runs of either results backend
+    are found.
+
+    Returns
+    -------
+    A dict mapping the (param_set, run_number) of
+    each finished run to its recovery type.
+    """
+    finished = {}
+    db_path = results_store.results_db_path(test_group_dir, test_group)
+    if os.path.exists(db_path):
+        conn = sqlite3.connect(db_path)
+        try:
+            for param_set, run_number, recov_type in conn.execute(
+                    "SELECT param_set, run_number, recov_type FROM summaries"):
+                finished[(int(param_set), int(run_number))] = recov_type
+        finally:
+            conn.close()
+    csv_path = "{0}/{1}_results.csv".format(test_group_dir, test_group)
+    if os.path.exists(csv_path):
+        with open(csv_path) as summary_file:
+            for row in csv.DictReader(summary_file):
+                finished[(int(row['param_set']),
+                          int(row['run_number']))] = row['recov_type']
+    return finished
+
+
+class Sweep(object):
+    """
+    Run a test group's param sets in a pool of worker processes.
+
+    Attributes
+    ----------
+    opt : the sweep's command line options (see main_cli)
+    test_group_dir : the test group's results directory
+    param_sets : the test group's ParamSets
+    pool : the WorkerPool which runs the simulations
+        (once the sweep is running)
+    runtime_model : predicts the runtime of each param set's runs
+    run_start_times : dict mapping the job IDs of running
+        runs to the times they started
+    runtimes : (predicted, actual) runtime of each finished run
+    attempts : dict mapping the job ID of each run
+        started to the number of attempts at it
+    """
+    def __init__(self, opt, test_group_dir, configs):
+        self.opt = opt
+        self.test_group_dir = test_group_dir
+        ps_padding = len(str(len(configs)))
+        self.param_sets = [ParamSet(num, params,
+                                    os.path.join(test_group_dir,
+                                                 "{0:0{1}d}".format(num, ps_padding)))
+                           for num, params in enumerate(configs, 1)]
+        self.run_padding = len(str(opt.runs_per_param_set))
+        self.pool = None
+        if opt.resume:
+            self.load_finished_runs()
+
+        training_runs = runtime_model.load_training_runs(opt.history)
+        self.runtime_model = runtime_model.RuntimeModel().fit(training_runs)
+        print("Predicting runtimes from {} earlier runs".format(self.runtime_model.num_training_runs))
+        for pset in self.param_sets:
+            run_opt = main.parse_cmd_line_args(self.run_args(pset, 1))
+            pset.predicted_runtime = self.runtime_model.predict(vars(run_opt))
+        self.run_start_times = {}
+        self.runtimes = []
+        self.attempts = {}
+
+    def load_finished_runs(self):
+        """Mark the runs which finished before the sweep was resumed."""
+        finished = finished_runs(self.test_group_dir, self.opt.test_group)
+        for (ps_number, run_number), recov_type in sorted(finished.items()):
+            if not 0 < ps_number <= len(self.param_sets):
+                continue
+            pset = self.param_sets[ps_number - 1]
+            pset.started_runs.add(run_number)
+            pset.outcomes.append(recov_type in RECOVERED_TYPES)
+        print("Resuming sweep: {} runs already finished".format(len(finished)))
+
+    def run(self):
+        """Run the sweep, keeping every worker busy until it is done."""
+        max_walltime = None
+        if self.opt.max_walltime:
+            max_walltime = hms_to_secs(self.opt.max_walltime)
+        max_rss = None
+        if self.opt.max_rss:
+            max_rss = self.opt.max_rss * 2**20
+        self.pool = workerpool.WorkerPool(self.opt.workers, max_walltime, max_rss)
+        self.pool.start()
+        self.report_eta()
+        num_running = 0
+        try:
+            while True:
+                while num_running < self.pool.num_workers:
+                    pset = self.next_param_set()
+                    if pset is None:
+                        break
+                    self.start_run(pset)
+                    num_running += 1
+                if num_running == 0:
+                    break
+                state, job_id, detail = self.pool.get_event()
+                if state == 'running':
+                    self.run_start_times[job_id] = time.time()
+                    continue
+                num_running -= 1
+                self.record_run(job_id, state, detail)
+                if state == 'failed' and self.retry_run(job_id, detail):
+                    num_running += 1
+                self.report_eta()
+        finally:
+            self.pool.close()
+        self.write_sweep_summary()
+
+    def next_param_set(self):
+        """
+        Choose the param set to start a run of, or None if all are done.
+
+        The param set with the longest predicted runs is chosen;
+        when sampling sequentially, it is chosen from those with
+        the fewest runs started.
+        """
+        candidates = [pset for pset in self.param_sets
+                      if self.needs_runs(pset)]
+        if not candidates:
+            return None
+        if self.opt.ci_width:
+            return min(candidates, key=lambda pset: (pset.runs_started,
+                                                     -pset.predicted_runtime,
+                                                     pset.number))
+        return min(candidates, key=lambda pset: (-pset.predicted_runtime,
+                                                 pset.number))
+
+    def needs_runs(self, pset):
+        """Determine whether to start any more runs of a param set."""
+        if pset.runs_started >= self.opt.runs_per_param_set:
+            return False
+        return not pset.is_settled(self.opt.min_runs, self.opt.ci_width,
+                                   self.opt.confidence)
+
+    def run_args(self, pset, run_number):
+        """Get the main.py arguments for a run of a param set."""
+        run_dir = os.path.join(pset.param_set_dir,
+                               "{0:0{1}d}".format(run_number, self.run_padding))
+        args = ['--test_group', self.opt.test_group,
+                '--param_set', str(pset.number),
+                '--run_number', str(run_number),
+                '--test_group_dir', self.test_group_dir,
+                '--param_set_dir', pset.param_set_dir,
+                '--run_dir', run_dir]
+        args += config_args(pset.params)
+
+        seed = pset.params.get('seed') or self.opt.seed
+        if seed:
+            args += ['--seed', str(int(seed) + run_number)]
+            # seeded runs share the test group's pre-crash library
+            # (see precrash), as with run_param_set.sh
+            if 'precrash_library' not in pset.params:
+                args += ['--precrash_library',
+                         os.path.join(self.test_group_dir, "precrash")]
+        if self.opt.cache_dir and not pset.params.get('cache_dir'):
+            args += ['--cache_dir', self.opt.cache_dir]
+        if self.opt.resume:
+            # continue any run interrupted with the sweep
+            args += ['--resume']
+        return args
+
+    def start_run(self, pset):
+        """Start the next run of a param set."""
+        if not os.path.isdir(pset.param_set_dir):
+            write_param_set_config(pset, self.opt.test_group,
+                                   self.test_group_dir)
+        run_number = pset.next_run_number()
+        pset.started_runs.add(run_number)
+        self.submit_run(pset, run_number)
+
+    def submit_run(self, pset, run_number):
+        """Submit an attempt at a run to the pool."""
+        job_id = (pset.number, run_number)
+        self.attempts[job_id] = self.attempts.get(job_id, 0) + 1
+        self.pool.submit(job_id, self.run_args(pset, run_number), os.getcwd())
+
+    def retry_run(self, job_id, error):
+        """
+        Retry a failed run, if it failed for a transient reason.
+
+        Returns
+        -------
+        True if the run was submitted again, otherwise False.
+        """
+        if error['cause'] not in workerpool.TRANSIENT_CAUSES:
+            return False
+        if self.attempts[job_id] > self.opt.retries:
+            return False
+        ps_number, run_number = job_id
+        pset = self.param_sets[ps_number - 1]
+        pset.failed_runs.remove(run_number)
+        print("PARAM SET {} RUN {} RETRYING (attempt {})".format(ps_number, run_number,
+                                                                 self.attempts[job_id] + 1))
+        self.submit_run(pset, run_number)
+        return True
+
+    def record_failure(self, job_id, error):
+        """Record the cause of a failed run in the test group's results database."""
+        ps_number, run_number = job_id
+        store = results_store.ResultsStore(
+            results_store.results_db_path(self.test_group_dir, self.opt.test_group),
+            str(ps_number), str(run_number))
+        store.add_failure(self.attempts[job_id], error['cause'], error['message'])
+        store.flush()
+
+    def record_run(self, job_id, state, detail):
+        """Record the outcome of a finished run."""
+        ps_number, run_number = job_id
+        pset = self.param_sets[ps_number - 1]
+        start_time = self.run_start_times.pop(job_id, None)
+        if state == 'done' and start_time is not None:
+            self.runtimes.append((pset.predicted_runtime, time.time() - start_time))
+        if state == 'failed':
+            pset.failed_runs.append(run_number)
+            self.record_failure(job_id, detail)
+            print("PARAM SET {} RUN {} FAILED ({}):\n{}".format(ps_number, run_number,
+                                                                detail['cause'],
+                                                                detail['message']))
+            return
+        was_settled = pset.is_settled(self.opt.min_runs, self.opt.ci_width,
+                                      self.opt.confidence)
+        pset.outcomes.append(detail['summary']['recov_type'] in RECOVERED_TYPES)
+        print("PARAM SET {} RUN {} DONE: {}".format(ps_number, run_number,
+                                                   detail['summary']['recov_type']))
+        if not was_settled and pset.is_settled(self.opt.min_runs,
+                                               self.opt.ci_width,
+                                               self.opt.confidence):
+            lower, upper = pset.recovery_interval(self.opt.confidence)
+            print("PARAM SET {} SETTLED after {} runs: "
+                  "{:.0%} CI {:.3f} - {:.3f}".format(ps_number, len(pset.outcomes),
+                                                     self.opt.confidence,
+                                                     lower, upper))
+        sys.stdout.flush()
+
+    def runtime_correction(self):
+        """Get the ratio of actual to predicted runtime, over finished runs."""
+        total_predicted = sum(predicted for predicted, _ in self.runtimes)
+        if not total_predicted:
+            return 1.0
+        return sum(actual for _, actual in self.runtimes) / total_predicted
+
+    def estimate_remaining_time(self):
+        """
+        Estimate the time until all runs have finished, in seconds.
+
+        The work left, in predicted (and corrected) runtime,
+        is shared evenly among the workers. When sampling
+        sequentially, this assumes no param set settles early.
+        """
+        correction = self.runtime_correction()
+        work_left = 0.0
+        for pset in self.param_sets:
+            if self.needs_runs(pset):
+                runs_left = self.opt.runs_per_param_set - pset.runs_started
+                work_left += correction * pset.predicted_runtime * runs_left
+        now = time.time()
+        for (ps_number, _), start_time in self.run_start_times.items():
+            predicted = correction * self.param_sets[ps_number - 1].predicted_runtime
+            work_left += max(predicted - (now - start_time), 0.0)
+        return work_left / self.pool.num_workers
+
+    def report_eta(self):
+        """Print the estimated time of completion."""
+        secs_left = self.estimate_remaining_time()
+        finish_time = datetime.datetime.now() + datetime.timedelta(seconds=secs_left)
+        print("ETA: {} ({}{} remaining)".format(finish_time.strftime('%Y-%m-%d %H:%M'),
+                                               "at most " if self.opt.ci_width else "",
+                                               secs_to_hms(secs_left)))
+        sys.stdout.flush()
+
+    def write_sweep_summary(self):
+        """Write each param set's runs and recovery rate to a CSV file."""
+        fpath = os.path.join(self.test_group_dir,
+                             "{}_sweep.csv".format(self.opt.test_group))
+        with open(fpath, 'w') as sweep_file:
+            writer = csv.writer(sweep_file)
+            writer.writerow(SWEEP_COLUMNS)
+            for pset in self.param_sets:
+                num_runs = len(pset.outcomes)
+                lower, upper = pset.recovery_interval(self.opt.confidence)
+                proportion = ''
+                if num_runs:
+                    proportion = '{:.5f}'.format(sum(pset.outcomes) / float(num_runs))
+                stopped_early = pset.runs_started < self.opt.runs_per_param_set
+                writer.writerow((pset.number, num_runs, len(pset.failed_runs),
+                                 sum(pset.outcomes), proportion,
+                                 '{:.5f}'.format(lower), '{:.5f}'.format(upper),
+                                 'Y' if stopped_early else 'N'))
+        print("Sweep summary written to {}".format(fpath))
+
+
+def write_param_set_config(pset, test_group, test_group_dir):
+    """
+    Make a param set's directory, and record its config values.
+
+    The values are written as the `var=val` assignments
+    run_test_group.sh writes for run_param_set.sh.
+    """
+    if not os.path.isdir(pset.param_set_dir):
+        os.makedirs(pset.param_set_dir)
+    fpath = os.path.join(pset.param_set_dir,
+                         "{}-{}.conf".format(test_group, pset.number))
+    with open(fpath, 'w') as conf_file:
+        for name, val in pset.params.items():
+            conf_file.write("{}='{}'\n".format(name, val))
+        conf_file.write("test_group={}\n".format(test_group))
+        conf_file.write("param_set={}\n".format(pset.number))
+        conf_file.write("test_group_dir='{}'\n".format(test_group_dir))
+        conf_file.write("param_set_dir='{}'\n".format(pset.param_set_dir))
+
+
+def add_test_group_arguments(parser):
+    """Add the arguments which describe a test group's runs to a parser."""
+    parser.add_argument('test_group')
+    parser.add_argument('runs_per_param_set', type=int)
+    parser.add_argument('config_file')
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--cache_dir', default=None)
+    parser.add_argument('--history', nargs='+', default=[], metavar='RESULTS_DB')
+    parser.add_argument('--resume', default=None, metavar='TEST_GROUP_DIR')
+
+
+def setup_test_group(parser, opt):
+    """
+    Make a test group's results directory, and read its param sets.
+
+    When resuming, the existing test group directory is used.
+
+    Returns
+    -------
+    2-tuple (test_group_dir, configs), where `configs`
+    is the return value of read_config().
+    """
+    if '/' in opt.test_group or '\\' in opt.test_group:
+        parser.error("test group name cannot contain slash/backslash")
+    configs = read_config(opt.config_file)
+    if opt.resume:
+        if not os.path.isdir(opt.resume):
+            parser.error("no test group directory {}".format(opt.resume))
+        return opt.resume, configs
+
+    test_group_dir = make_test_group_dir(opt.test_group)
+    for fname in ["middropdata.csv", "enddropdata.csv"]:
+        open(os.path.join(test_group_dir, fname), 'a').close()
+    shutil.copy(opt.config_file, test_group_dir)
+    return test_group_dir, configs
+
+
+def main_cli():
+    """Run a test group's param sets in parallel."""
+    parser = argparse.ArgumentParser(description=main_cli.__doc__)
+    add_test_group_arguments(parser)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--min_runs', type=int, default=10)
+    parser.add_argument('--ci_width', type=float, default=None)
+    parser.add_argument('--confidence', type=float, default=0.95)
+    parser.add_argument('--max_walltime', default=None, metavar='H:MM:SS')
+    parser.add_argument('--max_rss', type=float, default=None, metavar='MB')
+    parser.add_argument('--retries', type=int, default=2)
+    opt = parser.parse_args()
+
+    test_group_dir, configs = setup_test_group(parser, opt)
+    Sweep(opt, test_group_dir, configs).run()
+
+
+if __name__ == '__main__':
+    main_cli()
@@ -0,0 +1,69 @@
+"""
+Tests for running simulations in memory.
+
+Run from the repository root:
+
+    python -m pytest tests
+"""
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import library
+import runcache
+from constants import RESOURCE_COLUMNS
+
+# a short, seeded run, which can be cached
+PARAMS = {'init_size': 25, 'max_cycles': 300, 'select_time': 100, 'seed': 1}
+
+
+class TestRunCache(unittest.TestCase):
+
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.cache_dir)
+
+    def simulate(self, **params):
+        """Run a simulation with the test parameters, caching its results."""
+        params = dict(PARAMS, cache_dir=self.cache_dir, **params)
+        key = runcache.run_key(library.make_options(params))
+        return library.simulate(params), key
+
+    def test_run_is_cached(self):
+        result, key = self.simulate()
+        cached = runcache.load_run(self.cache_dir, key)
+        self.assertIsNotNone(cached)
+        self.assertEqual(cached.summary['recov_type'], result.summary['recov_type'])
+
+    def test_cached_run_resources_are_blank(self):
+        result, _ = self.simulate()
+        self.assertIsNotNone(result.summary['cpu_time'])
+        # the second run is a cache hit, which used none of the first's resources
+        cached_result, _ = self.simulate()
+        self.assertEqual(cached_result.summary['recov_type'], result.summary['recov_type'])
+        for col in RESOURCE_COLUMNS:
+            self.assertIsNone(cached_result.summary[col])
+
+    def test_forced_pruning_is_not_cached(self):
+        # any run exceeds a 1 MB soft memory limit at once
+        result, key = self.simulate(memory_soft_limit=1)
+        self.assertTrue(result.opt.prune_clones)
+        self.assertIsNone(runcache.load_run(self.cache_dir, key))
+
+    def test_resumed_forced_pruning_is_not_cached(self):
+        params = {'run_dir': os.path.join(self.cache_dir, 'run'),
+                  'checkpoint_every': 100}
+        self.simulate(memory_soft_limit=1, **params)
+        # resumed from its last checkpoint, without the limit
+        result, key = self.simulate(resume=True, **params)
+        self.assertTrue(result.opt.prune_clones)
+        self.assertIsNone(runcache.load_run(self.cache_dir, key))
+
+
+if __name__ == '__main__':
+    unittest.main()
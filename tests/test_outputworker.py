@@ -0,0 +1,77 @@
+"""
+Tests for the background output worker.
+
+Run from the repository root:
+
+    python -m pytest tests
+"""
+import os
+import sys
+import time
+import unittest
+import multiprocessing
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import library
+import outputworker
+import simulator
+
+# seconds to wait for a failed run's process to exit
+EXIT_TIMEOUT = 60
+
+
+def fail_update(t_curr):
+    """Stand in for Simulator.update, failing in the first cycle."""
+    raise ValueError("simulated failure at cycle {}".format(t_curr))
+
+
+def run_failing_simulation():
+    """Run a simulation which raises while output jobs are queued."""
+    opt = library.make_options({'init_size': 10, 'max_cycles': 100, 'seed': 1})
+    sim = simulator.Simulator(opt)
+    # a slow job keeps the worker busy, while a large
+    # one is left waiting to be sent to it
+    sim.output_worker.submit(time.sleep, 600)
+    sim.output_worker.submit(len, 'x' * 2**24)
+    sim.update = fail_update
+    sim.run(sim.start_cycle)
+
+
+def wait_for_exit(process):
+    """Wait for a process to exit, killing it if it does not."""
+    process.join(EXIT_TIMEOUT)
+    exited = not process.is_alive()
+    if not exited:
+        process.terminate()
+        process.join()
+    return exited
+
+
+class TestOutputWorker(unittest.TestCase):
+
+    def test_close_runs_jobs(self):
+        worker = outputworker.OutputWorker()
+        worker.submit(time.sleep, 0.1)
+        worker.close()
+        self.assertIsNone(worker.process)
+        self.assertGreater(worker.output_time(), 0.0)
+
+    def test_terminate_stops_worker(self):
+        worker = outputworker.OutputWorker()
+        worker.submit(time.sleep, 600)
+        process = worker.process
+        worker.terminate()
+        self.assertFalse(process.is_alive())
+        self.assertIsNone(worker.process)
+        self.assertFalse(worker.background)
+
+    def test_failed_run_exits(self):
+        process = multiprocessing.Process(target=run_failing_simulation)
+        process.start()
+        self.assertTrue(wait_for_exit(process),
+                        "failed run did not exit within {} sec".format(EXIT_TIMEOUT))
+        self.assertEqual(process.exitcode, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,45 @@
+"""
+Tests for drawing a run's plots.
+
+Run from the repository root:
+
+    python -m pytest tests
+"""
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+
+import matplotlib
+matplotlib.use('Agg')
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import library
+import plotdata
+
+PARAMS = {'init_size': 25, 'max_cycles': 2000, 'select_time': 500, 'seed': 1,
+          'test_group_dir': '.', 'param_set_dir': '.', 'run_dir': 'run'}
+
+
+class TestPlots(unittest.TestCase):
+
+    def setUp(self):
+        # plots are drawn in run directories relative to the working directory
+        self.cwd = os.getcwd()
+        self.tmp_dir = tempfile.mkdtemp()
+        os.chdir(self.tmp_dir)
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        shutil.rmtree(self.tmp_dir)
+
+    def test_plots_without_clone_summaries(self):
+        library.simulate(PARAMS, outputs=('summary', 'plot_data', 'plots'))
+        self.assertFalse(plotdata.has_clone_summaries('run'))
+        self.assertTrue(os.path.exists(os.path.join('run', 'plots',
+                                                    'end_population_graph.png')))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -106,6 +106,9 @@ class Treatment(object):
         Let the tumour know that the treatment
         has been introduced, and produce some plots.
         """
+        # the population as it was before treatment
+        # may be reused by other runs
+        self.sim.store_precrash_population(t_curr)
         self.is_introduced = True
         self.select_time = t_curr
         self.crash_time = t_curr
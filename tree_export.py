@@ -0,0 +1,178 @@
+"""
+Functions for exporting the clone tree as a phylogenetic tree.
+
+The tree can be written in phyloXML format (as read by
+the summarise_misc scripts), in Newick format, or both,
+optionally gzip-compressed. Each file is written through
+a single buffered file handle, in one pre-order pass over
+the tree; nesting is recovered from the depth of each
+clone, so no recursion is needed.
+
+Clones with `min_size` cells or fewer are left out of the
+tree (the root clone is always included); their children
+are attached to the nearest ancestor which is included.
+Branch lengths are normalised by the current time step.
+"""
+from __future__ import print_function
+import gzip
+from collections import namedtuple
+
+# write buffer size for tree files, in bytes
+BUFFER_SIZE = 1 << 16
+
+PHYLOXML_HEADER = (
+    '<?xml version="1.0" encoding="UTF-8"?>\n'
+    '<phyloxml xmlns:xsi="http://www.w3.org/2001/XMLSchema-instancei" '
+    'xsi:schemaLocation="http://www.phyloxml.org '
+    'http://www.phyloxml.org/1.10/phyloxml.xsd" xmlns="http://www.phyloxml.org">\n'
+    '<phylogeny rooted="true">\n'
+    '<name>Phylogenetic Tree</name>\n'
+    '<clade>\n')
+
+PHYLOXML_FOOTER = "</clade>\n</phylogeny>\n</phyloxml>"
+
+TREE_FORMATS = ('phyloxml', 'newick', 'both')
+
+# the clone attributes written to a tree
+Clade = namedtuple('Clade', ['depth', 'size', 'branch_length',
+                             'prolif_rate', 'mut_rate', 'col'])
+
+
+def export_tree(table, t_curr, run_dir, fname, fmt='phyloxml',
+                compress=False, min_size=1):
+    """
+    Export the clone tree to file(s) in the run's data directory.
+
+    Args
+    ----
+    table : the clone tree, as a tree table (see clonetable.tree_table)
+    t_curr : current time step, used to normalise branch lengths
+    run_dir : the run directory
+    fname : prefix for the tree filenames
+    fmt : 'phyloxml', 'newick' or 'both'
+    compress : whether to gzip the tree file(s)
+    min_size : clones of this size or smaller are not written
+
+    Returns
+    -------
+    A list of the paths written.
+    """
+    if fmt not in TREE_FORMATS:
+        raise ValueError("Bad value for tree format: {}".format(fmt))
+
+    writers = []
+    if fmt in ('phyloxml', 'both'):
+        writers.append(("{0}/data/{1}_phylo.xml", write_phyloxml))
+    if fmt in ('newick', 'both'):
+        writers.append(("{0}/data/{1}_phylo.nwk", write_newick))
+
+    fpaths = []
+    for fpath_fmt, write_func in writers:
+        fpath = fpath_fmt.format(run_dir, fname)
+        if compress:
+            fpath += ".gz"
+        tree_file = open_tree_file(fpath, compress)
+        try:
+            write_func(iter_clades(table), tree_file, t_curr, min_size)
+        finally:
+            tree_file.close()
+        fpaths.append(fpath)
+    return fpaths
+
+
+def iter_clades(table):
+    """Iterate over the clones in a tree table, in pre-order."""
+    columns = [table[name].tolist() for name in Clade._fields]
+    for clade_vals in zip(*columns):
+        yield Clade(*clade_vals)
+
+
+def open_tree_file(fpath, compress=False):
+    """Open a tree file for writing, through a single buffered handle."""
+    if compress:
+        return gzip.open(fpath, 'wb')
+    return open(fpath, 'w', BUFFER_SIZE)
+
+
+def write_phyloxml(clades, tree_file, t_curr, min_size=1):
+    """
+    Write a pre-order sequence of clades to a file in phyloXML format.
+
+    `clades` may be any pre-order iterable of objects
+    with `depth`, `size`, `branch_length`, `prolif_rate`,
+    `mut_rate` and `col` attributes.
+    """
+    t_norm = get_time_norm(t_curr)
+    tree_file.write(PHYLOXML_HEADER)
+
+    # depths of the clades which are currently open
+    open_depths = []
+    for clade in clades:
+        # close every open clade which is not an ancestor of this one
+        while open_depths and open_depths[-1] >= clade.depth:
+            open_depths.pop()
+            tree_file.write("</clade>\n")
+        if is_included(clade, min_size):
+            tree_file.write('<clade branch_length="{0}">\n'.format(clade.branch_length/t_norm))
+            tree_file.write("<name> {} </name>\n".format(clade_label(clade)))
+            open_depths.append(clade.depth)
+    tree_file.write("</clade>\n" * len(open_depths))
+
+    tree_file.write(PHYLOXML_FOOTER)
+
+
+def write_newick(clades, tree_file, t_curr, min_size=1):
+    """
+    Write a pre-order sequence of clades to a file in Newick format.
+
+    See write_phyloxml() for the attributes `clades` must have.
+    Clade labels are quoted, as they contain spaces and colons.
+    """
+    t_norm = get_time_norm(t_curr)
+
+    # Newick puts each label *after* the clade's children, so
+    # for each open clade we keep its depth, its label and
+    # branch length, and whether any children have been written
+    open_clades = []
+
+    def close_clade():
+        _depth, label, has_children = open_clades.pop()
+        if has_children:
+            tree_file.write(")")
+        tree_file.write(label)
+
+    for clade in clades:
+        while open_clades and open_clades[-1][0] >= clade.depth:
+            close_clade()
+        if is_included(clade, min_size):
+            if open_clades:
+                parent = open_clades[-1]
+                tree_file.write("," if parent[2] else "(")
+                parent[2] = True
+            label = "'{0}':{1}".format(clade_label(clade),
+                                       clade.branch_length/t_norm)
+            open_clades.append([clade.depth, label, False])
+    while open_clades:
+        close_clade()
+
+    tree_file.write(";\n")
+
+
+def is_included(clade, min_size):
+    """Determine whether a clade is written to the tree."""
+    return clade.size > min_size or clade.depth == 0
+
+
+def clade_label(clade):
+    """Get the label identifying a clade in an exported tree."""
+    return "p:{} m:{} s:{} r:{}".format(str(clade.prolif_rate)[0:6],
+                                        str(clade.mut_rate)[0:6],
+                                        str(clade.size),
+                                        str(clade.col))
+
+
+def get_time_norm(t_curr):
+    """Get the (non-zero) time used to normalise branch lengths."""
+    if t_curr == 0:
+        return 1.0
+    return float(t_curr)
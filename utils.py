@@ -34,6 +34,12 @@ def secs_to_hms(time_delta):
     return "{:02d}:{:02d}:{:04.1f}".format(int(hours), int(mins), secs)
 
 
+def hms_to_secs(hms):
+    """Convert a HH:MM:SS.S time delta (see secs_to_hms) to seconds."""
+    hours, mins, secs = hms.split(':')
+    return int(hours) * 3600 + int(mins) * 60 + float(secs)
+
+
 def make_path_unless_exists(path):
     """Make a directory, unless it already exists"""
     try:
@@ -43,6 +49,12 @@ def make_path_unless_exists(path):
             raise
 
 
+def make_run_dir(run_dir):
+    """Make a run directory, with its data and plots subdirectories"""
+    for subdir in ["data", "plots"]:
+        make_path_unless_exists(os.path.join(run_dir, subdir))
+
+
 def delete_local_file(fname):
     """Delete a file from the local directory (if it exists).
 
@@ -0,0 +1,319 @@
+"""
+A pool of warm worker processes for running simulations.
+
+Starting each simulation in a new interpreter means importing
+NumPy, matplotlib and pandas (and the simulation itself) before
+the first cycle is run, which for a short run can take as long
+as the run itself. A WorkerPool instead starts its worker
+processes once, imports everything in each of them up front, and
+then runs any number of simulations in each, one after another.
+
+A job is a list of main.py command line arguments, and the
+directory to run it from. As run_param_set.sh does, the run
+directory (with its data and plots subdirectories) is created if
+need be. A run's printed output is written to `simulation.log` in
+its run directory.
+
+Workers report the progress of jobs as events, read with
+WorkerPool.get_event():
+
+    ('running', job_id, pid)
+    ('done', job_id, result)     (see run_job)
+    ('failed', job_id, error)    (see failure)
+
+A pool may limit each run's walltime and resident memory (RSS).
+The pool checks on its running jobs whenever it waits for an
+event; a worker whose run exceeds a limit is killed, along with
+any processes it started, and replaced by a new worker, as is a
+worker which dies mid-run (e.g. at the hands of the kernel's OOM
+killer). Reading a worker's RSS needs /proc, so memory limits are
+only enforced on Linux.
+
+A failed run's error gives its cause, one of FAILURE_CAUSES. Runs
+which fail for reasons outside the simulation (TRANSIENT_CAUSES)
+may succeed if they are run again.
+
+Workers are ordinary, rather than daemonic, processes, so that
+each simulation can still start its own background output
+process (see outputworker).
+"""
+from __future__ import print_function
+import contextlib
+import multiprocessing
+import os
+import signal
+import sqlite3
+import sys
+import time
+import traceback
+import outputworker
+import resources
+try:
+    from queue import Empty
+except ImportError:
+    from Queue import Empty
+from utils import make_run_dir
+
+LOG_FNAME = "simulation.log"
+
+# causes of failure: an exception raised by the run, an error
+# reading or writing files, exceeding the pool's limits, or
+# the worker dying (e.g. being killed) mid-run
+FAIL_EXCEPTION = 'exception'
+FAIL_IO = 'io'
+FAIL_MEMORY = 'memory'
+FAIL_WALLTIME = 'walltime'
+FAIL_WORKER_DIED = 'worker died'
+FAILURE_CAUSES = (FAIL_EXCEPTION, FAIL_IO, FAIL_MEMORY,
+                  FAIL_WALLTIME, FAIL_WORKER_DIED)
+TRANSIENT_CAUSES = (FAIL_IO, FAIL_WORKER_DIED)
+
+# seconds between checks on running jobs
+POLL_INTERVAL = 1.0
+
+
+class WorkerPool(object):
+    """
+    Run simulations in a fixed set of warm worker processes.
+
+    Attributes
+    ----------
+    num_workers : number of worker processes
+    max_walltime : longest a run may take, in seconds (or None)
+    max_rss : most memory a run may use, in bytes (or None)
+    job_queue : queue of jobs waiting for a worker
+    event_queue : queue of job events from the workers
+    processes : dict mapping the worker processes' pids
+        to the processes, once started
+    running : dict mapping the pids of busy workers to
+        the ID and start time of the job they are running
+    abandoned : IDs of jobs whose workers have been killed
+    """
+    def __init__(self, num_workers=None, max_walltime=None, max_rss=None):
+        self.num_workers = num_workers or multiprocessing.cpu_count()
+        self.max_walltime = max_walltime
+        self.max_rss = max_rss
+        self.job_queue = multiprocessing.Queue()
+        self.event_queue = multiprocessing.Queue()
+        self.processes = {}
+        self.running = {}
+        self.abandoned = set()
+
+    def start(self):
+        """Start the worker processes."""
+        for _ in range(self.num_workers):
+            self.start_worker()
+
+    def start_worker(self):
+        """Start a worker process."""
+        process = multiprocessing.Process(target=run_worker,
+                                          args=(self.job_queue,
+                                                self.event_queue))
+        process.start()
+        self.processes[process.pid] = process
+
+    def submit(self, job_id, args, cwd):
+        """
+        Queue a job: run main.py with `args`, from directory `cwd`.
+
+        A job which failed may be submitted again, with the same ID.
+        """
+        self.abandoned.discard(job_id)
+        self.job_queue.put((job_id, list(args), cwd))
+
+    def get_event(self, timeout=None):
+        """
+        Get the next job event from the workers.
+
+        Blocks until an event arrives, or `timeout` seconds
+        have passed. Returns None once the pool has been closed
+        (or if the timeout expires). While waiting, running jobs
+        are checked against the pool's limits (see check_jobs).
+        """
+        deadline = None if timeout is None else time.time() + timeout
+        while True:
+            wait = POLL_INTERVAL
+            if deadline is not None:
+                wait = max(min(wait, deadline - time.time()), 0.0)
+            try:
+                event = self.event_queue.get(timeout=wait)
+            except Empty:
+                event = Empty
+            if event is Empty:
+                event = self.check_jobs()
+                if event is None:
+                    if deadline is not None and time.time() >= deadline:
+                        return None
+                    continue
+                return event
+            if event is None:
+                return None
+            state, job_id, detail = event
+            if job_id in self.abandoned:
+                # the job's failure has already been reported
+                continue
+            if state == 'running':
+                self.running[detail] = (job_id, time.time())
+            else:
+                self.running = dict((pid, job) for pid, job in self.running.items()
+                                    if job[0] != job_id)
+            return event
+
+    def check_jobs(self):
+        """
+        Check that running jobs' workers are alive, and within limits.
+
+        A worker which has died is replaced; a worker whose
+        job exceeds a limit is killed, and replaced.
+
+        Returns
+        -------
+        A 'failed' event for the first job found to have
+        failed, or None if all jobs are running normally.
+        """
+        now = time.time()
+        for pid, (job_id, start_time) in list(self.running.items()):
+            process = self.processes[pid]
+            if not process.is_alive():
+                error = failure(FAIL_WORKER_DIED,
+                                "worker died (exit code {})".format(process.exitcode))
+            elif self.max_walltime and now - start_time > self.max_walltime:
+                error = failure(FAIL_WALLTIME,
+                                "run exceeded walltime limit "
+                                "({:.0f} sec)".format(self.max_walltime))
+            elif self.max_rss and resources.current_rss(pid) > self.max_rss:
+                error = failure(FAIL_MEMORY,
+                                "run exceeded memory limit "
+                                "({:.0f} MB)".format(self.max_rss / 2.0**20))
+            else:
+                continue
+            self.replace_worker(pid)
+            self.abandoned.add(job_id)
+            return ('failed', job_id, error)
+        return None
+
+    def replace_worker(self, pid):
+        """Kill a worker (and any processes it started), and start another."""
+        try:
+            os.killpg(pid, signal.SIGKILL)
+        except OSError:
+            # the worker has already died
+            pass
+        self.processes.pop(pid).join()
+        del self.running[pid]
+        self.start_worker()
+
+    def close(self):
+        """Wait for all queued jobs to finish, then stop the workers."""
+        for _ in self.processes:
+            self.job_queue.put(None)
+        for process in self.processes.values():
+            process.join()
+        self.processes = {}
+        self.event_queue.put(None)
+
+
+def failure(cause, message):
+    """Describe a failed job: its cause (see FAILURE_CAUSES), and an error message."""
+    return {'cause': cause, 'message': message}
+
+
+
+def warm_up():
+    """Import everything a simulation needs, before any job arrives."""
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot
+    import numpy
+    import pandas
+    import main
+
+
+def run_worker(job_queue, event_queue):
+    """Run jobs from a queue until a None job is received."""
+    # lead a new process group, so that the pool can kill
+    # this worker along with any processes it starts
+    os.setsid()
+    warm_up()
+    while True:
+        job = job_queue.get()
+        if job is None:
+            break
+        job_id, args, cwd = job
+        event_queue.put(('running', job_id, os.getpid()))
+        try:
+            result = run_job(args, cwd)
+        except (Exception, SystemExit) as err:
+            # SystemExit is raised for bad arguments. A failed run's
+            # output worker is stopped as the Simulator fails (see
+            # Simulator.run); make sure that none is left running,
+            # holding a copy of the run's memory
+            outputworker.terminate_all()
+            event_queue.put(('failed', job_id,
+                             failure(failure_cause(err), traceback.format_exc())))
+        else:
+            event_queue.put(('done', job_id, result))
+
+
+def failure_cause(err):
+    """Get the cause of a run's failure (see FAILURE_CAUSES) from its exception."""
+    if isinstance(err, MemoryError):
+        # including runs stopped by their own hard memory limit
+        return FAIL_MEMORY
+    if isinstance(err, (EnvironmentError, sqlite3.OperationalError)):
+        # e.g. a full disk, or a results database left locked
+        return FAIL_IO
+    return FAIL_EXCEPTION
+
+
+def run_job(args, cwd):
+    """
+    Run a single simulation, in this process.
+
+    Returns
+    -------
+    A dict of the paths of the run directory, its log,
+    and the files the run's results are recorded in, and
+    the run's summary values (keyed by column name).
+    """
+    import main
+    from runcache import to_json_value
+    os.chdir(cwd)
+    opt = main.parse_cmd_line_args(args)
+    make_run_dir(opt.run_dir)
+
+    log_fpath = os.path.join(opt.run_dir, LOG_FNAME)
+    with redirect_output(log_fpath):
+        summary = main.run_simulation(opt)
+
+    return {'run_dir': os.path.abspath(opt.run_dir),
+            'log': os.path.abspath(log_fpath),
+            'results': [os.path.abspath(fpath)
+                        for fpath in main.results_paths(opt)],
+            'summary': dict((name, to_json_value(val))
+                            for name, val in summary.items())}
+
+
+@contextlib.contextmanager
+def redirect_output(fpath):
+    """
+    Append everything written to stdout or stderr to a file.
+
+    The file descriptors themselves are redirected, so the
+    output of child processes is captured too.
+    """
+    sys.stdout.flush()
+    sys.stderr.flush()
+    saved_fds = [os.dup(1), os.dup(2)]
+    with open(fpath, 'a') as log_file:
+        os.dup2(log_file.fileno(), 1)
+        os.dup2(log_file.fileno(), 2)
+        try:
+            yield
+        finally:
+            sys.stdout.flush()
+            sys.stderr.flush()
+            os.dup2(saved_fds[0], 1)
+            os.dup2(saved_fds[1], 2)
+            for fd in saved_fds:
+                os.close(fd)